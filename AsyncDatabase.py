@@ -0,0 +1,94 @@
+import asyncio  # Used to run the blocking database functions without blocking the discord event loop
+import functools  # Used to pass arguments through to the executor and keep the wrapped functions' docstrings
+import time  # Used to time each database call
+from concurrent.futures import ThreadPoolExecutor  # Used to run the database functions in background threads
+import Database  # The blocking database functions that are wrapped by this module
+import Export  # Holds the blocking export of a server's history, which is wrapped by this module
+import Settings  # Used to size the executor to match the connection pool
+import Metrics  # Used to record how long each database call takes
+
+# The threads that database calls are run on.  There is no point in having more threads than pooled connections,
+# since any extra threads would just wait for a connection to be freed.
+EXECUTOR = ThreadPoolExecutor(max_workers=Settings.DB_POOL_MAX_SIZE)
+
+
+async def run(func, *args, **kwargs):
+    """ Runs a blocking function on the database executor so the event loop can keep handling other messages.
+
+    :param func: The blocking function to be run.
+    :type func: function
+
+    :return: Whatever the given function returns.
+    """
+    # The event loop the coroutine is running in
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(EXECUTOR, functools.partial(func, *args, **kwargs))
+
+
+def _awaitable(func):
+    """ Creates a coroutine version of a Database.py function that is ran on the database executor.
+
+    :param func: The Database.py function to be wrapped.
+    :type func: function
+
+    :return: The coroutine function that takes the same arguments as the wrapped function.
+    :rtype: function
+    """
+    # The histogram the calls are timed in, which includes the time spent waiting for a free thread
+    name = 'query.' + func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await run(func, *args, **kwargs)
+        except Database.DatabaseError as e:
+            # Remembers which function failed so the error can be logged with it
+            if e.query is None:
+                e.query = func.__name__
+            raise
+        finally:
+            Metrics.METRICS.observe(name, time.perf_counter() - start)
+    return wrapper
+
+
+async def transaction(func, *args, **kwargs):
+    """ Runs a blocking function as a single unit of work on the database executor.  The function is given a
+    Database.Transaction as its first argument followed by the given arguments, and everything it does with the
+    transaction is committed together once it returns.
+
+    :except Database.DatabaseError: Raised if an error occurs in connect.
+
+    :param func: The blocking function to be run, which takes the transaction as its first argument.
+    :type func: function
+
+    :return: Whatever the given function returns.
+    """
+    def unit_of_work():
+        with Database.transaction() as work:
+            return func(work, *args, **kwargs)
+    unit_of_work.__name__ = func.__name__
+    return await _awaitable(unit_of_work)()
+
+
+# Awaitable versions of each of the functions in Database.py
+get_settings = _awaitable(Database.get_settings)
+get_server_settings = _awaitable(Database.get_server_settings)
+update_settings = _awaitable(Database.update_settings)
+check_team_size = _awaitable(Database.check_team_size)
+add_player = _awaitable(Database.add_player)
+change_ign = _awaitable(Database.change_ign)
+import_roster = _awaitable(Database.import_roster)
+set_team = _awaitable(Database.set_team)
+join_team = _awaitable(Database.join_team)
+get_players = _awaitable(Database.get_players)
+update_game_scores = _awaitable(Database.update_game_scores)
+get_round_matches = _awaitable(Database.get_round_matches)
+get_teams = _awaitable(Database.get_teams)
+create_schedule = _awaitable(Database.create_schedule)
+get_standings = _awaitable(Database.get_standings)
+get_match = _awaitable(Database.get_match)
+save_veto = _awaitable(Database.save_veto)
+
+# Awaitable version of the export in Export.py
+write_archive = _awaitable(Export.write_archive)
@@ -0,0 +1,333 @@
+import asyncio  # Used to time out turns and to save finished vetoes without blocking the sessions
+import random  # Used to choose a map for a captain that runs out of time
+
+# The actions a captain can take on their turn
+BAN = 'ban'
+PICK = 'pick'
+
+
+class VetoError(Exception):
+    """ Raised when a captain tries to do something the veto doesn't allow.  The message explains why, and can be
+    shown to the captain.
+    """
+    pass
+
+
+class VetoSession:
+    """ The map veto of a single match.  The two teams take turns in the order given by the veto's sequence, banning or
+    picking one of the remaining maps each turn.  When the sequence is done, the map that is left over is played as
+    the decider.  A captain that doesn't act before the turn timeout has a random map chosen for them.  Each team's
+    turns are taken by its captain, who is the first member of the team to act unless one was given at the start.
+    """
+
+    def __init__(self, key, team_1, team_2, maps, sequence, turn_timeout, loop=None, rng=None, on_timeout=None,
+                 on_complete=None, captains=None):
+        """ Creates the session and starts the first turn's timer.
+
+        :param key: The key the session is stored under, which is the server id and match id.
+        :type key: tuple
+
+        :param team_1: The team that takes the first turn.
+        :type team_1: str
+
+        :param team_2: The team that takes the second turn.
+        :type team_2: str
+
+        :param maps: The map pool of the veto.
+        :type maps: list
+
+        :param sequence: The action taken on each turn, either BAN or PICK.  Must have fewer turns than there are maps.
+        :type sequence: list
+
+        :param turn_timeout: The number of seconds a captain has to act on their turn, or None for no limit.
+        :type turn_timeout: float, None
+
+        :param loop: The event loop that runs the turn timers.  Defaults to the current event loop.
+        :type loop: asyncio.AbstractEventLoop
+
+        :param rng: The random number generator used to choose maps for captains that time out.
+        :type rng: random.Random
+
+        :param on_timeout: Called with the session and the action taken when a captain runs out of time.
+        :type on_timeout: function
+
+        :param on_complete: Called with the session once the veto is finished.
+        :type on_complete: function
+
+        :param captains: The discord id of the captain of each team that already has one, keyed by the team.
+        :type captains: dict
+        """
+        if len(sequence) >= len(maps):
+            raise ValueError('The veto needs more maps than turns so there is a decider')
+        self.key = key
+        self.teams = (team_1, team_2)
+        self.remaining = list(maps)
+        self.sequence = tuple(sequence)
+        self.turn_timeout = turn_timeout
+        self.loop = loop or asyncio.get_event_loop()
+        self.rng = rng or random.Random()
+        self.on_timeout = on_timeout
+        self.on_complete = on_complete
+        # The member who takes the turns of each team, keyed by the team
+        self.captains = dict(captains or {})
+        # The actions taken so far, as tuples of the team, the action, the map, and whether the turn timed out
+        self.actions = list()
+        # The decider map, set when the veto is finished
+        self.decider = None
+        # Says if the veto was cancelled before it finished
+        self.cancelled = False
+        # The timer of the current turn
+        self._timer = None
+        self._start_turn()
+
+    @property
+    def finished(self):
+        """ Says if the veto is over, either because every turn was taken or because it was cancelled.
+        """
+        return self.decider is not None or self.cancelled
+
+    @property
+    def current_team(self):
+        """ The team whose turn it is, or None if the veto is finished.
+        """
+        return None if self.finished else self.teams[len(self.actions) % 2]
+
+    @property
+    def current_action(self):
+        """ The action to be taken this turn, or None if the veto is finished.
+        """
+        return None if self.finished else self.sequence[len(self.actions)]
+
+    @property
+    def picks(self):
+        """ The maps to be played in order, ending with the decider once the veto is finished.
+        """
+        picks = [map_name for team, action, map_name, timed_out in self.actions if action == PICK]
+        return picks + [self.decider] if self.decider is not None else picks
+
+    @property
+    def bans(self):
+        """ The maps that were banned, in the order they were banned.
+        """
+        return [map_name for team, action, map_name, timed_out in self.actions if action == BAN]
+
+    def find_map(self, map_name):
+        """ Finds a remaining map by name, ignoring case.
+
+        :param map_name: The name of the map.
+        :type map_name: str
+
+        :return: The name of the map as it appears in the map pool, or None if it isn't remaining.
+        :rtype: str, None
+        """
+        for remaining in self.remaining:
+            if remaining.lower() == map_name.lower():
+                return remaining
+        return None
+
+    def act(self, team, action, map_name, member=None):
+        """ Bans or picks a map for a team.  The first member to act for a team that has no captain becomes its
+        captain.
+
+        :except VetoError: Raised if the veto is finished, it isn't the team's turn, the member isn't the team's
+        captain, the wrong action was used, or the map isn't remaining.
+
+        :param team: The team taking the action.
+        :type team: str
+
+        :param action: Either BAN or PICK.
+        :type action: str
+
+        :param map_name: The name of the map.
+        :type map_name: str
+
+        :param member: The discord id of the member taking the action, or None to act without checking the captain.
+        :type member: str, None
+
+        :return: The name of the map as it appears in the map pool.
+        :rtype: str
+        """
+        if self.finished:
+            raise VetoError('The veto is already over')
+        if team != self.current_team:
+            raise VetoError('It is not your team\'s turn')
+        if member is not None and self.captains.get(team, member) != member:
+            raise VetoError('Only <@{}> can ban or pick for your team'.format(self.captains[team]))
+        if action != self.current_action:
+            raise VetoError('This turn is a {}, not a {}'.format(self.current_action, action))
+        found = self.find_map(map_name)
+        if found is None:
+            raise VetoError('{} is not one of the remaining maps: {}'.format(map_name, ', '.join(self.remaining)))
+        if member is not None:
+            self.captains.setdefault(team, member)
+        self._apply(team, action, found, False)
+        return found
+
+    def cancel(self):
+        """ Stops the veto without finishing it.
+        """
+        self.cancelled = True
+        self._stop_timer()
+
+    def _apply(self, team, action, map_name, timed_out):
+        """ Records an action and moves on to the next turn, finishing the veto after the last turn.
+        """
+        self._stop_timer()
+        self.remaining.remove(map_name)
+        self.actions.append((team, action, map_name, timed_out))
+        if len(self.actions) == len(self.sequence):
+            self.decider = self.remaining[0]
+            if self.on_complete is not None:
+                self.on_complete(self)
+        else:
+            self._start_turn()
+
+    def _start_turn(self):
+        """ Starts the timer of the current turn.
+        """
+        if self.turn_timeout is not None:
+            self._timer = self.loop.call_later(self.turn_timeout, self._time_out)
+
+    def _stop_timer(self):
+        """ Stops the timer of the current turn.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _time_out(self):
+        """ Takes the current turn for a captain that ran out of time by choosing a random remaining map.
+        """
+        self._timer = None
+        team, action = self.current_team, self.current_action
+        map_name = self.rng.choice(self.remaining)
+        self._apply(team, action, map_name, True)
+        if self.on_timeout is not None:
+            self.on_timeout(self, (team, action, map_name))
+
+
+class SessionManager:
+    """ Holds the vetoes that are in progress, keyed by server and match, and saves each veto once when it finishes.
+    All of the sessions share one event loop and only touch the database when they finish.
+    """
+
+    def __init__(self, maps, sequence, turn_timeout, save=None, loop=None, rng=None):
+        """ Creates the manager.
+
+        :param maps: The map pool of each game type, keyed by the game type.
+        :type maps: dict
+
+        :param sequence: The action taken on each turn of a veto.
+        :type sequence: list
+
+        :param turn_timeout: The number of seconds a captain has to act on their turn, or None for no limit.
+        :type turn_timeout: float, None
+
+        :param save: A coroutine function that is given each finished session to save it.
+        :type save: function
+
+        :param loop: The event loop the sessions run on.  Defaults to the current event loop.
+        :type loop: asyncio.AbstractEventLoop
+
+        :param rng: The random number generator used to choose maps for captains that time out.
+        :type rng: random.Random
+        """
+        self.maps = maps
+        self.sequence = sequence
+        self.turn_timeout = turn_timeout
+        self.save = save
+        self.loop = loop
+        self.rng = rng
+        # The sessions in progress, keyed by the server id and match id
+        self.sessions = dict()
+        # The key of the session each team is in, keyed by the server id and the team
+        self._teams = dict()
+        # The tasks saving finished sessions, kept so they can be waited on
+        self.pending_saves = set()
+
+    def start(self, server, match, team_1, team_2, game_type, on_timeout=None, captains=None):
+        """ Starts the veto of a match.
+
+        :except VetoError: Raised if either team is already in a veto, or the game type has no map pool.
+
+        :param server: The discord id of the server the match is in.
+        :type server: str
+
+        :param match: The database id of the match.
+        :type match: int
+
+        :param team_1: The team that takes the first turn.
+        :type team_1: str
+
+        :param team_2: The team that takes the second turn.
+        :type team_2: str
+
+        :param game_type: The game type of the server, which decides the map pool.
+        :type game_type: str
+
+        :param on_timeout: Called with the session and the action taken when a captain runs out of time.
+        :type on_timeout: function
+
+        :param captains: The discord id of the captain of each team that already has one, keyed by the team.
+        :type captains: dict
+
+        :return: The new session.
+        :rtype: VetoSession
+        """
+        key = (server, match)
+        if key in self.sessions or (server, team_1) in self._teams or (server, team_2) in self._teams:
+            raise VetoError('A veto is already running for this match')
+        if game_type not in self.maps:
+            raise VetoError('There is no map pool for {}'.format(game_type))
+        session = VetoSession(key, team_1, team_2, self.maps[game_type], self.sequence, self.turn_timeout,
+                              loop=self.loop, rng=self.rng, on_timeout=on_timeout, on_complete=self._finish,
+                              captains=captains)
+        self.sessions[key] = session
+        self._teams[(server, team_1)] = key
+        self._teams[(server, team_2)] = key
+        return session
+
+    def find(self, server, team):
+        """ Finds the veto a team is in.
+
+        :param server: The discord id of the server.
+        :type server: str
+
+        :param team: The team.
+        :type team: str
+
+        :return: The session the team is in, or None if the team isn't in a veto.
+        :rtype: VetoSession, None
+        """
+        key = self._teams.get((server, team))
+        return self.sessions.get(key) if key is not None else None
+
+    def cancel(self, server, match):
+        """ Cancels the veto of a match without saving it.
+
+        :return: Whether or not there was a veto to cancel.
+        :rtype: bool
+        """
+        session = self.sessions.get((server, match))
+        if session is None:
+            return False
+        session.cancel()
+        self._remove(session)
+        return True
+
+    def _remove(self, session):
+        """ Forgets a session and its teams.
+        """
+        server = session.key[0]
+        self.sessions.pop(session.key, None)
+        for team in session.teams:
+            self._teams.pop((server, team), None)
+
+    def _finish(self, session):
+        """ Forgets a finished session and starts saving it in the background.
+        """
+        self._remove(session)
+        if self.save is not None:
+            task = session.loop.create_task(self.save(session))
+            self.pending_saves.add(task)
+            task.add_done_callback(self.pending_saves.discard)
@@ -0,0 +1,55 @@
+""" Measures the memory used by the export command while it streams a league out of the database, to check that it stays
+flat as the league grows.  Seed a league with Benchmarks.SeedLeague first, then export it with a few chunk sizes.
+
+Run from the root of the repo with:
+    python -m Benchmarks.Export [--server seed-league] [--chunk-sizes 500,2000,10000] [--max-peak-mb 20]
+"""
+import argparse  # Used to read the command line arguments
+import sys  # Used to fail the run if the memory ceiling is passed
+import tempfile  # Used to write the archives to disk like the export command does
+import time  # Used to time the exports
+import tracemalloc  # Used to find the most memory allocated during each export
+import Export  # Holds the export being measured
+from Benchmarks.SeedLeague import SERVER  # The server seeded by SeedLeague
+
+
+def measure(server, chunk_size):
+    """ Exports a server and measures it.
+
+    :return: The number of rows exported, the size of the archive in bytes, the seconds taken, and the most memory
+    allocated at once in bytes.
+    :rtype: tuple
+    """
+    with tempfile.TemporaryFile() as archive:
+        tracemalloc.start()
+        start = time.perf_counter()
+        counts = Export.write_archive(server, archive, chunk_size)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return sum(counts.values()), archive.tell(), elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the memory used by the export command')
+    parser.add_argument('--server', default=SERVER)
+    parser.add_argument('--chunk-sizes', default='500,2000,10000', help='comma separated rows fetched at a time')
+    parser.add_argument('--max-peak-mb', type=float, default=None,
+                        help='exit with an error if any export allocates more than this')
+    args = parser.parse_args()
+
+    print('{:>10} {:>10} {:>12} {:>10} {:>12}'.format('chunk', 'rows', 'archive KB', 'seconds', 'peak MB'))
+    worst = 0
+    for chunk_size in (int(size) for size in args.chunk_sizes.split(',')):
+        rows, size, elapsed, peak = measure(args.server, chunk_size)
+        worst = max(worst, peak)
+        print('{:>10} {:>10} {:>12.1f} {:>10.2f} {:>12.2f}'.format(chunk_size, rows, size / 1000, elapsed,
+                                                                 peak / 1000000))
+    if args.max_peak_mb is not None and worst > args.max_peak_mb * 1000000:
+        print('The export allocated {:.2f} MB, which is over the {} MB ceiling'.format(worst / 1000000,
+                                                                                      args.max_peak_mb))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+""" A discord client with a fake gateway, for running the bot's workers offline.  Each client delivers synthetic traffic
+for the servers its shard owns straight to Main.on_message, with the database replaced by the Replay stub and replies
+counted instead of sent.  Used by Benchmarks.Shards through Launcher.run_worker.
+"""
+import asyncio  # Used to hand control back to the event loop between messages
+import os  # Used to check for the file that makes a shard crash
+from types import SimpleNamespace  # Used to build the fake servers
+import Main  # Holds the client being faked and the message handler
+import Metrics  # Used to count the messages each shard handles
+from Benchmarks.Replay import StubBackend, TrafficGenerator  # Used to stub the database and generate the traffic
+
+# Says if the stub backend has been installed in this process, since every shard of a worker shares it
+installed = [False]
+
+
+def shard_of(server_id, shard_count):
+    """ Gets the shard discord sends a server's events to.
+
+    :param server_id: The discord id of the server.
+    :type server_id: str
+
+    :param shard_count: The number of shards the bot's servers are split into.
+    :type shard_count: int
+
+    :rtype: int
+    """
+    return (int(server_id) >> 22) % shard_count
+
+
+class FakeGatewayClient(Main.Client):
+    """ A client that doesn't connect to discord.  Starting it delivers the shard's share of a stream of synthetic
+    messages until the worker is stopped.
+    """
+
+    def __init__(self, shard_id=None, shard_count=None, servers=200, crash_shard=None, crash_file=None,
+                 crash_after=500, **kwargs):
+        """ Creates the client.
+
+        :param servers: The number of servers the traffic is spread over, before it is split between the shards.
+        :type servers: int
+
+        :param crash_shard: The shard that crashes its worker once, or None if no shard crashes.
+        :type crash_shard: int, None
+
+        :param crash_file: The file that has to exist for the shard to crash, which it removes so the restarted worker
+        doesn't crash again.
+        :type crash_file: str, None
+
+        :param crash_after: The number of messages the shard handles before it crashes.
+        :type crash_after: int
+        """
+        super().__init__(shard_id=shard_id, shard_count=shard_count, **kwargs)
+        self.fake_shard_id = shard_id or 0
+        self.fake_shard_count = shard_count or 1
+        self.servers = servers
+        self.crash_after = crash_after if crash_shard == self.fake_shard_id else None
+        self.crash_file = crash_file
+
+    async def login(self, *args, **kwargs):
+        pass
+
+    async def logout(self):
+        pass
+
+    async def send_now(self, destination, content=None, *args, **kwargs):
+        Metrics.METRICS.count('fake.replies')
+
+    async def start(self, *args, **kwargs):
+        if not installed[0]:
+            installed[0] = True
+            StubBackend().install()
+            # The synthetic traffic is far faster than real members, so the limits would reject most of it
+            Main.limiter.default_cost = 0
+            Main.limiter.costs = dict()
+        generator = TrafficGenerator({'chat': 90, 'addplayer': 4, 'mentionteam': 4, 'score': 2},
+                                     servers=self.servers, seed=self.fake_shard_id)
+        # Spreads the server ids over the bits discord shards by, since the generator's ids are all on one shard
+        generator.servers = [SimpleNamespace(id=str(10 ** 17 + (number << 22)), name='server-{}'.format(number))
+                             for number in range(self.servers)]
+        handled = 0
+        while True:
+            kind, message = generator.message()
+            # The gateway only sends a shard the events of the servers it owns
+            if shard_of(message.server.id, self.fake_shard_count) != self.fake_shard_id:
+                continue
+            await self.on_message(message)
+            handled += 1
+            Metrics.METRICS.count('fake.shard.{}'.format(self.fake_shard_id))
+            if self.crash_after is not None and handled >= self.crash_after and self.crash_file is not None \
+                    and os.path.exists(self.crash_file):
+                os.remove(self.crash_file)
+                raise RuntimeError('Shard {} crashed on purpose'.format(self.fake_shard_id))
+            # Paces the traffic so the shards of a worker take turns
+            if handled % 50 == 0:
+                await asyncio.sleep(0.001)
@@ -0,0 +1,84 @@
+""" Compares sending the hot Database.py queries as text against running them as prepared statements.  Needs the
+database in Config.yaml to have the bot's schema, and the server and team given on the command line to exist.
+
+Run from the root of the repo with:
+    python -m Benchmarks.PreparedStatements server-id team-role-id [iterations]
+"""
+import re  # Used to turn the prepared statements back into text queries
+import sys  # Used to read the command line arguments
+import time  # Used to time the queries
+import Database  # Used to get pooled connections to the database
+import Statements  # Holds the prepared statements being measured
+
+
+def as_text_query(name):
+    """ Turns a prepared statement into a text query that uses psycopg2 placeholders, the way the queries were sent
+    before they were prepared.
+
+    :param name: The name of the statement in Statements.STATEMENTS.
+    :type name: str
+
+    :return: The text query and the order its placeholders use the given values in.
+    :rtype: tuple
+    """
+    sql = Statements.STATEMENTS[name]
+    # The position of the value used by each placeholder, in the order the placeholders appear
+    order = [int(number) - 1 for number in re.findall(r'\$(\d+)', sql)]
+    return re.sub(r'\$\d+', '%s', sql), order
+
+
+def time_queries(cursor, run, iterations):
+    """ Times a query function, rolling back after each call so updates don't change the data.
+
+    :param cursor: The cursor the queries are ran with.
+    :type cursor: psycopg2.extensions.cursor
+
+    :param run: The function that runs the query once.
+    :type run: function
+
+    :param iterations: The number of times the query is ran.
+    :type iterations: int
+
+    :return: The average number of microseconds per query.
+    :rtype: float
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        run()
+        cursor.connection.rollback()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def planning_time(cursor, sql, params):
+    """ Gets the time the server spends planning a text query.
+
+    :return: The planning time in milliseconds, as reported by EXPLAIN ANALYZE.
+    :rtype: float
+    """
+    cursor.execute('EXPLAIN (ANALYZE, SUMMARY) ' + sql, params)
+    plan = '\n'.join(row[0] for row in cursor.fetchall())
+    cursor.connection.rollback()
+    return float(re.search(r'Planning Time: ([\d.]+) ms', plan).group(1))
+
+
+def main(server, team, iterations=2000):
+    # The values each statement is ran with
+    cases = {
+        'get_players': (server, team),
+        'set_team': (server, '0', team),
+        'update_game_scores': (1, 0, 0, team, server, 1, 3, 1, 0),
+        'update_settings_c_symbol': ('!', '0', 'benchmark', '{}'),
+    }
+    with Database.connect() as cursor:
+        print('{:<26} {:>10} {:>10} {:>12}'.format('statement', 'text us', 'prepared us', 'planning ms'))
+        for name, params in cases.items():
+            sql, order = as_text_query(name)
+            text_params = tuple(params[i] for i in order)
+            text_time = time_queries(cursor, lambda: cursor.execute(sql, text_params), iterations)
+            prepared_time = time_queries(cursor, lambda: Statements.execute(cursor, name, params), iterations)
+            print('{:<26} {:>10.1f} {:>10.1f} {:>12.3f}'.format(name, text_time, prepared_time,
+                                                              planning_time(cursor, sql, text_params)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], sys.argv[2], *[int(arg) for arg in sys.argv[3:4]])
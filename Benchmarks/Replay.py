@@ -0,0 +1,310 @@
+""" Replays synthetic discord traffic through Main.on_message and reports the bot's throughput and the latency of each
+command.  By default the database is replaced with an in-memory stub so only the bot's own work is measured, use
+--backend postgres to run the commands against the postgres database in Config.yaml, or --backend sqlite to run them
+against a new sqlite database in a temporary folder, so the latency of each command can be compared between backends.
+Each run is saved to Benchmarks/results so it can be compared with later runs.
+
+Run from the root of the repo with:
+    python -m Benchmarks.Replay [--messages 20000] [--mix chat=95,addplayer=2,mentionteam=2,score=1]
+        [--backend stub|postgres|sqlite]
+"""
+import argparse  # Used to read the command line arguments
+import asyncio  # Used to run on_message
+import glob  # Used to find the results of earlier runs
+import json  # Used to save the results
+import os  # Used to build the paths of the results
+import random  # Used to generate the traffic
+import tempfile  # Used to hold the sqlite database of a run
+import time  # Used to time the messages
+from types import SimpleNamespace  # Used to build the fake discord objects
+import AsyncDatabase  # Replaced by the stub backend
+import Database  # Used to point the database functions at the backend being measured
+import Main  # Holds on_message, which is being measured
+import Settings  # Used to store the settings given by the stub backend
+
+# The folder the results of each run are saved in
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class StubBackend:
+    """ An in-memory stand in for the AsyncDatabase functions used by the benchmarked commands.  Can wait for a fixed
+    time on each call to act like a database round trip.
+    """
+
+    def __init__(self, latency=0.0, teams=40):
+        """ Creates an empty backend.
+
+        :param latency: The number of seconds each call waits for.
+        :type latency: float
+
+        :param teams: The number of teams in each server, which are paired up into the matches of every round.
+        :type teams: int
+        """
+        self.latency = latency
+        self.teams = [str(3 * 10 ** 17 + number) for number in range(teams)]
+        # The ign and team of each player, keyed by the server and the player's discord id
+        self.players = dict()
+        # The reported scores of each team, keyed by the server, round, and team
+        self.scores = dict()
+
+    async def _wait(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get_server_settings(self, server):
+        await self._wait()
+        Settings.SERVER_SETTINGS.put(server, Settings.SERVER_DEFAULTS)
+        return Settings.SERVER_DEFAULTS
+
+    async def add_player(self, server, discord, ign):
+        await self._wait()
+        if (server, discord) in self.players:
+            return False
+        self.players[(server, discord)] = [ign, None]
+        return True
+
+    async def change_ign(self, server, discord, ign):
+        await self._wait()
+        player = self.players.get((server, discord))
+        if player is None:
+            return False
+        player[0] = ign
+        return True
+
+    async def join_team(self, server, discord, team):
+        await self._wait()
+        player = self.players.get((server, discord))
+        if player is None:
+            return 2
+        player[1] = team
+        return 0
+
+    async def get_players(self, server, team, ign=False):
+        await self._wait()
+        return [(discord, player[0]) for (player_server, discord), player in self.players.items()
+                if player_server == server and player[1] == team]
+
+    async def update_game_scores(self, server, season, match_round, team, given_team_score, other_team_score):
+        await self._wait()
+        key = (server, match_round, team)
+        if key in self.scores:
+            raise Database.GameNotReported('The game was already reported', 0)
+        self.scores[key] = (given_team_score, other_team_score)
+        # Marks the game in the match index like a committed report does
+        Database.MATCH_INDEX.reported(server, season, match_round, team)
+        return True
+
+    async def get_round_matches(self, server, season, match_round):
+        await self._wait()
+        return [(number, team_1, team_2, (server, match_round, team_1) in self.scores
+                 or (server, match_round, team_2) in self.scores)
+                for number, (team_1, team_2) in enumerate(zip(self.teams[::2], self.teams[1::2]))]
+
+    def install(self):
+        """ Replaces the AsyncDatabase functions with the stub's methods.
+        """
+        for name in ('get_server_settings', 'add_player', 'change_ign', 'join_team', 'get_players',
+                     'update_game_scores', 'get_round_matches'):
+            setattr(AsyncDatabase, name, getattr(self, name))
+
+
+class TrafficGenerator:
+    """ Builds fake discord messages in a configurable mix of normal chat and commands.
+    """
+
+    def __init__(self, mix, servers=50, members=500, teams=40, seed=0):
+        """ Creates the generator.
+
+        :param mix: The weight of each kind of message, keyed by 'chat' or the name of a command.
+        :type mix: dict
+
+        :param servers: The number of servers the messages are spread over.
+        :type servers: int
+
+        :param members: The number of members in each server.
+        :type members: int
+
+        :param teams: The number of teams in each server.
+        :type teams: int
+
+        :param seed: The seed of the random number generator.
+        :type seed: int
+        """
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.rng = random.Random(seed)
+        self.servers = [SimpleNamespace(id=str(10 ** 17 + number), name='server-{}'.format(number))
+                        for number in range(servers)]
+        self.members = members
+        self.teams = teams
+        # Every member of every server is an admin so admin commands can be benchmarked too
+        self.permissions = SimpleNamespace(administrator=True)
+
+    def message(self):
+        """ Builds the next message.
+
+        :return: The kind of the message and the fake message.
+        :rtype: tuple
+        """
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        server = self.rng.choice(self.servers)
+        member = str(2 * 10 ** 17 + self.rng.randrange(self.members))
+        team = str(3 * 10 ** 17 + self.rng.randrange(self.teams))
+        roles = list()
+        if kind == 'chat':
+            content = ' '.join(self.rng.choice(('gg', 'nice', 'who is playing tonight', 'lol', 'ready?', '"quoted"'))
+                               for _ in range(self.rng.randint(1, 12)))
+        elif kind in ('addplayer', 'changeign'):
+            content = '!{} "ign {}"'.format(kind, member[-6:])
+        elif kind == 'score':
+            content = '!score {} {} <@&{}>'.format(self.rng.randint(0, 7), self.rng.randint(0, 7), team)
+            roles = [team]
+        else:
+            content = '!{} <@&{}>'.format(kind, team)
+            roles = [team]
+        author = SimpleNamespace(id=member, roles=[SimpleNamespace(id=team)], server_permissions=self.permissions)
+        channel = SimpleNamespace(id=server.id)
+        return kind, SimpleNamespace(server=server, content=content, author=author, channel=channel,
+                                     raw_role_mentions=roles, attachments=[])
+
+
+def seed_teams(generator):
+    """ Adds the teams of the generated traffic to the database, so the team commands find their teams, and pairs them
+    up into the matches of the first round so the score command has games to report.
+
+    :param generator: The generator of the traffic.
+    :type generator: TrafficGenerator
+    """
+    teams = [(server.id, str(3 * 10 ** 17 + number))
+             for server in generator.servers for number in range(generator.teams)]
+    with Database.connect(commit=True) as cursor:
+        cursor.executemany("""INSERT INTO "Teams"(server, discord) VALUES (%s, %s)
+            ON CONFLICT (server, discord) DO NOTHING""", teams)
+        # Skips the matches if an earlier run already added them
+        cursor.execute("""SELECT EXISTS (SELECT 1 FROM "Matches" WHERE round = %s)""",
+                       (Settings.SERVER_DEFAULTS.current_round,))
+        if cursor.fetchone()[0]:
+            return
+        matches = list()
+        for server in generator.servers:
+            cursor.execute("""SELECT id FROM "Teams" WHERE server = %s ORDER BY discord""", (server.id,))
+            ids = [row[0] for row in cursor.fetchall()]
+            matches.extend((server.id, Settings.SERVER_DEFAULTS.current_season, Settings.SERVER_DEFAULTS.current_round,
+                            team_1, team_2) for team_1, team_2 in zip(ids[::2], ids[1::2]))
+        cursor.executemany("""INSERT INTO "Matches"(server, season, round, team_1, team_2)
+            VALUES (%s, %s, %s, %s, %s)""", matches)
+
+
+def percentile(values, fraction):
+    """ Gets a percentile of a sorted list of values.
+    """
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def replay(generator, messages, concurrency):
+    """ Sends messages through on_message, with up to the given number of messages being handled at once.
+
+    :return: The total number of seconds taken, and the latencies of each kind of message in seconds.
+    :rtype: tuple
+    """
+    latencies = {kind: list() for kind in generator.kinds}
+
+    async def handle(kind, message):
+        start = time.perf_counter()
+        await Main.on_message(message)
+        latencies[kind].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for first in range(0, messages, concurrency):
+        await asyncio.gather(*[handle(*generator.message()) for _ in range(min(concurrency, messages - first))])
+    return time.perf_counter() - start, latencies
+
+
+def summarize(args, elapsed, latencies, sent):
+    """ Builds the results of a run.
+
+    :rtype: dict
+    """
+    commands = dict()
+    for kind, values in latencies.items():
+        if values:
+            values.sort()
+            commands[kind] = {'count': len(values), 'p50_us': percentile(values, 0.5) * 1e6,
+                              'p99_us': percentile(values, 0.99) * 1e6}
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'backend': args.backend, 'mix': args.mix,
+            'messages': args.messages, 'concurrency': args.concurrency, 'latency': args.latency,
+            'rate_limit': args.rate_limit, 'messages_per_second': args.messages / elapsed, 'replies': sent,
+            'commands': commands}
+
+
+def latest_result(backend, mix):
+    """ Finds the most recent saved run that used the same backend and traffic mix.
+
+    :rtype: dict, None
+    """
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, 'replay-*.json')), reverse=True):
+        with open(path) as result_file:
+            result = json.load(result_file)
+        if result.get('backend') == backend and result.get('mix') == mix:
+            return result
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays synthetic traffic through Main.on_message')
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--mix', default='chat=95,addplayer=2,mentionteam=2,score=1',
+                        help='comma separated weights of chat and each command')
+    parser.add_argument('--concurrency', type=int, default=50, help='messages handled at once')
+    parser.add_argument('--backend', choices=('stub', 'postgres', 'sqlite'), default='stub')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds each stub database call takes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='keep the rate limits from Config.yaml instead of letting every command through')
+    args = parser.parse_args()
+
+    mix = {kind: float(weight) for kind, weight in (pair.split('=') for pair in args.mix.split(','))}
+    generator = TrafficGenerator(mix, seed=args.seed)
+    if args.backend == 'stub':
+        StubBackend(args.latency, generator.teams).install()
+    else:
+        if args.backend == 'sqlite':
+            Settings.DB_SQLITE_PATH = os.path.join(tempfile.mkdtemp(), 'replay.db')
+        Database.POOL = Database.make_pool(args.backend)
+        seed_teams(generator)
+    # The synthetic traffic is far faster than real members, so the limits would reject most of it
+    if not args.rate_limit:
+        Main.limiter.default_cost = 0
+        Main.limiter.costs = dict()
+    # Counts the replies instead of sending them to discord, after they have gone through the outbound queue
+    sent = [0]
+
+    async def send_message(destination, content=None, **kwargs):
+        sent[0] += 1
+
+    Main.client.outbound.sender = send_message
+
+    loop = asyncio.get_event_loop()
+    elapsed, latencies = loop.run_until_complete(
+        replay(generator, args.messages, args.concurrency))
+    result = summarize(args, elapsed, latencies, sent[0])
+
+    print('{:.0f} messages per second, {} replies'.format(result['messages_per_second'], result['replies']))
+    print('{:<14} {:>8} {:>10} {:>10}'.format('kind', 'count', 'p50 us', 'p99 us'))
+    for kind, stats in sorted(result['commands'].items()):
+        print('{:<14} {:>8} {:>10.1f} {:>10.1f}'.format(kind, stats['count'], stats['p50_us'], stats['p99_us']))
+    # Compares the run with the last one like it so regressions stand out
+    previous = latest_result(args.backend, args.mix)
+    if previous is not None:
+        print('Previous run at {}: {:.0f} messages per second ({:+.1f}%)'.format(
+            previous['time'], previous['messages_per_second'],
+            (result['messages_per_second'] / previous['messages_per_second'] - 1) * 100))
+    # Saves the run
+    path = os.path.join(RESULTS_DIR, 'replay-{}.json'.format(int(time.time() * 1000)))
+    with open(path, 'w') as result_file:
+        json.dump(result, result_file, indent=2, sort_keys=True)
+    print('Saved the results to {}'.format(path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+""" Compares writing a season's schedule with Database.create_schedule's batched inserts against inserting one match
+at a time.  Synthetic teams are created for the run and everything is rolled back afterwards.  Run Migrations.py first
+so the schema exists.
+
+Run from the root of the repo with:
+    python -m Benchmarks.Scheduler [teams]
+"""
+import sys  # Used to read the command line arguments
+import time  # Used to time the inserts
+import psycopg2.extras  # Used for the batched inserts
+import Database  # Used to get pooled connections to the database
+import Scheduler  # Used to create the schedule that is inserted
+
+# The discord id of the synthetic server, which doesn't clash with real discord ids
+SERVER = 'schedule-benchmark'
+
+
+def insert_one_at_a_time(cursor, values):
+    """ Inserts each match with its own statement.
+    """
+    for row in values:
+        cursor.execute("""INSERT INTO "Matches"(server, season, round, team_1, team_2) VALUES (%s, %s, %s, %s, %s)""",
+                       row)
+
+
+def insert_batched(cursor, values):
+    """ Inserts the matches the same way Database.create_schedule does.
+    """
+    psycopg2.extras.execute_values(cursor, """INSERT INTO "Matches"(server, season, round, team_1, team_2)
+        VALUES %s""", values, page_size=1000)
+
+
+def main(teams=200):
+    with Database.connect() as cursor:
+        # Creates the synthetic teams
+        cursor.execute("""INSERT INTO "Teams"(server, discord) SELECT %s, 'team-' || i FROM generate_series(1, %s) i
+            RETURNING id""", (SERVER, teams))
+        team_ids = [row[0] for row in cursor]
+        # Times generating the schedule
+        start = time.perf_counter()
+        rounds = Scheduler.round_robin(team_ids)
+        generate_time = time.perf_counter() - start
+        values = [(SERVER, 1, number, team_1, team_2)
+                  for number, matches in enumerate(rounds, 1) for team_1, team_2 in matches]
+        print('{} teams, {} rounds, {} matches, generated in {:.1f}ms'
+              .format(teams, len(rounds), len(values), generate_time * 1e3))
+        # Times each way of inserting the matches, undoing the inserts after each one
+        for name, insert in (('one at a time', insert_one_at_a_time), ('batched', insert_batched)):
+            cursor.execute('SAVEPOINT schedule;')
+            start = time.perf_counter()
+            insert(cursor, values)
+            print('{:<14} {:>10.1f}ms'.format(name, (time.perf_counter() - start) * 1e3))
+            cursor.execute('ROLLBACK TO SAVEPOINT schedule;')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,107 @@
+""" Seeds a large synthetic league into the database in Config.yaml and reports EXPLAIN ANALYZE timings for each of the
+queries in Database.py.  Run Migrations.py first so the schema and its indexes exist.
+
+Run from the root of the repo with:
+    python -m Benchmarks.SeedLeague [teams] [players-per-team] [rounds]
+"""
+import re  # Used to find the execution times in the query plans
+import sys  # Used to read the command line arguments
+import Database  # Used to get pooled connections to the database
+from Benchmarks.PreparedStatements import as_text_query  # Used to explain the prepared statements as text queries
+
+# The discord id of the synthetic server, which doesn't clash with real discord ids
+SERVER = 'seed-league'
+
+
+def seed(cursor, teams, players_per_team, rounds):
+    """ Fills the database with a synthetic league, replacing any league seeded before.
+
+    :param cursor: The cursor to use.
+    :type cursor: psycopg2.extensions.cursor
+
+    :param teams: The number of teams in the league.
+    :type teams: int
+
+    :param players_per_team: The number of players on each team.
+    :type players_per_team: int
+
+    :param rounds: The number of rounds of matches, where every team plays once per round.
+    :type rounds: int
+    """
+    # Removes the league that was seeded before
+    cursor.execute("""DELETE FROM "Matches" WHERE server = %s;""", (SERVER,))
+    cursor.execute("""DELETE FROM "Players" WHERE server = %s;""", (SERVER,))
+    cursor.execute("""DELETE FROM "Teams" WHERE server = %s;""", (SERVER,))
+    cursor.execute("""DELETE FROM "Settings" WHERE server = %s;""", (SERVER,))
+    # Creates the settings, teams, and players of the league
+    cursor.execute("""INSERT INTO "Settings"(server, c_symbol, game_type, current_season, current_round, team_size)
+        VALUES (%s, '!', 'r6s', 1, 1, %s);""", (SERVER, players_per_team))
+    cursor.execute("""INSERT INTO "Teams"(server, discord)
+        SELECT %s, 'team-' || i FROM generate_series(1, %s) i;""", (SERVER, teams))
+    cursor.execute("""INSERT INTO "Players"(server, discord, ign, team)
+        SELECT %s, 'player-' || i, 'ign-' || i, t.id FROM generate_series(0, %s) i
+        JOIN "Teams" t ON t.server = %s AND t.discord = 'team-' || (i / %s + 1);""",
+                   (SERVER, teams * players_per_team - 1, SERVER, players_per_team))
+    # Pairs the teams up in each round, leaving the games of the last round unreported
+    cursor.execute("""INSERT INTO "Matches"(server, round, team_1, team_2, team_1_score, team_2_score)
+        SELECT %s, r, t1.id, t2.id, CASE WHEN r < %s THEN 7 END, CASE WHEN r < %s THEN 5 END
+        FROM generate_series(1, %s) r, generate_series(0, %s) j
+        JOIN "Teams" t1 ON t1.server = %s AND t1.discord = 'team-' || (2 * j + 1)
+        JOIN "Teams" t2 ON t2.server = %s AND t2.discord = 'team-' || (2 * j + 2);""",
+                   (SERVER, rounds, rounds, rounds, teams // 2 - 1, SERVER, SERVER))
+    cursor.execute("""ANALYZE "Settings", "Teams", "Players", "Matches";""")
+
+
+def explain(cursor, sql, params):
+    """ Runs a query with EXPLAIN ANALYZE and rolls back any changes it made.
+
+    :return: The planning and execution times of the query in milliseconds.
+    :rtype: tuple
+    """
+    cursor.execute('SAVEPOINT explain;')
+    cursor.execute('EXPLAIN (ANALYZE, SUMMARY) ' + sql, params)
+    plan = '\n'.join(row[0] for row in cursor.fetchall())
+    cursor.execute('ROLLBACK TO SAVEPOINT explain;')
+    planning = float(re.search(r'Planning Time: ([\d.]+) ms', plan).group(1))
+    execution = float(re.search(r'Execution Time: ([\d.]+) ms', plan).group(1))
+    return planning, execution
+
+
+def prepared(name, params):
+    """ Gets the text version of a prepared statement along with its values in placeholder order.
+
+    :return: The sql and the values.
+    :rtype: tuple
+    """
+    sql, order = as_text_query(name)
+    return sql, tuple(params[i] for i in order)
+
+
+def main(teams=2000, players_per_team=6, rounds=20):
+    # The queries of Database.py with values that hit the seeded league
+    queries = [
+        ('get_settings', """SELECT server, c_symbol, game_type, current_season, current_round, admin_role,
+            team_size FROM "Settings";""", ()),
+        ('get_server_settings', """SELECT c_symbol, game_type, current_season, current_round, admin_role,
+            team_size FROM "Settings" WHERE server = %s;""", (SERVER,)),
+        ('update_settings', ) + prepared('update_settings_current_round', (2, SERVER, 'seed', '{}')),
+        ('add_player', """INSERT INTO "Players"(server, discord, ign) VALUES (%s, %s, %s);""",
+         (SERVER, 'new-player', 'new-ign')),
+        ('change_ign', """UPDATE "Players" p SET ign=%s WHERE server=%s AND discord=%s
+            RETURNING (SELECT t.discord FROM "Teams" t WHERE t.id=p.team)""", ('renamed', SERVER, 'player-0')),
+        ('set_team', ) + prepared('set_team', (SERVER, 'player-0', 'team-2')),
+        ('get_players', ) + prepared('get_players', (SERVER, 'team-1')),
+        ('update_game_scores', ) + prepared('update_game_scores', (7, 3, rounds, 'team-1', SERVER, 1, 3, 1, 0)),
+    ]
+    with Database.connect(commit=True) as cursor:
+        seed(cursor, teams, players_per_team, rounds)
+    with Database.connect() as cursor:
+        print('Seeded {} teams, {} players, and {} matches'.format(teams, teams * players_per_team,
+                                                                  teams // 2 * rounds))
+        print('{:<22} {:>12} {:>12}'.format('query', 'planning ms', 'execution ms'))
+        for name, sql, params in queries:
+            print('{:<22} {:>12.3f} {:>12.3f}'.format(name, *explain(cursor, sql, params)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:4]])
@@ -0,0 +1,91 @@
+""" Runs the launcher with workers that get their messages from a fake gateway instead of discord, then checks that
+every shard was handled by the worker it was assigned to and that a worker which crashes is restarted.
+
+Run from the root of the repo with:
+    python -m Benchmarks.Shards --workers 2 --shards 4 --seconds 20
+"""
+import argparse  # Used to read the options of the run
+import os  # Used to remove the file that makes a shard crash
+import sys  # Used to exit with an error when a check fails
+import tempfile  # Used to make the file that makes a shard crash
+import time  # Used to run the workers for a set time
+import Launcher  # Holds the supervisor being checked
+import Metrics  # Used to read the counters sent by the workers
+
+# The client type the workers run, which delivers fake traffic instead of connecting to discord
+CLIENT_PATH = 'Benchmarks.FakeGateway:FakeGatewayClient'
+
+
+def check(supervisor, crash_shard):
+    """ Checks the stats sent by the workers.
+
+    :param supervisor: The supervisor that ran the workers.
+    :type supervisor: Launcher.Supervisor
+
+    :param crash_shard: The shard that was made to crash, or None if no shard crashed.
+    :type crash_shard: int, None
+
+    :return: The checks that failed.
+    :rtype: list
+    """
+    failures = list()
+    for worker in supervisor.workers:
+        if worker.snapshot is None:
+            failures.append('Worker {} sent no stats'.format(worker.id))
+            continue
+        counters = worker.snapshot['counters']
+        handled = {int(name.rsplit('.', 1)[1]) for name, value in counters.items()
+                   if name.startswith('fake.shard.') and value > 0}
+        if handled != set(worker.shard_ids):
+            failures.append('Worker {} handled shards {} instead of {}'.format(
+                worker.id, sorted(handled), worker.shard_ids))
+        if worker.snapshot['histograms'].get('on_message', (None, 0))[1] == 0:
+            failures.append('Worker {} handled no messages'.format(worker.id))
+    if crash_shard is not None:
+        crashed = [worker for worker in supervisor.workers if crash_shard in worker.shard_ids][0]
+        if crashed.restarts == 0:
+            failures.append('Worker {} was not restarted after shard {} crashed'.format(crashed.id, crash_shard))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs the launcher on a fake gateway and checks the shards')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=20, help='how long to run the workers for')
+    parser.add_argument('--crash-shard', type=int, default=0, help='the shard that crashes once, or -1 for none')
+    parser.add_argument('--stats-interval', type=float, default=1)
+    args = parser.parse_args()
+
+    crash_shard = args.crash_shard if args.crash_shard >= 0 else None
+    # The crashing shard removes the file when it crashes, so its worker only crashes once
+    crash_file = tempfile.NamedTemporaryFile(prefix='shards-crash-', delete=False).name
+    options = {'crash_shard': crash_shard, 'crash_file': crash_file}
+    try:
+        supervisor = Launcher.Supervisor(args.workers, args.shards, args=(CLIENT_PATH, options),
+                                         stats_interval=args.stats_interval, restart_delay=0.5)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    supervisor.start()
+    try:
+        end = time.monotonic() + args.seconds
+        while time.monotonic() < end:
+            supervisor.poll(args.stats_interval)
+        print('\n'.join(supervisor.report()))
+        failures = check(supervisor, crash_shard)
+    finally:
+        supervisor.stop()
+        if os.path.exists(crash_file):
+            os.remove(crash_file)
+    crashes = Metrics.METRICS.counters.get('launcher.crashes', 0)
+    print('{} crashes, {} restarts'.format(crashes, Metrics.METRICS.counters.get('launcher.restarts', 0)))
+    for failure in failures:
+        print('FAILED: ' + failure)
+    if failures:
+        sys.exit(1)
+    print('Every shard was handled by its worker')
+
+
+if __name__ == '__main__':
+    main()
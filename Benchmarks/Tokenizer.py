@@ -0,0 +1,80 @@
+""" Times Commands.get_args against the character by character tokenizer it replaced.  The check that both give the
+same arguments is in tests/test_tokenizer.py.
+
+Run from the root of the repo with:
+    python -m Benchmarks.Tokenizer
+"""
+import random  # Used to generate the messages that are tokenized
+import timeit  # Used to time the tokenizers
+import Commands  # Holds the tokenizer being measured
+
+# The characters used to build random messages, weighted towards the ones that matter to the tokenizer
+ALPHABET = 'abcdefghij     ""<@&>0123456789'
+
+
+def legacy_get_args(message):
+    """ The tokenizer that get_args replaced, kept to check that the quoting rules didn't change.
+
+    :param message: The message to be split into a list of arguments.
+    :type message: str
+
+    :return: The list of arguments.
+    :rtype: list
+    """
+    message_args = list()
+    temp_arg = ''
+    quote_already_seen = False
+    for c in message:
+        if ((c != ' ' and c != '"') and not quote_already_seen) or (c != '"' and quote_already_seen):
+            temp_arg += c
+        elif ((c == '"' and quote_already_seen) or (c == ' ' and not quote_already_seen)) and len(temp_arg) > 0:
+            message_args.append(temp_arg)
+            temp_arg = ''
+            quote_already_seen = False
+        elif c == '"' and not quote_already_seen:
+            quote_already_seen = True
+    if len(message_args) != 0 and len(temp_arg) > 0:
+        message_args.append(temp_arg)
+    return message_args
+
+
+def random_message(rng, length):
+    """ Builds a random message out of the characters in ALPHABET.
+
+    :param rng: The random number generator to use.
+    :type rng: random.Random
+
+    :param length: The number of characters in the message.
+    :type length: int
+
+    :return: The random message.
+    :rtype: str
+    """
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def benchmark(length=2000, number=200, seed=0):
+    """ Times both tokenizers on a long random message.
+
+    :param length: The number of characters in the message.
+    :type length: int
+
+    :param number: The number of times each tokenizer is ran.
+    :type number: int
+
+    :param seed: The seed of the random number generator.
+    :type seed: int
+
+    :return: The average number of microseconds per call of the legacy tokenizer and get_args.
+    :rtype: tuple
+    """
+    message = random_message(random.Random(seed), length)
+    legacy = min(timeit.repeat(lambda: legacy_get_args(message), number=number, repeat=5)) / number
+    current = min(timeit.repeat(lambda: Commands.get_args(message), number=number, repeat=5)) / number
+    return legacy * 1e6, current * 1e6
+
+
+if __name__ == '__main__':
+    legacy_time, current_time = benchmark()
+    print('2000 character message: legacy {:.1f}us, get_args {:.1f}us ({:.1f}x faster)'
+          .format(legacy_time, current_time, legacy_time / current_time))
@@ -0,0 +1,99 @@
+import collections  # Used to keep the cached entries in least recently used order
+import threading  # Used to make the cache safe to use from the database threads
+import time  # Used to expire entries that are older than the cache's time to live
+
+
+class LRUCache:
+    """ A thread safe cache that holds a bounded number of entries, evicting the least recently used entry when it is
+    full and treating entries older than its time to live as missing.  Counts its hits and misses.
+    """
+
+    def __init__(self, max_size, ttl):
+        """ Creates an empty cache.
+
+        :param max_size: The largest number of entries the cache can hold.
+        :type max_size: int
+
+        :param ttl: The number of seconds an entry can be used for after it was cached.
+        :type ttl: float
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        # The number of lookups that found a usable entry
+        self.hits = 0
+        # The number of lookups that had to go to the database
+        self.misses = 0
+        # Increased whenever an entry is invalidated, so values loaded before the invalidation are not cached
+        self.version = 0
+        # The cached entries, mapping keys to tuples of the time the entry expires and the value
+        self._entries = collections.OrderedDict()
+        # Used to keep the database threads from changing the cache at the same time
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Gets an entry from the cache.
+
+        :param key: The key of the entry.
+
+        :return: The cached value, or None if the key isn't cached or its entry has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            # Counts expired entries as misses and removes them
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            # Marks the entry as the most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, version=None):
+        """ Adds an entry to the cache, evicting the least recently used entry if the cache is full.
+
+        :param key: The key of the entry.
+
+        :param value: The value to be cached.
+
+        :param version: The cache's version from before the value was loaded.  If an entry was invalidated since then
+        the value may be stale, so it isn't cached.
+        :type version: int, None
+        """
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            # Evicts the least recently used entries until the cache is back within its size
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """ Removes an entry from the cache.
+
+        :param key: The key of the entry to be removed.
+        """
+        with self._lock:
+            self.version += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """ Removes all of the entries from the cache.
+        """
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self):
+        """ Gets the hit and miss counts of the cache.
+
+        :return: A dictionary with the cache's size, hits, misses, and hit rate.
+        :rtype: dict
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
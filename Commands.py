@@ -0,0 +1,112 @@
+import collections  # Used to create the record type that describes each command
+import re  # Used to split messages into their arguments
+
+# Matches a single argument of a message.  The first two groups are an optional word prefix and the quoted section
+# that follows it, and the third group is a word with no quotes in it.  The closing quote is optional so a quote that
+# is never closed runs to the end of the message.
+ARG_PATTERN = re.compile(r'([^ "]*)"([^"]*)"?|([^ "]+)')
+
+# Matches the name of a command, which ends at the first space or new line
+NAME_PATTERN = re.compile(r'\S*')
+
+# Describes a command the bot responds to.
+# name is the name of the command without the command symbol.
+# handler is the coroutine ran for the command, and is given the message, its arguments, and the server's settings.
+# number_of_args is the number of arguments the command needs including the command itself, None if it can vary.
+# number_of_roles is the number of role mentions the command needs, None if it doesn't matter.
+# usage is the message sent when the command is used wrong, formatted with the author's id and the command symbol.
+# admin_only says if only the server's admins can use the command.
+Command = collections.namedtuple('Command', ['name', 'handler', 'number_of_args', 'number_of_roles', 'usage',
+                                             'admin_only'])
+
+# The commands the bot responds to, where the key is the name of the command without the command symbol
+COMMANDS = dict()
+
+
+def command(name, number_of_args=None, number_of_roles=None, usage=None, admin_only=False):
+    """ Decorator that registers a coroutine as the handler of a command.
+
+    :param name: The name of the command, without the command symbol.
+    :type name: str
+
+    :param number_of_args: The number of arguments needed including the command itself, or None if it can vary.
+    :type number_of_args: int, None
+
+    :param number_of_roles: The number of role mentions needed, or None if it doesn't matter.
+    :type number_of_roles: int, None
+
+    :param usage: The message sent when the command is used wrong.  Is formatted with the id of the message's author
+    as the first value and the server's command symbol as the second value.
+    :type usage: str, None
+
+    :param admin_only: Says if only the server's admins can use the command.
+    :type admin_only: bool
+
+    :return: The decorator that registers the handler.
+    :rtype: function
+    """
+    def decorator(handler):
+        # Adds the command to the registry
+        COMMANDS[name] = Command(name, handler, number_of_args, number_of_roles, usage, admin_only)
+        return handler
+    return decorator
+
+
+def get_command(content, c_symbol):
+    """ Finds the command that a message is using.  Messages that don't start with the command symbol are rejected
+    before any other work is done, so normal chat costs as little as possible.
+
+    :param content: The content of the message.
+    :type content: str
+
+    :param c_symbol: The command symbol of the server the message was sent in.
+    :type c_symbol: str
+
+    :return: The command used by the message, or None if the message isn't a command.
+    :rtype: Command, None
+    """
+    # Normal chat doesn't start with the command symbol
+    if not content.startswith(c_symbol):
+        return None
+    # Looks up the command by its name, which runs from the command symbol up to the first whitespace
+    return COMMANDS.get(NAME_PATTERN.match(content, len(c_symbol)).group())
+
+
+def check_usage(cmd, args, roles):
+    """ Checks that a command was given the number of arguments and role mentions it needs.
+
+    :param cmd: The command that was used.
+    :type cmd: Command
+
+    :param args: The arguments of the message, including the command itself.
+    :type args: list
+
+    :param roles: The role ids mentioned in the message.
+    :type roles: list
+
+    :return: Whether or not the command was used properly.
+    :rtype: bool
+    """
+    if cmd.number_of_args is not None and len(args) != cmd.number_of_args:
+        return False
+    if cmd.number_of_roles is not None and len(roles) != cmd.number_of_roles:
+        return False
+    return True
+
+
+def get_args(message):
+    """ Takes a string and separates it into a list of it's arguments.  Arguments are separated by spaces, and
+    multi-word arguments are contained within a string.  If the message string starts with the command that was used,
+    then the first item in the list will be the command used.  A quote that is never closed runs to the end of the
+    message, and empty arguments such as `""` are left out.
+
+    :param message: The message that you would like to have split into a list of arguments.
+    :type message: str
+
+    :return: The list of arguments.
+    :rtype: list
+    """
+    # Each match is either a word with no quotes in it, or a quoted section along with any word characters that came
+    # right before its opening quote.  Only the non-empty arguments are kept.
+    return [word or prefix + quoted for prefix, quoted, word in ARG_PATTERN.findall(message)
+            if word or prefix or quoted]
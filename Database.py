@@ -1,73 +1,269 @@
 import psycopg2  # Used to connect to the postgresql database
+import psycopg2.extras  # Used to insert many rows with a single statement
+import sqlite3  # Used to recognize the errors of the sqlite backend
 import Settings  # Holds necessary globals such as database connection strings obtained from the Config.yaml file
-import logging  # Used to log errors and values in the log file
-import datetime  # Used to log times of errors
+import Pool  # Used to reuse database connections between queries instead of reconnecting every time
+import SQLite  # Used to keep the data of small leagues in a sqlite file instead of a postgres server
+import Cache  # Used to cache team rosters so they aren't read from the database on every command
+import MatchIndex  # Used to keep the matches of each server's current round in memory
+import SettingsStore  # Used to create the records that hold each server's settings
+import Statements  # Used to run the most common queries as prepared statements
+import Metrics  # Used to time how long queries wait for a connection and how long they run for
+import time  # Used to time the connection and queries
+import json  # Used to encode the setting changes sent to the other bot processes
+import uuid  # Used to give this process an id so it can ignore its own setting change notifications
+import functools  # Used to keep the docstrings of the operations on the functions that run them on their own
 from contextlib import contextmanager  # Used to make connecting to the database and logging errors easier
 
-# Sets up error logging
-logging.basicConfig(filename=Settings.LOG, level=logging.ERROR)  # Sets errors to be written to
 
+def make_pool(backend):
+    """ Creates the connection pool of a backend using the settings in the Config.yaml file.
 
-@contextmanager
-def connect(conn_string=Settings.DB_CONN_STRING, commit=False):
-    """ Used to connect to the database. Use the cursor object to do any queries.
+    :param backend: The name of the backend, either postgres or sqlite.
+    :type backend: str
+
+    :return: The connection pool, which decides the queries that are ran on its connections.
+    :rtype: Pool.ConnectionPool
+    """
+    if backend == 'sqlite':
+        pool_type, database = SQLite.ConnectionPool, Settings.DB_SQLITE_PATH
+    else:
+        pool_type, database = Pool.ConnectionPool, Settings.DB_CONN_STRING
+    return pool_type(database, min_size=Settings.DB_POOL_MIN_SIZE, max_size=Settings.DB_POOL_MAX_SIZE,
+                     idle_timeout=Settings.DB_POOL_IDLE_TIMEOUT, checkout_timeout=Settings.DB_POOL_CHECKOUT_TIMEOUT,
+                     health_check_after=Settings.DB_POOL_HEALTH_CHECK_AFTER)
+
+
+# The pool of connections used by all of the database functions, for the backend chosen in the Config.yaml file
+POOL = make_pool(Settings.DB_BACKEND)
+
+# Caches the players of each team, keyed by the server id and the team's role id.  Each entry is a list of tuples
+# holding the discord id and ign of each player on the team.
+ROSTER_CACHE = Cache.LRUCache(Settings.ROSTER_CACHE_SIZE, Settings.ROSTER_CACHE_TTL)
+
+# Holds the matches of each server's current round, so the score command can turn away bad reports without a query
+MATCH_INDEX = MatchIndex.MatchIndex()
+
+# The first key of the advisory locks held while a server's schedule is made, which keeps them apart from any other
+# advisory locks taken on the database
+SCHEDULE_LOCK = 1
+
+# The results of join_team
+JOIN_OK = 0  # The player joined the team
+JOIN_NO_TEAM = 1  # The role isn't a team in the server
+JOIN_NO_PLAYER = 2  # The user isn't a player in the server
+JOIN_ALREADY_ON_TEAM = 3  # The player is already on the team
+JOIN_TEAM_FULL = 4  # The team already has as many players as the server's team_size allows
+
+# The errors raised by the database drivers of the backends, which are raised as the bot's own errors
+DRIVER_ERRORS = (psycopg2.DatabaseError, sqlite3.DatabaseError)
+
+# Identifies this bot process in the setting change notifications it sends to the other bot processes
+PROCESS_ID = uuid.uuid4().hex
+
+
+class DatabaseError(Exception):
+    """ Raised by the database functions when the database can't be used or a query fails.  The user_message of the
+    error can be shown to users, and the error is logged by whoever handles it.
+    """
+    # The message shown to users when their command fails because of the error
+    user_message = 'There was an error with the database, so the command could not be finished.'
+
+    def __init__(self, message, duration=None):
+        """ Creates the error.
+
+        :param message: The error given by the database.
+        :type message: str
+
+        :param duration: The number of seconds the connection was used for before the error.
+        :type duration: float, None
+        """
+        super().__init__(message)
+        self.duration = duration
+        # The name of the database function that failed, which is filled in by AsyncDatabase
+        self.query = None
+
+
+class DatabaseUnavailable(DatabaseError):
+    """ Raised when a connection to the database couldn't be made, or was lost while it was being used.
+    """
+    user_message = 'The database can\'t be reached right now, please try again in a minute.'
+
+
+class QueryFailed(DatabaseError):
+    """ Raised when the database rejects a query.
+    """
+    user_message = 'There was an error with the database, so the command could not be finished.  The error has been ' \
+                   'logged for the bot\'s admins.'
+
+
+class Conflict(QueryFailed):
+    """ Raised when a query breaks one of the database's constraints, such as adding the same player twice.
+    """
+    user_message = 'That conflicts with something that is already in the database.'
+
+
+class GameNotReported(QueryFailed):
+    """ Raised when a score report doesn't match exactly one unreported game, so the transaction it was made in is
+    rolled back instead of committing scores for the wrong number of games.
+    """
+    user_message = 'Your game could not be reported, so no scores were changed.'
 
-    :except psycopg2.DatabaseError: Writes database errors to the error log defined in Settings.py
+    def __init__(self, message, games):
+        """ Creates the error.
 
-    :param conn_string: The string to be used to connect to the database.
-    Should specify the databases name, user, password, and host address.
-    Defaults to the DB_CONN_STRING in the Settings.py file.
-    :type conn_string: str
+        :param message: Describes the report that failed.
+        :type message: str
+
+        :param games: The number of unreported games the report matched.
+        :type games: int
+        """
+        super().__init__(message)
+        self.games = games
+
+
+def _database_error(error, duration=None):
+    """ Turns an error raised by psycopg2 or sqlite into one of the bot's database errors.
+
+    :param error: The error raised by psycopg2 or sqlite.
+    :type error: psycopg2.DatabaseError, sqlite3.DatabaseError
+
+    :param duration: The number of seconds the connection was used for before the error.
+    :type duration: float, None
+
+    :return: A DatabaseUnavailable if the connection can't be used, a Conflict if a constraint was broken, and a
+    QueryFailed otherwise.
+    :rtype: DatabaseError
+    """
+    # Counts the error so it shows up in the bot's stats
+    Metrics.METRICS.count('db.errors')
+    if isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)) or SQLite.is_unavailable(error):
+        error_type = DatabaseUnavailable
+    elif isinstance(error, (psycopg2.IntegrityError, sqlite3.IntegrityError)):
+        error_type = Conflict
+    else:
+        error_type = QueryFailed
+    return error_type(str(error).strip(), duration)
+
+
+@contextmanager
+def connect(commit=False, pool=None):
+    """ Used to connect to the database. Use the cursor object to do any queries.  The connection is checked out of
+    the connection pool and returned to it once the queries are done.
+
+    :except DatabaseError: Database errors are raised as a DatabaseUnavailable if the connection can't be used, a
+    Conflict if a constraint is broken, and a QueryFailed otherwise.  Nothing is committed when an error is raised.
 
     :param commit: Used to say if the cursor is to be committed to the database.
     Defaults to False so accidental commits are avoided.
     :type commit: bool
 
-    :return: Returns None if an exception occurs, doesn't return anything otherwise.
-    :rtype: None
+    :param pool: The connection pool to get the connection from.  Defaults to the POOL made from the settings in
+    the Settings.py file.
+    :type pool: Pool.ConnectionPool, None
     """
+    pool = pool or POOL
 
+    # The connection checked out of the pool, stays None if a connection couldn't be made
+    db = None
+    # Says if the connection is broken and should be thrown away instead of being put back in the pool
+    discard = False
+    # The time the connection was asked for, and the time the queries started running once it was given
+    start = time.perf_counter()
+    connected = None
     try:
-        # Connects to the database
-        db = psycopg2.connect(conn_string)
-        # Cursor to be used when interacting with the database
-        cursor = db.cursor()
+        # Gets a connection from the pool
+        db = pool.getconn()
+        connected = time.perf_counter()
+        Metrics.METRICS.observe('db.connect', connected - start)
+        # Cursor to be used when interacting with the database, in a transaction started the way the backend needs
+        cursor = pool.cursor(db, write=commit)
         # Yield the cursor so it can be used in other functions
         yield cursor
-    # Excepts any database errors so they can be handled and logged
-    except psycopg2.DatabaseError as e:
-        # Gets the argument variables
-        error, = e.args
-        # Logs the error and the time of the error
-        logging.error(" {}\n{}".format(error, datetime.datetime.now))
-        # Returns False to signal that the connection failed.
-        return False
-    # If an error doesn't occur, determines whether a commit is to be made
-    else:
-        # If a commit was to be made
+        # If a commit was to be made, commits the database now that the queries are done
         if commit:
-            # Commits the database
             db.commit()
-        # If a commit wasn't to be made
-        else:
-            # Rolls the database back
-            db.rollback()
-    # Finally the database connection will be closed
+    # Excepts any database errors so they can be raised as the bot's own errors
+    except DRIVER_ERRORS as e:
+        # Connection level errors mean the connection can't be trusted anymore
+        discard = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        # Raises the type of error that tells the caller what went wrong, leaving the logging to whoever handles it
+        raise _database_error(e, time.perf_counter() - start) from e
+    # Finally the connection will be cleaned up and given back to the pool
     finally:
-        # Closes the database
-        db.close()
+        if db is not None:
+            # Rolls back anything that wasn't committed so the next user of the connection starts fresh
+            if not db.closed and not discard:
+                try:
+                    db.rollback()
+                except DRIVER_ERRORS:
+                    discard = True
+            # Returns the connection to the pool
+            pool.putconn(db, discard=discard)
+        # Records how long the queries, commit, and clean up took, not counting the wait for the connection
+        if connected is not None:
+            Metrics.METRICS.observe('db.execute', time.perf_counter() - connected)
 
 
-def get_settings():
-    """ Gets the server settings from the database.
-
-    :return: Returns the server settings as a dictionary, or returns false if the query didn't result in what was
-    expected.  If an error occurs in the connect loop, it will return None
-    :rtype: dict, bool, None
+class Transaction:
+    """ A unit of work where several database operations share one connection and are committed together.  Work that
+    has to wait for the commit, such as clearing cached rosters, is registered with on_commit and is only done if the
+    transaction commits.  Parts of the transaction that are allowed to fail on their own can be put in a savepoint.
+    Transactions are started with the transaction function, and like the rest of this module they block, so they
+    should be ran on the database executor.
     """
 
-    # Opens a database connection where commits cannot occur, with a cursor object to use in that connection
-    with connect() as cursor:
+    def __init__(self, cursor):
+        """ Creates the unit of work.
+
+        :param cursor: The cursor that every operation of the transaction is ran with.
+        :type cursor: psycopg2.extensions.cursor
+        """
+        self.cursor = cursor
+        # The functions to be called once the transaction is committed, in the order they were registered
+        self.callbacks = list()
+        # The number of savepoints made so far, used to give each savepoint its own name
+        self._savepoints = 0
+
+    def on_commit(self, callback):
+        """ Registers a function to be called with no arguments once the transaction is committed.  It isn't called if
+        the transaction, or the savepoint it was registered in, is rolled back.
+
+        :param callback: The function to be called.
+        :type callback: function
+        """
+        self.callbacks.append(callback)
+
+    @contextmanager
+    def savepoint(self):
+        """ Runs part of the transaction that can fail without failing the rest of it.  If the block raises an error,
+        only the block's changes are rolled back and the error is raised again, with psycopg2 errors raised as the
+        bot's database errors, so the caller can catch it and carry on with the transaction.
+        """
+        self._savepoints += 1
+        name = 'savepoint_{}'.format(self._savepoints)
+        # The callbacks registered before the savepoint, which are kept if it is rolled back
+        kept = len(self.callbacks)
+        self.cursor.execute('SAVEPOINT {}'.format(name))
+        try:
+            yield self
+        except BaseException as e:
+            self.cursor.execute('ROLLBACK TO SAVEPOINT {}'.format(name))
+            del self.callbacks[kept:]
+            if isinstance(e, DRIVER_ERRORS):
+                raise _database_error(e) from e
+            raise
+        else:
+            self.cursor.execute('RELEASE SAVEPOINT {}'.format(name))
+
+    def get_settings(self):
+        """ Gets the settings of every server from the database.
+
+        :return: Returns the server settings as a dictionary of ServerSettings keyed by the server's discord id, or
+        returns false if the query didn't result in what was expected.
+        :rtype: dict, bool
+        """
+        cursor = self.cursor
         # The SQL code to get all of the server settings that are in the Settings table of the database.
         sql = """SELECT server, c_symbol, game_type, current_season, current_round, admin_role, team_size
             FROM "Settings";"""
@@ -75,202 +271,898 @@ def get_settings():
         cursor.execute(sql)
         # Checks to make sure the status message is what was expected.
         if cursor.statusmessage == 'SELECT {}'.format(cursor.rowcount):
-            # Gets all of the rows obtained from the sql query
-            rows = cursor.fetchall()
-            # The settings dictionary
-            server_settings = dict()
-            # Loops through all of the rows in the query
-            for row in rows:
-                # The server id to be used as the key in the dictionary
-                server_id = row[0]
-                # The sub-dictionary that will hold all the settings for the current server
-                sub_dictionary = dict()
-                # Assigns the command symbol of the server
-                sub_dictionary['c_symbol'] = row[1]
-                # Assigns the game type of the server
-                sub_dictionary['game_type'] = row[2]
-                # Assigns the current season of the server
-                sub_dictionary['current_season'] = row[3]
-                # Assigns the current round of the server
-                sub_dictionary['current_round'] = row[4]
-                # Assigns the admin role of the server
-                sub_dictionary['admin_role'] = row[5]
-                # Assigns the team size of the server
-                sub_dictionary['team_size'] = row[6]
-                # Assigns the settings of the server into the server_settings dictionary using the server's
-                # discord id as the key
-                server_settings[server_id] = sub_dictionary
-            # Returns the server settings dictionary
-            return server_settings
+            # Creates the settings of each server, using the server's discord id as the key
+            return {row[0]: SettingsStore.make_settings(*row[1:]) for row in cursor}
         # Returns false if there was an error getting the settings.
         else:
             return False
 
+    def get_server_settings(self, server):
+        """ Gets the settings of a single server from the database, and stores them in Settings.SERVER_SETTINGS once
+        the transaction is committed.  If the server doesn't have settings yet, it is given the default settings from
+        the Config.yaml file.
 
-def update_settings(server, setting_type, setting_val):
-    """ Updates the server settings in the Settings.py file as well as the database.
+        :param server: The discord server id of the server to get the settings of.
+        :type server: str
 
-    :param server: The discord server id of the server to be added.
-    :type server: str
-
-    :param setting_type: The setting to be changed in the server.
-    :type setting_type: str
-
-    :param setting_val: The value to have the setting changed to.
-    :type setting_val: int, str, etc
-
-    :return: Returns whether or not the settings were updated properly.  Returns None if an error occurs in connect
-    :rtype: bool, None
-    """
-
-    # Opens a database connection where commits can occur, with a cursor object to use in that connection
-    # to update the setting in the database
-    with connect(commit=True) as cursor:
-        # The sql to be executed, using placeholders for the values to be inserted
-        sql = """Update "Settings" SET {} = %s WHERE server = %s""".format(setting_type)
+        :return: Returns the settings of the server, or False if the query didn't result in what was expected.
+        :rtype: SettingsStore.ServerSettings, bool
+        """
+        cursor = self.cursor
+        # The default settings given to a new server
+        defaults = Settings.SERVER_DEFAULTS
+        # The SQL code that creates the server's settings if they don't exist yet, then gets the server's settings.
+        # Only one of the two selects can return a row, since the insert isn't seen by the second select.
+        sql = """WITH inserted AS (
+                INSERT INTO "Settings"(server, c_symbol, game_type, current_season, current_round, admin_role,
+                    team_size)
+                VALUES (%s, %s, %s, %s, %s, %s, %s) ON CONFLICT (server) DO NOTHING
+                RETURNING c_symbol, game_type, current_season, current_round, admin_role, team_size)
+            SELECT c_symbol, game_type, current_season, current_round, admin_role, team_size FROM inserted
+            UNION ALL
+            SELECT c_symbol, game_type, current_season, current_round, admin_role, team_size FROM "Settings"
+                WHERE server = %s;"""
         # Executes the sql query with the given parameters
-        cursor.execute(sql, (setting_val, server))
-        # Checks if the update was executed as expected using the cursor status message
-        if cursor.statusmessage == 'UPDATE 1':
-            # Updates the settings in the server settings dictionary
-            Settings.SERVER_SETTINGS[server][setting_type] = setting_val
-            # Returns True stating that the settings was set properly
-            return True
-        # If the update wasn't executed properly
+        cursor.execute(sql, (server,) + tuple(defaults) + (server,))
+        # Checks to make sure the server's settings were found
+        if cursor.statusmessage == 'SELECT 1':
+            # Creates the settings record of the server and stores it once it is committed
+            record = SettingsStore.make_settings(*cursor.fetchone())
+            self.on_commit(lambda: Settings.SERVER_SETTINGS.put(server, record))
+            # Returns the server's settings
+            return record
+        # Returns false if there was an error getting the settings.
         else:
-            # Returns False if the setting wasn't set properly.
             return False
 
+    def update_settings(self, server, setting_type, setting_val):
+        """ Updates a server setting in the database, and in Settings.SERVER_SETTINGS once the transaction is
+        committed.  The other bot processes are told about the change when it is committed.
 
-def check_team_size(server, team):
-    """ Gets the current number of players that are on the given team.
+        :param server: The discord server id of the server to be updated.
+        :type server: str
 
-    :param server: The discord server id of the server the team belongs to.
-    :type server: str
+        :param setting_type: The setting to be changed in the server.
+        :type setting_type: str
 
-    :param team: The discord id of the team to be checked.
-    :type team: str
+        :param setting_val: The value to have the setting changed to.
+        :type setting_val: int, str, etc
 
-    :return: The number of players on the team, or false if the settings were grabbed incorrectly.
-    Returns None if an error occurs in connect
-    :rtype: int, bool, None
-    """
-
-    # Opens a database connection where commits can occur, with a cursor object to use in that connection
-    with connect() as cursor:
-        # SQL code to check the number of players on the team
-        sql = """SELECT COUNT(p.id) FROM "Players" p, "Teams" t 
-            WHERE t.server=%s AND p.server=t.server AND t.discord=%s AND p.team=t.id"""
-        # Executes the sql query with the given parameters
-        cursor.execute(sql, (server, team))
-        # Checks if the status message is what was expected
-        if cursor.statusmessage == 'SELECT 1':
-            # Fetches the result of the query that represents the number of people on the given team
-            number_of_players = cursor.fetchone()[0]
-            # Returns the number of players
-            return number_of_players
-        # Returns False if there was an error getting the team size
-        else:
+        :return: Returns whether or not the setting was updated properly.
+        :rtype: bool
+        """
+        # Only the settings that have a prepared statement can be updated, which keeps the column name out of the sql
+        statement = 'update_settings_{}'.format(setting_type)
+        if statement not in Statements.STATEMENTS:
             return False
+        # The notification that tells the other bot processes about the change once it is committed
+        payload = json.dumps({'origin': PROCESS_ID, 'server': server, 'setting': setting_type, 'value': setting_val})
+        # Executes the prepared update for the setting.  A notification is queued for each updated row, which postgres
+        # only sends if the transaction commits.
+        Statements.execute(self.cursor, statement, (setting_val, server, Settings.DB_NOTIFY_CHANNEL, payload))
+        # Checks if the update was executed as expected using the cursor status message
+        success = self.cursor.statusmessage == 'SELECT 1'
+        # Updates the settings in the server settings store once the change is committed
+        if success:
+            self._setting_changed(server, setting_type, setting_val)
+        return success
 
+    def _setting_changed(self, server, setting_type, setting_val):
+        """ Updates a changed setting in Settings.SERVER_SETTINGS once the transaction is committed.  Changing a
+        server's round or season also drops its matches from the match index, since they are the old round's matches.
+        """
+        self.on_commit(lambda: Settings.SERVER_SETTINGS.update(server, setting_type, setting_val))
+        if setting_type in MatchIndex.ROUND_SETTINGS:
+            self.on_commit(lambda: MATCH_INDEX.drop(server))
 
-def add_player(server, discord, ign):
-    """ Adds a player to the database. Uses the cursor object to do any queries.
+    def check_team_size(self, server, team):
+        """ Gets the current number of players that are on the given team.
 
-    :param server: The discord server id of the server to have the player added into.
-    :type server: str
+        :param server: The discord server id of the server the team belongs to.
+        :type server: str
+
+        :param team: The discord id of the team to be checked.
+        :type team: str
 
-    :param discord: The discord id of the player to be added.
-    :type discord: str
+        :return: The number of players on the team, or false if the settings were grabbed incorrectly.
+        :rtype: int, bool
+        """
+        # Gets the team's players, which are usually already cached by get_players
+        players = self.get_players(server, team)
+        # Returns the number of players if they were retrieved properly
+        if players is not False:
+            return len(players)
+        # Passes on False if there was an error getting the players
+        else:
+            return players
 
-    :param ign: The in-game-name of the player to be added.
-    :type ign: str
+    def add_player(self, server, discord, ign):
+        """ Adds a player to the database without a team.
 
-    :return: Whether adding the player was successful or not. If an error occurs in connect, returns None.
-    :rtype: bool, None
-    """
+        :param server: The discord server id of the server to have the player added into.
+        :type server: str
 
-    # Opens a database connection where commits can occur, with a cursor object to use in that connection
-    with connect(commit=True) as cursor:
+        :param discord: The discord id of the player to be added.
+        :type discord: str
+
+        :param ign: The in-game-name of the player to be added.
+        :type ign: str
+
+        :return: Whether adding the player was successful or not.
+        :rtype: bool
+        """
         # SQL code to insert the new player into the database without assigning them a team
         sql = """INSERT INTO "Players"(server, discord, ign) VALUES (%s, %s, %s);"""
         # Executes the sql query with the given parameters
-        cursor.execute(sql, (server, discord, ign))
+        self.cursor.execute(sql, (server, discord, ign))
         # Checks to see if the message is as expected
-        if cursor.statusmessage == 'INSERT 0 1':
-            # Returns True since the status message was as expected
-            return True
-        # If the proper status message wasn't returned, return False
-        else:
-            return False
+        return self.cursor.statusmessage == 'INSERT 0 1'
 
+    def import_roster(self, server, rows):
+        """ Adds many players to the database at once, along with their teams.  Players that are already in the server
+        are moved to the team given for them.  Like join_team, a player is only put on a team that has fewer players
+        than the server's team_size, counting the players added to it earlier in the import.  Rows that can't be
+        imported are reported back instead of stopping the rest of the import.
 
-def change_ign(server, discord, ign):
-    """ Changes the ign of the given player.
+        :param server: The discord server id of the server to have the players added into.
+        :type server: str
 
-    :param server: The discord server id that the player's ign is to be changed in.
-    :type server: str
+        :param rows: The players to be added, as tuples of a row number, the player's discord id, the player's ign, and
+        the discord id of the player's team or None if they aren't on a team.
+        :type rows: list
 
-    :param discord: The discord id of the player you want to change the ign of.
-    :type discord: str
+        :return: The number of players that were added or moved to their team, and a list of tuples of the row number
+        and reason for each row that wasn't imported.
+        :rtype: tuple
+        """
+        cursor = self.cursor
+        # Gets the ids of all of the server's teams in one query so each row's team can be checked without another.
+        # The teams are locked so players joining them while the import runs are counted one after another.
+        team_ids = self._read_teams(server)
+        team_names = {team_id: team for team, team_id in team_ids.items()}
+        # Gets the largest number of players a team can have
+        cursor.execute("""SELECT team_size FROM "Settings" WHERE server=%s""", (server,))
+        row = cursor.fetchone()
+        max_size = row[0] if row is not None else None
+        # Gets the team of each player already in the server, and counts the players on each team
+        cursor.execute("""SELECT discord, team FROM "Players" WHERE server=%s""", (server,))
+        existing = dict(cursor.fetchall())
+        team_players = dict()
+        for team_id in existing.values():
+            if team_id is not None:
+                team_players[team_id] = team_players.get(team_id, 0) + 1
+        # The rows of the new players, the players moved to another team, and the row number of each player
+        values = list()
+        moves = list()
+        row_numbers = dict()
+        # The rows that can't be imported
+        failures = list()
+        # The teams whose cached rosters are cleared once the import is committed
+        changed_teams = set()
+        for number, discord, ign, team in rows:
+            team_id = team_ids.get(team)
+            if team is not None and team_id is None:
+                failures.append((number, 'the role is not a team'))
+            elif discord in row_numbers:
+                failures.append((number, 'the player is listed more than once'))
+            elif discord in existing and team_id is None:
+                failures.append((number, 'the player is already in the server'))
+            elif discord in existing and existing[discord] == team_id:
+                failures.append((number, 'the player is already on the team'))
+            elif team_id is not None and max_size is not None and team_players.get(team_id, 0) >= max_size:
+                failures.append((number, 'the team is full'))
+            else:
+                row_numbers[discord] = number
+                if team_id is not None:
+                    team_players[team_id] = team_players.get(team_id, 0) + 1
+                    changed_teams.add(team)
+                if discord in existing:
+                    # Frees the player's place on their old team
+                    old_team = existing[discord]
+                    if old_team is not None:
+                        team_players[old_team] -= 1
+                        changed_teams.add(team_names[old_team])
+                    moves.append((server, discord, team_id))
+                else:
+                    values.append((server, discord, ign, team_id))
+        # Inserts the new players, skipping players that were added to the server since it was read
+        inserted = self._insert_players(values)
+        # Reports the players that were skipped because they were already in the server
+        for server_id, discord, ign, team_id in values:
+            if discord not in inserted:
+                failures.append((row_numbers[discord], 'the player is already in the server'))
+        # Moves the players that were already in the server to their new teams
+        self._move_players(moves)
+        # Clears the cached rosters of the teams that players were added to or moved from once the import is committed
+        for team in changed_teams:
+            self._invalidate_roster(server, team)
+        # Returns the number of imported players and the failures
+        return len(inserted) + len(moves), sorted(failures)
 
-    :param ign: The new ign of the player.
-    :type ign: str
+    def _read_teams(self, server):
+        """ Gets the database id of each of a server's teams, locking the teams until the transaction ends.
 
-    :return: Whether the ign of the player was changed successfully or not.
-    Returns None if an error occurs in connect.
-    :rtype: bool, None
-    """
+        :param server: The discord id of the server.
+        :type server: str
+
+        :return: The database id of each team, keyed by the team's discord role id.
+        :rtype: dict
+        """
+        sql = """SELECT discord, id FROM "Teams" WHERE server=%s ORDER BY id FOR UPDATE"""
+        self.cursor.execute(sql, (server,))
+        return dict(self.cursor.fetchall())
+
+    def _insert_players(self, values):
+        """ Inserts players in batches of multi-row inserts, skipping the players that are already in their server.
+
+        :param values: The server, discord id, ign, and database id of the team of each player.
+        :type values: list
+
+        :return: The discord ids of the players that were inserted.
+        :rtype: set
+        """
+        sql = """INSERT INTO "Players"(server, discord, ign, team) VALUES %s
+            ON CONFLICT (server, discord) DO NOTHING RETURNING discord"""
+        rows = psycopg2.extras.execute_values(self.cursor, sql, values, page_size=1000, fetch=True)
+        return {row[0] for row in rows}
+
+    def _move_players(self, moves):
+        """ Moves players to other teams in batches of multi-row updates.
 
-    # Opens a database connection where commits can occur, with a cursor object to use in that connection
-    with connect(commit=True) as cursor:
-        # SQL code to change the ign of the player in the database
-        sql = """UPDATE "Players" SET ign=%s WHERE server=%s AND discord=%s"""
+        :param moves: The server, discord id, and database id of the new team of each player.
+        :type moves: list
+        """
+        sql = """UPDATE "Players" p SET team = v.team FROM (VALUES %s) AS v(server, discord, team)
+            WHERE p.server = v.server AND p.discord = v.discord"""
+        psycopg2.extras.execute_values(self.cursor, sql, moves, template='(%s, %s, %s::integer)', page_size=1000)
+
+    def change_ign(self, server, discord, ign):
+        """ Changes the ign of the given player.
+
+        :param server: The discord server id that the player's ign is to be changed in.
+        :type server: str
+
+        :param discord: The discord id of the player you want to change the ign of.
+        :type discord: str
+
+        :param ign: The new ign of the player.
+        :type ign: str
+
+        :return: Whether the ign of the player was changed successfully or not.
+        :rtype: bool
+        """
+        # SQL code to change the ign of the player in the database, returning the player's team so its cached roster
+        # can be cleared
+        sql = """UPDATE "Players" p SET ign=%s WHERE server=%s AND discord=%s
+            RETURNING (SELECT t.discord FROM "Teams" t WHERE t.id=p.team)"""
         # Executes the sql query with the given parameters
-        cursor.execute(sql, (ign, server, discord))
+        self.cursor.execute(sql, (ign, server, discord))
         # Checks if the status message was as expected
-        if cursor.statusmessage == 'UPDATE 1':
-            # Returns that the player's ign has been successfully changed
-            return True
-        # If the status was not as expected, return False
-        else:
+        success = self.cursor.statusmessage == 'UPDATE 1'
+        # Clears the cached roster of the player's team once the change is committed
+        if success:
+            team, = self.cursor.fetchone()
+            if team is not None:
+                self._invalidate_roster(server, team)
+        # Returns whether or not the player's ign was changed
+        return success
+
+    def set_team(self, server, player, team):
+        """ Sets a player's team in the database.
+
+        :param server: The discord server id of the player.
+        :type server: str
+
+        :param player: The discord id of the player to have their team set to.
+        :type player: str
+
+        :param team: The discord id of the team to have the player set to.
+        :type team: str
+
+        :return: Whether or not the team was set successfully.
+        :rtype: bool
+        """
+        # Executes the prepared update, which joins the player's row to itself so the team they were on before the
+        # update can be returned
+        Statements.execute(self.cursor, 'set_team', (server, player, team))
+        # Checks if the status message is as expected
+        success = self.cursor.statusmessage == 'UPDATE 1'
+        # Clears the cached rosters of the player's old and new teams once the change is committed
+        if success:
+            old_team, = self.cursor.fetchone()
+            self._invalidate_roster(server, team)
+            if old_team is not None:
+                self._invalidate_roster(server, old_team)
+        # Returns whether or not the team was set successfully
+        return success
+
+    def join_team(self, server, player, team):
+        """ Moves a player onto a team if the team has fewer players than the server's team_size.  The team is locked
+        while it is checked, so players joining the same team at the same time can never overfill it, and the whole
+        join takes a single round trip to the database.
+
+        :param server: The discord server id of the player.
+        :type server: str
+
+        :param player: The discord id of the player joining the team.
+        :type player: str
+
+        :param team: The discord id of the team to be joined.
+        :type team: str
+
+        :return: One of the JOIN_ result codes.
+        :rtype: int
+        """
+        # Executes the prepared call to the join_team database function
+        Statements.execute(self.cursor, 'join_team', (server, player, team))
+        # Gets the result code and the player's old team
+        result, old_team = self.cursor.fetchone()
+        # Clears the cached rosters of the player's old and new teams once the change is committed
+        if result == JOIN_OK:
+            self._invalidate_roster(server, team)
+            if old_team is not None:
+                self._invalidate_roster(server, old_team)
+        # Returns the result of the join
+        return result
+
+    def get_players(self, server, team, ign=False):
+        """ Gets the players on the given team.  Can also get the ign of the players.
+
+        :param server: The discord server id of the server the team exists in.
+        :type server: str
+
+        :param team: The discord role id of the team to have the list of players obtained from.
+        :type team: str
+
+        :param ign: Flag that decides whether or not the ign of the players should be retrieved as well.
+        :type ign: bool
+
+        :return: A list of tuples that contain the discord id's of the players.  Will contain discord id's and the ign
+        of the players if the ign flag is True.  Returns False if there is a problem getting the player names.
+        :rtype: list, bool
+        """
+        # Uses the cached roster of the team if there is one, and reads it from the database if it wasn't cached
+        players = ROSTER_CACHE.get((server, team))
+        if players is None:
+            players = self._load_players(server, team)
+        return _roster(players, ign)
+
+    def _load_players(self, server, team):
+        """ Reads the roster of a team from the database and caches it, without looking in the cache first so a miss
+        is only counted once.
+
+        :return: A list of tuples of the discord id and ign of each player, or False if the query didn't result in
+        what was expected.
+        :rtype: list, bool
+        """
+        # The version of the cache before the roster is read, so a roster changed during the read isn't cached
+        version = ROSTER_CACHE.version
+        # The ign is always read so the same cached roster can be used whether or not the ign was desired
+        players = self._read_players(server, team)
+        # The players aren't cached if the transaction has already changed something, since the changes could still be
+        # rolled back
+        if players is not False and not self.callbacks:
+            ROSTER_CACHE.put((server, team), players, version)
+        return players
+
+    def _read_players(self, server, team):
+        """ Reads the discord id and ign of each player on a team from the database.
+
+        :return: A list of tuples of the discord id and ign of each player, or False if the query didn't result in
+        what was expected.
+        :rtype: list, bool
+        """
+        # Executes the prepared query
+        Statements.execute(self.cursor, 'get_players', (server, team))
+        # Checks if the status message is as expected
+        if self.cursor.statusmessage != 'SELECT {}'.format(self.cursor.rowcount):
             return False
+        # Gets all of the players from the cursor
+        return self.cursor.fetchall()
 
+    def update_game_scores(self, server, season, match_round, team_given, given_team_score, other_team_score):
+        """ Update the scores of the given team's game in the given round.  Only needs 1 team to update the proper
+        game.  The result is added to both teams' standings in the same statement.
 
-def set_team(server, player, team):
-    """ Sets a player's team in the database.
+        :param server: The discord id of the server the game is in.
+        :type server: str
 
-    :param server: The discord server id of the player.
-    :type server: str
+        :param season: The season the game is played in.
+        :type season: int
 
-    :param player: The discord id of the player to have their team set to.
-    :type player: str
+        :param match_round: The round to change the score for.
+        :type match_round: int
 
-    :param team: The discord id of the team to have the player set to.
-    :type team: str
+        :param team_given: The discord id of the given team.
+        :type team_given: str
 
-    :return: Whether or not the team was set successfully.  Returns None if an error occurs in connect.
-    :rtype: bool, None
-    """
+        :param given_team_score: The score of the given team.
+        :type given_team_score: int
+
+        :param other_team_score: The score of the other team.
+        :type other_team_score: int
+
+        :except GameNotReported: Raised if the team didn't have exactly one unreported game in the round, which rolls
+        back the transaction so no scores or standings are changed.
+
+        :return: Returns True once the game's scores are set.
+        :rtype: bool
+        """
+        games = self._report_game(server, season, match_round, team_given, given_team_score, other_team_score)
+        # Checks that exactly one game was reported
+        if games != 1:
+            raise GameNotReported('{} unreported games matched the report of team {} in season {} round {}'
+                                  .format(games, team_given, season, match_round), games)
+        # Marks the game as reported in the match index once the scores are committed
+        self.on_commit(lambda: MATCH_INDEX.reported(server, season, match_round, team_given))
+        return True
+
+    def _report_game(self, server, season, match_round, team_given, given_team_score, other_team_score):
+        """ Sets the scores of the team's unreported games in the round and adds them to the standings.
+
+        :return: The number of games that were reported.
+        :rtype: int
+        """
+        # Executes the prepared update of the game's scores, which also updates both teams' standings
+        Statements.execute(self.cursor, 'update_game_scores', (given_team_score, other_team_score, match_round,
+                                                               team_given, server, season, Settings.POINTS_WIN,
+                                                               Settings.POINTS_DRAW, Settings.POINTS_LOSS))
+        return self.cursor.fetchone()[0]
+
+    def get_round_matches(self, server, season, match_round):
+        """ Gets the matches of a round along with whether each of them was reported, for the match index.
+
+        :param server: The discord id of the server the round is in.
+        :type server: str
+
+        :param season: The season the round is in.
+        :type season: int
+
+        :param match_round: The round to get the matches of.
+        :type match_round: int
+
+        :return: The database id, the discord role ids of both teams, and whether the match was reported, of each match.
+        :rtype: list
+        """
+        sql = """SELECT m.id, t1.discord, t2.discord, m.team_1_score IS NOT NULL FROM "Matches" m
+            JOIN "Teams" t1 ON t1.id = m.team_1 JOIN "Teams" t2 ON t2.id = m.team_2
+            WHERE m.server = %s AND m.season = %s AND m.round = %s"""
+        self.cursor.execute(sql, (server, season, match_round))
+        return [(match, team_1, team_2, bool(reported)) for match, team_1, team_2, reported in self.cursor]
+
+    def get_teams(self, server):
+        """ Gets the ids of all of the teams in a server.
+
+        :param server: The discord id of the server.
+        :type server: str
+
+        :return: The database ids of the server's teams, in the order they were created.
+        :rtype: list
+        """
+        # The sql to be executed, using placeholders for the values to be inserted
+        sql = """SELECT id FROM "Teams" WHERE server=%s ORDER BY id"""
+        # Executes the sql query with the given parameters
+        self.cursor.execute(sql, (server,))
+        # Returns the ids of the teams
+        return [row[0] for row in self.cursor]
+
+    def create_schedule(self, server, season, rounds):
+        """ Adds all of a season's matches to the database with batched inserts, and sets the server's current round
+        to the first round.
+
+        :param server: The discord id of the server the season is in.
+        :type server: str
+
+        :param season: The season the matches are played in.
+        :type season: int
+
+        :param rounds: The matches of each round, as lists of tuples holding the database ids of the two teams.
+        :type rounds: list
+
+        :return: The number of matches that were added, or False if the season already has matches or the server has
+        no settings.
+        :rtype: int, bool
+        """
+        cursor = self.cursor
+        # Waits for any other schedule being made for the server, so two schedule commands can't both find the season
+        # empty and both add its matches
+        self._lock_schedule(server)
+        # Makes sure the season hasn't been scheduled already
+        sql = """SELECT EXISTS (SELECT 1 FROM "Matches" WHERE server=%s AND season=%s)"""
+        cursor.execute(sql, (server, season))
+        if cursor.fetchone()[0]:
+            return False
+        # Starts the season from its first round, which is done first so nothing has to be undone if the server has no
+        # settings to update
+        if not self.update_settings(server, 'current_round', 1):
+            return False
+        # The rows of all of the season's matches, with rounds numbered from 1
+        values = [(server, season, number, team_1, team_2)
+                  for number, matches in enumerate(rounds, 1) for team_1, team_2 in matches]
+        # Inserts all of the matches
+        self._insert_matches(values)
+        # Returns the number of matches that were added
+        return len(values)
+
+    def _lock_schedule(self, server):
+        """ Locks the schedule of a server until the transaction ends, using a transaction level advisory lock keyed by
+        the server.  The lock is released when the transaction commits or rolls back.
+
+        :param server: The discord id of the server.
+        :type server: str
+        """
+        self.cursor.execute('SELECT pg_advisory_xact_lock(%s, hashtext(%s))', (SCHEDULE_LOCK, server))
+
+    def _insert_matches(self, values):
+        """ Inserts matches in batches of multi-row inserts.
+
+        :param values: The server, season, round, and database ids of the two teams of each match.
+        :type values: list
+        """
+        sql = """INSERT INTO "Matches"(server, season, round, team_1, team_2) VALUES %s"""
+        psycopg2.extras.execute_values(self.cursor, sql, values, page_size=1000)
+
+    def get_standings(self, server, season):
+        """ Gets the standings of a season, which are kept up to date as games are reported.
+
+        :param server: The discord id of the server the season is in.
+        :type server: str
 
-    # Opens a database connection where commits can occur, with a cursor object to use in that connection
-    with connect(commit=True) as cursor:
+        :param season: The season to get the standings of.
+        :type season: int
+
+        :return: A list of tuples holding the discord id, wins, losses, draws, round difference, and points of each
+        team, from first place to last.
+        :rtype: list
+        """
+        # Executes the prepared query for the standings
+        Statements.execute(self.cursor, 'get_standings', (server, season))
+        # Returns the standings of each team
+        return self.cursor.fetchall()
+
+    def get_match(self, server, season, match_round, team):
+        """ Gets the unreported match a team plays in a round.
+
+        :param server: The discord id of the server the match is in.
+        :type server: str
+
+        :param season: The season the match is played in.
+        :type season: int
+
+        :param match_round: The round the match is played in.
+        :type match_round: int
+
+        :param team: The discord id of one of the teams in the match.
+        :type team: str
+
+        :return: A tuple of the match's database id and the discord ids of its first and second teams, or False if the
+        team doesn't have an unreported match in the round.
+        :rtype: tuple, bool
+        """
+        # The sql to be executed, using placeholders for the values to be inserted
+        sql = """SELECT m.id, t1.discord, t2.discord FROM "Matches" m
+            JOIN "Teams" t1 ON t1.id = m.team_1 JOIN "Teams" t2 ON t2.id = m.team_2
+            WHERE m.server=%s AND m.season=%s AND m.round=%s AND (t1.discord=%s OR t2.discord=%s)
+                AND m.team_1_score IS NULL AND m.team_2_score IS NULL
+            LIMIT 1"""
+        # Executes the sql query with the given parameters
+        self.cursor.execute(sql, (server, season, match_round, team, team))
+        # Returns the match if the team has one
+        return self.cursor.fetchone() or False
+
+    def save_veto(self, server, match, maps, bans):
+        """ Saves the result of a match's map veto, replacing any veto saved for the match before.
+
+        :param server: The discord id of the server the match is in.
+        :type server: str
+
+        :param match: The database id of the match.
+        :type match: int
+
+        :param maps: The maps to be played in order, ending with the decider.
+        :type maps: list
+
+        :param bans: The maps that were banned, in the order they were banned.
+        :type bans: list
+
+        :return: Whether or not the veto was saved.
+        :rtype: bool
+        """
         # The sql to be executed, using placeholders for the values to be inserted
-        sql = """Update "Players" p SET team = t.id FROM "Teams" t 
-        WHERE p.server = %s AND t.server = p.server AND p.discord = %s AND t.discord = %s;"""
+        sql = """INSERT INTO "Vetoes"(match, server, maps, bans) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (match) DO UPDATE SET maps=EXCLUDED.maps, bans=EXCLUDED.bans, completed_at=now()"""
         # Executes the sql query with the given parameters
-        cursor.execute(sql, (server, player, team))
+        self.cursor.execute(sql, (match, server, maps, bans))
         # Checks if the status message is as expected
-        if cursor.statusmessage == 'UPDATE 1':
-            # Returns a message saying the team was added successfully
-            return True
-        # If the status message is not as expected, return False
-        else:
+        return self.cursor.statusmessage == 'INSERT 0 1'
+
+    def _invalidate_roster(self, server, team):
+        """ Clears the cached roster of a team once the transaction is committed.
+        """
+        self.on_commit(lambda: ROSTER_CACHE.invalidate((server, team)))
+
+
+class SQLiteTransaction(Transaction):
+    """ A unit of work on the sqlite backend.  The operations that use postgres features, such as prepared statements,
+    functions, and notifications, are ran with plain sqlite queries instead.  The rest are shared with the postgres
+    backend, since the sqlite cursor takes the same placeholders.
+    """
+
+    def get_settings(self):
+        cursor = self.cursor
+        # The SQL code to get all of the server settings that are in the Settings table of the database.
+        sql = """SELECT server, c_symbol, game_type, current_season, current_round, admin_role, team_size
+            FROM "Settings";"""
+        cursor.execute(sql)
+        # Creates the settings of each server, using the server's discord id as the key
+        return {row[0]: SettingsStore.make_settings(*row[1:]) for row in cursor}
+
+    def get_server_settings(self, server):
+        cursor = self.cursor
+        # Creates the server's settings with the defaults if they don't exist yet
+        sql = """INSERT INTO "Settings"(server, c_symbol, game_type, current_season, current_round, admin_role,
+                team_size)
+            VALUES (%s, %s, %s, %s, %s, %s, %s) ON CONFLICT (server) DO NOTHING;"""
+        cursor.execute(sql, (server,) + tuple(Settings.SERVER_DEFAULTS))
+        # Gets the server's settings
+        sql = """SELECT c_symbol, game_type, current_season, current_round, admin_role, team_size FROM "Settings"
+            WHERE server = %s;"""
+        cursor.execute(sql, (server,))
+        row = cursor.fetchone()
+        if row is None:
             return False
+        # Creates the settings record of the server and stores it once it is committed
+        record = SettingsStore.make_settings(*row)
+        self.on_commit(lambda: Settings.SERVER_SETTINGS.put(server, record))
+        return record
+
+    def update_settings(self, server, setting_type, setting_val):
+        # Only the settings of the server's record can be updated, which keeps unknown column names out of the sql
+        if setting_type not in SettingsStore.ServerSettings._fields:
+            return False
+        # A sqlite database is only used by a single bot process, so there are no other processes to notify
+        sql = """UPDATE "Settings" SET {} = %s WHERE server = %s;""".format(setting_type)
+        self.cursor.execute(sql, (setting_val, server))
+        success = self.cursor.rowcount == 1
+        # Updates the settings in the server settings store once the change is committed
+        if success:
+            self._setting_changed(server, setting_type, setting_val)
+        return success
+
+    def add_player(self, server, discord, ign):
+        sql = """INSERT INTO "Players"(server, discord, ign) VALUES (%s, %s, %s);"""
+        self.cursor.execute(sql, (server, discord, ign))
+        return self.cursor.rowcount == 1
+
+    def _read_teams(self, server):
+        # Writing transactions already hold the database's write lock, so the teams don't have to be locked
+        self.cursor.execute("""SELECT discord, id FROM "Teams" WHERE server = %s;""", (server,))
+        return dict(self.cursor.fetchall())
+
+    def _move_players(self, moves):
+        sql = """UPDATE "Players" SET team = %s WHERE server = %s AND discord = %s;"""
+        self.cursor.executemany(sql, [(team_id, server, discord) for server, discord, team_id in moves])
+
+    def _insert_players(self, values):
+        # Inserts the players one at a time, since there is no network round trip to save by batching them
+        sql = """INSERT INTO "Players"(server, discord, ign, team) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (server, discord) DO NOTHING;"""
+        inserted = set()
+        for value in values:
+            self.cursor.execute(sql, value)
+            if self.cursor.rowcount == 1:
+                inserted.add(value[1])
+        return inserted
+
+    def change_ign(self, server, discord, ign):
+        cursor = self.cursor
+        sql = """UPDATE "Players" SET ign = %s WHERE server = %s AND discord = %s;"""
+        cursor.execute(sql, (ign, server, discord))
+        success = cursor.rowcount == 1
+        # Clears the cached roster of the player's team once the change is committed
+        if success:
+            sql = """SELECT t.discord FROM "Players" p JOIN "Teams" t ON t.id = p.team
+                WHERE p.server = %s AND p.discord = %s;"""
+            cursor.execute(sql, (server, discord))
+            row = cursor.fetchone()
+            if row is not None:
+                self._invalidate_roster(server, row[0])
+        return success
+
+    def set_team(self, server, player, team):
+        cursor = self.cursor
+        # Gets the player, the team they are on now, and the team they are being moved to
+        sql = """SELECT p.id, old_t.discord, t.id FROM "Players" p
+            JOIN "Teams" t ON t.server = p.server AND t.discord = %s
+            LEFT JOIN "Teams" old_t ON old_t.id = p.team
+            WHERE p.server = %s AND p.discord = %s;"""
+        cursor.execute(sql, (team, server, player))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        player_id, old_team, team_id = row
+        cursor.execute("""UPDATE "Players" SET team = %s WHERE id = %s;""", (team_id, player_id))
+        # Clears the cached rosters of the player's old and new teams once the change is committed
+        self._invalidate_roster(server, team)
+        if old_team is not None:
+            self._invalidate_roster(server, old_team)
+        return True
+
+    def join_team(self, server, player, team):
+        # Runs the same checks as the join_team function in postgres.  Writing transactions hold the database's write
+        # lock from the start, so players joining the same team at the same time are counted one after another.
+        cursor = self.cursor
+        cursor.execute("""SELECT id FROM "Teams" WHERE server = %s AND discord = %s;""", (server, team))
+        row = cursor.fetchone()
+        if row is None:
+            return JOIN_NO_TEAM
+        team_id = row[0]
+        sql = """SELECT p.id, p.team, t.discord FROM "Players" p LEFT JOIN "Teams" t ON t.id = p.team
+            WHERE p.server = %s AND p.discord = %s;"""
+        cursor.execute(sql, (server, player))
+        row = cursor.fetchone()
+        if row is None:
+            return JOIN_NO_PLAYER
+        player_id, player_team, old_team = row
+        if player_team == team_id:
+            return JOIN_ALREADY_ON_TEAM
+        sql = """SELECT (SELECT team_size FROM "Settings" WHERE server = %s),
+            (SELECT COUNT(*) FROM "Players" WHERE team = %s);"""
+        cursor.execute(sql, (server, team_id))
+        max_size, team_players = cursor.fetchone()
+        if max_size is not None and team_players >= max_size:
+            return JOIN_TEAM_FULL
+        cursor.execute("""UPDATE "Players" SET team = %s WHERE id = %s;""", (team_id, player_id))
+        # Clears the cached rosters of the player's old and new teams once the change is committed
+        self._invalidate_roster(server, team)
+        if old_team is not None:
+            self._invalidate_roster(server, old_team)
+        return JOIN_OK
+
+    def _read_players(self, server, team):
+        sql = """SELECT p.discord, p.ign FROM "Players" p JOIN "Teams" t ON t.id = p.team
+            WHERE p.server = %s AND t.server = p.server AND t.discord = %s;"""
+        self.cursor.execute(sql, (server, team))
+        return self.cursor.fetchall()
+
+    def _report_game(self, server, season, match_round, team_given, given_team_score, other_team_score):
+        cursor = self.cursor
+        # Finds the unreported games the team played in the round
+        sql = """SELECT m.id, m.team_1, m.team_2, t.id FROM "Matches" m
+            JOIN "Teams" t ON m.team_1 = t.id OR m.team_2 = t.id
+            WHERE m.round = %s AND t.discord = %s AND m.server = %s AND m.season = %s
+                AND m.team_1_score IS NULL AND m.team_2_score IS NULL;"""
+        cursor.execute(sql, (match_round, team_given, server, season))
+        games = cursor.fetchall()
+        # Reports the scores of each game, and adds the result to both teams' standings
+        for match, team_1, team_2, given_team in games:
+            if team_1 == given_team:
+                team_1_score, team_2_score = given_team_score, other_team_score
+            else:
+                team_1_score, team_2_score = other_team_score, given_team_score
+            sql = """UPDATE "Matches" SET team_1_score = %s, team_2_score = %s WHERE id = %s;"""
+            cursor.execute(sql, (team_1_score, team_2_score, match))
+            self._add_result(server, season, team_1, team_1_score, team_2_score)
+            self._add_result(server, season, team_2, team_2_score, team_1_score)
+        return len(games)
+
+    def _add_result(self, server, season, team, scored, conceded):
+        """ Adds the result of a game to a team's standings.
+        """
+        if scored > conceded:
+            points = Settings.POINTS_WIN
+        elif scored == conceded:
+            points = Settings.POINTS_DRAW
+        else:
+            points = Settings.POINTS_LOSS
+        sql = """INSERT INTO "Standings"(server, season, team, wins, losses, draws, round_difference, points)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (server, season, team) DO UPDATE SET wins = wins + excluded.wins,
+                losses = losses + excluded.losses, draws = draws + excluded.draws,
+                round_difference = round_difference + excluded.round_difference, points = points + excluded.points;"""
+        self.cursor.execute(sql, (server, season, team, int(scored > conceded), int(scored < conceded),
+                                  int(scored == conceded), scored - conceded, points))
+
+    def _lock_schedule(self, server):
+        # Transactions that write already hold the database's write lock, so no other schedule can be made at once
+        pass
+
+    def _insert_matches(self, values):
+        sql = """INSERT INTO "Matches"(server, season, round, team_1, team_2) VALUES (%s, %s, %s, %s, %s);"""
+        self.cursor.executemany(sql, values)
+
+    def get_standings(self, server, season):
+        sql = """SELECT t.discord, s.wins, s.losses, s.draws, s.round_difference, s.points
+            FROM "Standings" s JOIN "Teams" t ON t.id = s.team
+            WHERE s.server = %s AND s.season = %s
+            ORDER BY s.points DESC, s.round_difference DESC, s.wins DESC;"""
+        self.cursor.execute(sql, (server, season))
+        return self.cursor.fetchall()
+
+    def save_veto(self, server, match, maps, bans):
+        # The maps and bans are kept as json arrays
+        sql = """INSERT INTO "Vetoes"(match, server, maps, bans) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (match) DO UPDATE SET maps = excluded.maps, bans = excluded.bans,
+                completed_at = CURRENT_TIMESTAMP;"""
+        self.cursor.execute(sql, (match, server, json.dumps(maps), json.dumps(bans)))
+        return self.cursor.rowcount == 1
+
+
+# The type of transaction used by each backend, keyed by the backend name of the connection pool
+TRANSACTIONS = {'postgres': Transaction, 'sqlite': SQLiteTransaction}
+
+
+@contextmanager
+def transaction(commit=True, pool=None):
+    """ Starts a unit of work.  Every operation ran on the transaction shares one pooled connection, and they are all
+    committed together when the with block ends without an error, after which the transaction's on_commit callbacks
+    are called.  If the block raises an error nothing is committed and no callbacks are called.
+
+    :except DatabaseError: Raised if an error occurs in connect.
+
+    :param commit: Says if the transaction is committed.  Read only work can leave it False, in which case the
+    callbacks are never called.
+    :type commit: bool
+
+    :param pool: The connection pool to get the connection from.  Defaults to POOL.
+    :type pool: Pool.ConnectionPool, None
+
+    :return: The transaction, to run the operations with.
+    :rtype: Transaction
+    """
+    pool = pool or POOL
+    # Opens a database connection, with a cursor object to use in that connection
+    with connect(commit=commit, pool=pool) as cursor:
+        # Runs the operations with the queries of the pool's backend
+        work = TRANSACTIONS[pool.backend](cursor)
+        yield work
+    # Does the work that was waiting for the commit, such as clearing cached rosters and updating settings
+    if commit:
+        for callback in work.callbacks:
+            callback()
+
+
+def _single(method, commit=True):
+    """ Creates a function that runs a single Transaction operation in its own transaction.
+
+    :param method: The Transaction method to be ran.
+    :type method: function
+
+    :param commit: Says if the operation changes the database and has to be committed.
+    :type commit: bool
+
+    :return: The function, which takes the same arguments as the method apart from the transaction.
+    :rtype: function
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with transaction(commit=commit) as work:
+            # Looks the operation up on the transaction so the backend's version of it is ran
+            return getattr(work, method.__name__)(*args, **kwargs)
+    return wrapper
+
+
+# Each operation ran in a transaction of its own, for callers that only need to do one thing
+get_settings = _single(Transaction.get_settings, commit=False)
+get_server_settings = _single(Transaction.get_server_settings)
+update_settings = _single(Transaction.update_settings)
+add_player = _single(Transaction.add_player)
+import_roster = _single(Transaction.import_roster)
+change_ign = _single(Transaction.change_ign)
+set_team = _single(Transaction.set_team)
+join_team = _single(Transaction.join_team)
+update_game_scores = _single(Transaction.update_game_scores)
+get_round_matches = _single(Transaction.get_round_matches, commit=False)
+get_teams = _single(Transaction.get_teams, commit=False)
+create_schedule = _single(Transaction.create_schedule)
+get_standings = _single(Transaction.get_standings, commit=False)
+get_match = _single(Transaction.get_match, commit=False)
+save_veto = _single(Transaction.save_veto)
 
 
 def get_players(server, team, ign=False):
-    """ Gets a string that mentions all the team members of the given team.  Can also get the ign of the players.
+    """ Gets the players on the given team in a transaction of its own.  A connection is only checked out of the pool
+    when the team's roster isn't cached.
 
     :param server: The discord server id of the server the team exists in.
     :type server: str
@@ -281,71 +1173,56 @@ def get_players(server, team, ign=False):
     :param ign: Flag that decides whether or not the ign of the players should be retrieved as well.
     :type ign: bool
 
-    :return: A list of tuples that contain the discord id's of the players.  Will contain discord id's and the ign
-    of the players if the ign flag is True.  Returns False if there is a problem getting the player names.
-    Returns None if an error occurs in connect.
-    :rtype: list, bool, None
+    :return: A list of tuples that contain the discord id's of the players.  Will contain discord id's and the ign of
+    the players if the ign flag is True.  Returns False if there is a problem getting the player names.
+    :rtype: list, bool
     """
+    # Uses the cached roster of the team without connecting if there is one
+    players = ROSTER_CACHE.get((server, team))
+    if players is None:
+        with transaction(commit=False) as work:
+            players = work._load_players(server, team)
+    return _roster(players, ign)
 
-    # Opens a database connection where commits cannot occur, with a cursor object to use in that connection
-    with connect() as cursor:
-        # If the ign was desired
-        if ign:
-            # The sql to be executed, using placeholders for the values to be inserted
-            sql = """SELECT p.discord, p.ign FROM "Players" p, "Teams" t\n""" \
-                """\tWHERE p.server=%s AND t.server=p.server AND t.discord=%s AND p.team=t.id;"""
-        # If the ign was not desired
-        else:
-            # The sql to be executed, using placeholders for the values to be inserted
-            sql = """SELECT p.discord FROM "Players" p, "Teams" t\n""" \
-                """\tWHERE p.server=%s AND t.server=p.server AND t.discord=%s AND p.team=t.id;"""
-        # Executes the sql query with the given parameters
-        cursor.execute(sql, (server, team))
-        # Checks if the status message is as expected
-        if cursor.statusmessage == 'SELECT {}'.format(cursor.rowcount):
-            # Gets all of the players from the cursor and returns the list
-            return cursor.fetchall()
-        # If the status message was not as expected
-        else:
-            return False
 
+def _roster(players, ign):
+    """ Gets the players of a roster in the form get_players returns them.
 
-def update_game_scores(server, match_round, team_given, given_team_score, other_team_score):
-    """ Update the scores of the given team's game in the given round.  Only needs 1 team to update the proper game.
+    :param players: The discord id and ign of each player, or False if the roster couldn't be read.
+    :type players: list, bool
 
-    :param server: The discord id of the server the game is in.
-    :type server: str
+    :param ign: Flag that decides whether or not the ign of the players should be kept.
+    :type ign: bool
 
-    :param match_round: The round to change the score for.
-    :type match_round: int
+    :rtype: list, bool
+    """
+    if players is False:
+        return False
+    # Returns the players with their ign if it was desired
+    elif ign:
+        return list(players)
+    # Otherwise only returns the discord ids of the players
+    else:
+        return [(player[0],) for player in players]
 
-    :param team_given: The discord id of the given team.
-    :type team_given: str
 
-    :param given_team_score: The score of the given team.
-    :type given_team_score: int
+def check_team_size(server, team):
+    """ Gets the current number of players that are on the given team in a transaction of its own.
 
-    :param other_team_score: The score of the other team.
-    :type other_team_score: int
+    :param server: The discord server id of the server the team belongs to.
+    :type server: str
 
-    :return: Returns the success of updating the game scores.
-    :rtype: bool
-    """
+    :param team: The discord id of the team to be checked.
+    :type team: str
 
-    # Opens a database connection where commits cannot occur, with a cursor object to use in that connection
-    with connect(commit=True) as cursor:
-        # The sql to be executed to update the score of the game
-        sql = """UPDATE "Matches" m\n\tSET team_1_score=(CASE WHEN m.team_1=t.id THEN %s ELSE %s END), 
-            team_2_score=(CASE WHEN m.team_2=t.id THEN %s ELSE %s END) FROM "Teams" t\n\tWHERE m.round=%s AND 
-            t.discord=%s AND (m.team_1=t.id OR m.team_2=t.id) AND m.server=%s AND m.team_1_score IS NULL 
-            AND m.team_2_score IS NULL"""
-        # Attempts to execute the sql to update the game results
-        cursor.execute(sql, (given_team_score, other_team_score, given_team_score, other_team_score, match_round,
-                             team_given, server))
-        # Checks if the status message is as expected
-        if cursor.statusmessage == 'UPDATE 1':
-            # Returns a message saying the team was added successfully
-            return True
-        # If the status message is not as expected, return False
-        else:
-            return False
+    :return: The number of players on the team, or false if the settings were grabbed incorrectly.
+    :rtype: int, bool
+    """
+    # Gets the team's players, which are usually already cached by get_players
+    players = get_players(server, team)
+    # Returns the number of players if they were retrieved properly
+    if players is not False:
+        return len(players)
+    # Passes on False if there was an error getting the players
+    else:
+        return players
@@ -0,0 +1,82 @@
+import csv  # Used to write each table as a csv file
+import io  # Used to write the csv text into the compressed archive
+import zipfile  # Used to bundle the tables into a single compressed attachment
+import Database  # Used to stream the rows out of the database
+
+# The tables that are exported, as tuples of the name of the file they are written to, the header row, and the query
+# that gets the server's rows.  Teams are given by their role ids so the files can be read without the database ids.
+TABLES = (
+    ('teams.csv', ('team role id',), """SELECT discord FROM "Teams" WHERE server = %s ORDER BY id"""),
+    ('players.csv', ('discord id', 'ign', 'team role id'), """SELECT p.discord, p.ign, t.discord FROM "Players" p
+        LEFT JOIN "Teams" t ON t.id = p.team WHERE p.server = %s ORDER BY p.id"""),
+    ('matches.csv', ('season', 'round', 'team 1 role id', 'team 2 role id', 'team 1 score', 'team 2 score'),
+     """SELECT m.season, m.round, t1.discord, t2.discord, m.team_1_score, m.team_2_score FROM "Matches" m
+        JOIN "Teams" t1 ON t1.id = m.team_1 JOIN "Teams" t2 ON t2.id = m.team_2
+        WHERE m.server = %s ORDER BY m.season, m.round, m.id"""),
+)
+
+
+def write_table(cursor, rows_file, header, chunk_size):
+    """ Writes the rows of an executed query to a csv file a chunk at a time, so only one chunk of rows is ever held
+    in memory.
+
+    :param cursor: The named cursor the query was executed on, which keeps the rows on the database server.
+    :type cursor: psycopg2.extensions.cursor, SQLite.SQLiteCursor
+
+    :param rows_file: The text file the csv is written to.
+    :type rows_file: io.TextIOBase
+
+    :param header: The names of the columns.
+    :type header: tuple
+
+    :param chunk_size: The number of rows fetched from the database at a time.
+    :type chunk_size: int
+
+    :return: The number of rows that were written.
+    :rtype: int
+    """
+    writer = csv.writer(rows_file)
+    writer.writerow(header)
+    written = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return written
+        writer.writerows(rows)
+        written += len(rows)
+
+
+def write_archive(server, archive_file, chunk_size):
+    """ Writes the teams, players, and matches of a server to a zip archive with a csv file for each table.  Each
+    table is read through a server side cursor and compressed as it is written, so memory use doesn't grow with the
+    size of the league's history.  Blocks, so it should be ran on the database executor.
+
+    :except Database.DatabaseError: Raised if an error occurs in connect.
+
+    :param server: The discord id of the server to be exported.
+    :type server: str
+
+    :param archive_file: The binary file the archive is written to, which should be on disk for large leagues.
+    :type archive_file: io.BufferedIOBase
+
+    :param chunk_size: The number of rows fetched from the database at a time.
+    :type chunk_size: int
+
+    :return: The number of rows written for each table, keyed by the name of the table's file.
+    :rtype: dict
+    """
+    counts = dict()
+    # Opens a database connection where commits cannot occur, with a cursor object to use in that connection
+    with Database.connect() as cursor, zipfile.ZipFile(archive_file, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        # Reads every table from the same snapshot, so the files agree with each other even if games are reported
+        # during the export.  Sqlite transactions already read from a single snapshot.
+        if Database.POOL.backend == 'postgres':
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+        for name, header, sql in TABLES:
+            # A named cursor leaves the rows on the database server until they are fetched
+            with cursor.connection.cursor(name='export_' + name.partition('.')[0]) as table_cursor:
+                table_cursor.execute(sql, (server,))
+                with archive.open(name, 'w') as member:
+                    with io.TextIOWrapper(member, encoding='utf-8', newline='') as rows_file:
+                        counts[name] = write_table(table_cursor, rows_file, header, chunk_size)
+    return counts
@@ -0,0 +1,357 @@
+""" Runs the bot as several worker processes, each connecting to discord for some of the bot's shards, so the work of
+parsing and replying to messages is spread over more than one CPU core.  The launcher restarts workers that crash and
+writes the combined stats of every worker to its log.
+
+Run from the root of the repo with:
+    python Launcher.py
+"""
+import asyncio  # Used to send each worker's stats from its event loop
+import functools  # Used to pass the options of the client type given to a worker
+import importlib  # Used to load the client type given to a worker by its import path
+import logging  # Used to log the workers that crash and the combined stats
+import multiprocessing  # Used to run the workers
+import os  # Used to give each worker a log file of its own
+import queue  # Used to wait for the stats sent by the workers
+import sys  # Used to exit with an error when the launcher can't be started
+import time  # Used to time the restarts of crashed workers
+import Log  # Used to start the launcher's log
+import Metrics  # Used to combine the stats of the workers
+import Settings  # Used to get the launcher settings from the Config.yaml file
+
+# Writes the workers that crash and are restarted to the log
+launcher_log = logging.getLogger('launcher')
+
+# Writes the combined stats of the workers to the log
+stats_log = logging.getLogger('stats')
+stats_log.setLevel(logging.INFO)
+
+
+def assign_shards(shard_count, workers):
+    """ Splits the shards between the workers, giving each worker every workers-th shard so the shards are spread
+    evenly even when they don't divide equally.
+
+    :param shard_count: The number of shards the bot's servers are split into.
+    :type shard_count: int
+
+    :param workers: The number of worker processes.
+    :type workers: int
+
+    :except ValueError: Raised if there are more workers than shards, since some workers would have nothing to do.
+
+    :return: The ids of the shards of each worker.
+    :rtype: list
+    """
+    if not 0 < workers <= shard_count:
+        raise ValueError('There must be between 1 and {} workers for {} shards, not {}'
+                         .format(shard_count, shard_count, workers))
+    return [list(range(worker, shard_count, workers)) for worker in range(workers)]
+
+
+async def send_stats(worker_id, stats, interval):
+    """ Sends the worker's metrics to the launcher forever.
+
+    :param worker_id: The number of the worker.
+    :type worker_id: int
+
+    :param stats: The queue the launcher reads the stats from.
+    :type stats: multiprocessing.Queue
+
+    :param interval: The number of seconds between each time the stats are sent.
+    :type interval: float
+    """
+    while True:
+        await asyncio.sleep(interval)
+        stats.put((worker_id, os.getpid(), Metrics.METRICS.snapshot()))
+
+
+def run_worker(worker_id, shard_ids, shard_count, stats, stats_interval, client_path=None, client_options=None):
+    """ Runs the bot for some of its shards in a worker process.  Each worker has its own connection pool, settings
+    store, and caches, since nothing is shared between processes.
+
+    :param worker_id: The number of the worker.
+    :type worker_id: int
+
+    :param shard_ids: The shards the worker connects to discord for.
+    :type shard_ids: list
+
+    :param shard_count: The number of shards the bot's servers are split into.
+    :type shard_count: int
+
+    :param stats: The queue the worker's metrics are sent to the launcher on.
+    :type stats: multiprocessing.Queue
+
+    :param stats_interval: The number of seconds between each time the metrics are sent.
+    :type stats_interval: float
+
+    :param client_path: The import path of the client type to run, as the module and the class separated by a colon.
+    Used to run the worker with a fake gateway.  Defaults to Main.Client.
+    :type client_path: str, None
+
+    :param client_options: The keyword arguments given to each client created, on top of its shard.
+    :type client_options: dict, None
+    """
+    # Gives the worker a log file of its own, since rotating one file from several processes would lose lines.  It has
+    # to be set before Main.run starts the log.
+    base, extension = os.path.splitext(Settings.LOG)
+    Settings.LOG = '{}.worker-{}{}'.format(base, worker_id, extension)
+    import Main
+    client_type = Main.Client
+    if client_path is not None:
+        module, name = client_path.split(':')
+        client_type = getattr(importlib.import_module(module), name)
+    if client_options:
+        client_type = functools.partial(client_type, **client_options)
+    asyncio.ensure_future(send_stats(worker_id, stats, stats_interval))
+    Main.run(shard_ids, shard_count, client_type)
+
+
+class Worker:
+    """ The launcher's record of a worker process and the shards it runs.
+    """
+
+    __slots__ = ('id', 'shard_ids', 'process', 'started', 'restarts', 'restart_at', 'restart_delay', 'snapshot',
+                 'reported')
+
+    def __init__(self, worker_id, shard_ids, restart_delay):
+        """ Creates the record of a worker that hasn't been started.
+
+        :param worker_id: The number of the worker.
+        :type worker_id: int
+
+        :param shard_ids: The shards the worker connects to discord for.
+        :type shard_ids: list
+
+        :param restart_delay: The number of seconds before the worker is restarted the first time it crashes.
+        :type restart_delay: float
+        """
+        self.id = worker_id
+        self.shard_ids = shard_ids
+        # The running process of the worker, or None while it is waiting to be restarted
+        self.process = None
+        # The time the process was started
+        self.started = None
+        # The number of times the worker has been restarted
+        self.restarts = 0
+        # The time the worker is restarted at, or None if it isn't waiting to be restarted
+        self.restart_at = None
+        # The number of seconds the worker waits before it is restarted the next time it crashes
+        self.restart_delay = restart_delay
+        # The latest metrics sent by the running process, and the time they were received
+        self.snapshot = None
+        self.reported = None
+
+
+class Supervisor:
+    """ Starts the worker processes, restarts the ones that stop, and combines the stats they send.  Workers that
+    crash soon after starting wait twice as long each time before being restarted, so a worker that can't start
+    doesn't take up the launcher's time restarting it over and over.
+    """
+
+    def __init__(self, workers, shard_count, target=run_worker, args=(), stats_interval=60, restart_delay=5,
+                 max_restart_delay=300, stable_after=60, clock=time.monotonic):
+        """ Creates the supervisor.  No workers are started until start is called.
+
+        :param workers: The number of worker processes.
+        :type workers: int
+
+        :param shard_count: The number of shards the bot's servers are split into.
+        :type shard_count: int
+
+        :param target: The function ran by each worker process.  It is given the worker's number, its shard ids, the
+        shard count, the stats queue, the stats interval, and then the given args.
+        :type target: function
+
+        :param args: The extra arguments given to the target.
+        :type args: tuple
+
+        :param stats_interval: The number of seconds between each time the workers send their stats.
+        :type stats_interval: float
+
+        :param restart_delay: The number of seconds before a crashed worker is restarted.
+        :type restart_delay: float
+
+        :param max_restart_delay: The longest a worker can wait to be restarted.
+        :type max_restart_delay: float
+
+        :param stable_after: The number of seconds a worker has to run for before its restart delay is reset.
+        :type stable_after: float
+
+        :param clock: The function that gives the current time in seconds.
+        :type clock: function
+        """
+        self.shard_count = shard_count
+        self.target = target
+        self.args = args
+        self.stats_interval = stats_interval
+        self.initial_restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_after = stable_after
+        self.clock = clock
+        # New processes are spawned instead of forked, so they don't copy the launcher's threads or open files
+        self.context = multiprocessing.get_context('spawn')
+        # The queue the workers send their metrics to the launcher on
+        self.stats = self.context.Queue()
+        self.workers = [Worker(worker_id, shard_ids, restart_delay)
+                        for worker_id, shard_ids in enumerate(assign_shards(shard_count, workers))]
+        # The metrics of the worker processes that have stopped, so the combined stats don't drop when one restarts
+        self.retired = Metrics.Metrics()
+        # Says if the supervisor is stopping, so the workers it stops aren't restarted
+        self.stopping = False
+
+    def start(self):
+        """ Starts every worker.
+        """
+        for worker in self.workers:
+            self._start(worker)
+
+    def _start(self, worker):
+        """ Starts a worker's process.
+        """
+        worker.process = self.context.Process(
+            target=self.target, name='worker-{}'.format(worker.id),
+            args=(worker.id, worker.shard_ids, self.shard_count, self.stats, self.stats_interval) + tuple(self.args))
+        worker.process.start()
+        worker.started = self.clock()
+        worker.restart_at = None
+        worker.snapshot = None
+        worker.reported = None
+
+    def poll(self, timeout=1.0):
+        """ Reads the stats sent by the workers, waiting up to the timeout for the first of them, then restarts the
+        workers that stopped and are done waiting.
+
+        :param timeout: The most seconds to wait for stats.
+        :type timeout: float
+        """
+        try:
+            self._receive(self.stats.get(timeout=timeout))
+            while True:
+                self._receive(self.stats.get_nowait())
+        except queue.Empty:
+            pass
+        now = self.clock()
+        for worker in self.workers:
+            if worker.process is not None and not worker.process.is_alive():
+                self._stopped(worker, now)
+            if worker.restart_at is not None and worker.restart_at <= now and not self.stopping:
+                worker.restarts += 1
+                Metrics.METRICS.count('launcher.restarts')
+                self._start(worker)
+
+    def _receive(self, message):
+        """ Keeps the stats sent by a worker, ignoring stats sent by a process that has already been replaced.
+        """
+        worker_id, pid, snapshot = message
+        worker = self.workers[worker_id]
+        if worker.process is not None and worker.process.pid == pid:
+            worker.snapshot = snapshot
+            worker.reported = self.clock()
+
+    def _stopped(self, worker, now):
+        """ Schedules the restart of a worker whose process stopped.
+        """
+        launcher_log.error('Worker %s running shards %s stopped with exit code %s', worker.id, worker.shard_ids,
+                           worker.process.exitcode)
+        Metrics.METRICS.count('launcher.crashes')
+        if worker.snapshot is not None:
+            self.retired.merge(worker.snapshot)
+        # Waits longer before restarting a worker that keeps crashing right after it starts
+        if now - worker.started < self.stable_after:
+            delay = worker.restart_delay
+            worker.restart_delay = min(worker.restart_delay * 2, self.max_restart_delay)
+        else:
+            delay = worker.restart_delay = self.initial_restart_delay
+        worker.process = None
+        worker.snapshot = None
+        worker.restart_at = now + delay
+
+    def metrics(self):
+        """ Combines the metrics of every worker, including the ones that have been restarted.
+
+        :rtype: Metrics.Metrics
+        """
+        combined = Metrics.Metrics()
+        combined.merge(self.retired.snapshot())
+        for worker in self.workers:
+            if worker.snapshot is not None:
+                combined.merge(worker.snapshot)
+        return combined
+
+    def report(self):
+        """ Describes the health and throughput of each worker, followed by the combined metrics of every worker.
+
+        :rtype: list
+        """
+        now = self.clock()
+        lines = ['{:<8} {:>8} {:<16} {:<10} {:>8} {:>12} {:>14}'.format(
+            'worker', 'pid', 'shards', 'state', 'restarts', 'messages/s', 'last stats s')]
+        for worker in self.workers:
+            if worker.process is not None:
+                pid, state = worker.process.pid, 'running'
+            else:
+                pid, state = '-', 'restarting'
+            throughput = 0.0
+            if worker.snapshot is not None and worker.snapshot['seconds'] > 0:
+                messages = worker.snapshot['histograms'].get('on_message', (None, 0))[1]
+                throughput = messages / worker.snapshot['seconds']
+            last_stats = '{:.0f}'.format(now - worker.reported) if worker.reported is not None else '-'
+            lines.append('{:<8} {:>8} {:<16} {:<10} {:>8} {:>12.1f} {:>14}'.format(
+                worker.id, pid, ','.join(str(shard) for shard in worker.shard_ids), state, worker.restarts,
+                throughput, last_stats))
+        return lines + self.metrics().report()
+
+    def stop(self, timeout=10):
+        """ Stops every worker, waiting up to the timeout for each of them to exit.
+
+        :param timeout: The number of seconds to wait for each worker.
+        :type timeout: float
+        """
+        self.stopping = True
+        for worker in self.workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is not None:
+                worker.process.join(timeout)
+
+    def run(self, report_interval=None):
+        """ Starts the workers and looks after them until the launcher is interrupted.
+
+        :param report_interval: The number of seconds between each time the health and stats of the workers are
+        written to the log, or None to never write them.
+        :type report_interval: float, None
+        """
+        self.start()
+        next_report = None if not report_interval else self.clock() + report_interval
+        try:
+            while True:
+                self.poll()
+                if next_report is not None and self.clock() >= next_report:
+                    stats_log.info('\n'.join(self.report()))
+                    next_report += report_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def main():
+    # Only the launcher's process writes to the main log, since each worker has a log file of its own
+    Log.start_from_settings()
+    if Settings.DB_BACKEND == 'sqlite' and Settings.LAUNCHER_WORKERS > 1:
+        print('The sqlite backend can only be used by one process, set launcher.workers to 1 or use postgres')
+        sys.exit(1)
+    try:
+        supervisor = Supervisor(Settings.LAUNCHER_WORKERS, Settings.LAUNCHER_SHARD_COUNT,
+                                stats_interval=Settings.LAUNCHER_STATS_INTERVAL,
+                                restart_delay=Settings.LAUNCHER_RESTART_DELAY,
+                                max_restart_delay=Settings.LAUNCHER_MAX_RESTART_DELAY,
+                                stable_after=Settings.LAUNCHER_STABLE_AFTER)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    supervisor.run(Settings.STATS_LOG_INTERVAL)
+
+
+if __name__ == '__main__':
+    main()
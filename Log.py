@@ -0,0 +1,89 @@
+import logging  # Used to send the bot's log records through a queue
+import logging.handlers  # Used to write the log from a background thread and rotate the log files
+import queue  # Used to hand log records to the background thread
+import json  # Used to write each log record as a single line of json
+import atexit  # Used to write the records that are still queued when the bot stops
+import copy  # Used to copy the records that are queued so other handlers see them unchanged
+import Settings  # Holds the location and rotation settings of the log file
+
+# The extra fields a log record can be given, which are written with the record when they are set
+FIELDS = ('command', 'server', 'query', 'duration')
+
+
+class StructuredFormatter(logging.Formatter):
+    """ Formats each log record as a line of json holding its time, level, logger, and message, along with any of the
+    extra FIELDS it was given and the traceback of its exception.
+    """
+
+    def format(self, record):
+        entry = {'time': self.formatTime(record), 'level': record.levelname, 'logger': record.name,
+                 'message': record.getMessage()}
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """ Puts log records on the queue without formatting them first, so the background thread can write them with
+    their fields and exception kept apart.  Only the message is filled in, since its arguments could change before
+    the record is written.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def start(path, max_bytes, backup_count, level=logging.ERROR):
+    """ Sends the records of the root logger through a queue to a background thread that writes them to a rotating
+    log file, so logging never waits on the disk.
+
+    :param path: The location of the log file.
+    :type path: str
+
+    :param max_bytes: The size the log file can grow to before it is rotated.
+    :type max_bytes: int
+
+    :param backup_count: The number of rotated log files that are kept.
+    :type backup_count: int
+
+    :param level: The lowest level of record that is written.
+    :type level: int
+
+    :return: The listener that writes the queued records, which is already started.
+    :rtype: logging.handlers.QueueListener
+    """
+    # The records waiting to be written
+    records = queue.Queue()
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+    file_handler.setFormatter(StructuredFormatter())
+    listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+    # Replaces any handlers the root logger had with the queue
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(records))
+    root.setLevel(level)
+    listener.start()
+    # Writes out the rest of the queue before the process exits
+    atexit.register(listener.stop)
+    return listener
+
+
+def start_from_settings():
+    """ Starts the log with the location and rotation settings from the Config.yaml file.  Called by whatever runs the
+    bot, rather than when the module is imported, so tools and tests that import the bot's modules don't write a log
+    file.
+
+    :return: The listener that writes the queued records, which is already started.
+    :rtype: logging.handlers.QueueListener
+    """
+    return start(Settings.LOG, Settings.LOG_MAX_BYTES, Settings.LOG_BACKUP_COUNT)
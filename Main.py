@@ -1,262 +1,923 @@
 import discord  # Used to connect to discord
+import aiohttp  # Used to download files attached to commands
 import Settings  # Used to get server settings from the bot
-import Database  # Used to initialize the server settings from the bot
+import Log  # Used to start the error log, which is written by a background thread so logging never blocks the bot
+import AsyncDatabase  # Used to access the database without blocking the bot
+import Commands  # Used to register the commands of the bot and parse messages into them
+import Database  # Used to identify this process in setting change notifications, and for result codes and errors
+import SettingsListener  # Used to pick up setting changes made by other bot processes
+import Roster  # Used to read the rosters given to the importroster command
+import Scheduler  # Used to create the matches of a season
+import BanPick  # Used to run the map vetoes of matches
+import asyncio  # Used to send messages from the veto turn timers
+import Metrics  # Used to time the commands, queries, and messages of the bot
+import time  # Used to time how long messages take to handle
+import logging  # Used to write the bot's metrics to the log
+import RateLimit  # Used to stop members from using commands faster than the database can keep up with
+import Outbound  # Used to queue, merge, and split the messages the bot sends
+import tempfile  # Used to build exports on disk instead of in memory
+import Startup  # Used to time each phase of starting the bot
+import MatchIndex  # Used to check score reports against the matches of the current round
+
+
+# Writes the errors of commands to the log
+error_log = logging.getLogger('commands')
+
+# Writes the bot's metrics to the log.  Its level is set so the metrics are written even though only errors are
+# written by the rest of the bot.
+stats_log = logging.getLogger('stats')
+stats_log.setLevel(logging.INFO)
+
+# Times each phase of starting the bot, measured from when the settings started loading
+startup = Startup.StartupTimer(Settings.STARTED)
+startup.record('config', Settings.STARTED, Settings.STARTED + Settings.CONFIG_SECONDS)
+
+
+class Client(discord.Client):
+    """ The discord client of the bot, which sends its text messages through a queue for each channel and times every
+    message it sends to discord.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The queue that merges, splits, and retries the messages sent to each channel
+        self.outbound = Outbound.OutboundQueue(self.send_now)
+        # Says if the background work started the first time the bot is ready has been started
+        self.started = False
+        # The task warming up the database while the bot logs in, or None if there is no warm up
+        self.warming = None
+
+    async def login(self, *args, **kwargs):
+        with startup.phase('login'):
+            return await super().login(*args, **kwargs)
+
+    async def send_message(self, destination, content=None, *args, **kwargs):
+        # Only plain text messages are queued, since they are the only ones that can be merged and split
+        if content is None or args or kwargs:
+            return await self.send_now(destination, content, *args, **kwargs)
+        return await self.outbound.send(destination, content)
+
+    async def send_now(self, destination, content=None, *args, **kwargs):
+        """ Sends a message to discord right away, skipping the queue.
+        """
+        start = time.perf_counter()
+        try:
+            return await super().send_message(destination, content, *args, **kwargs)
+        finally:
+            Metrics.METRICS.observe('discord.send_message', time.perf_counter() - start)
 
 
 # The client that connects the bot to discord
-client = discord.Client()
+client = Client()
+
+# Applies the setting changes made by other bot processes to this process's settings
+settings_listener = SettingsListener.SettingsListener(Settings.DB_CONN_STRING, Settings.DB_NOTIFY_CHANNEL,
+                                                      Settings.SERVER_SETTINGS, origin=Database.PROCESS_ID,
+                                                      match_index=Database.MATCH_INDEX)
+
+
+def log_database_error(error, command=None, server=None):
+    """ Writes a database error to the log along with the command and server it happened in.
+
+    :param error: The error to be logged.
+    :type error: Database.DatabaseError
+
+    :param command: The name of the command that was being ran.
+    :type command: str, None
+
+    :param server: The discord id of the server the command was used in.
+    :type server: str, None
+    """
+    error_log.error('Database error: %s', error, exc_info=error,
+                    extra={'command': command, 'server': server, 'query': error.query, 'duration': error.duration})
+
+
+async def save_veto(session):
+    """ Saves a finished map veto to the database.
+
+    :param session: The finished veto.
+    :type session: BanPick.VetoSession
+    """
+    server, match = session.key
+    try:
+        await AsyncDatabase.save_veto(server, match, session.picks, session.bans)
+    # The veto finished without a command to reply to, so the error is only logged
+    except Database.DatabaseError as e:
+        log_database_error(e, 'veto', server)
+
+
+# The map vetoes that are in progress
+vetoes = BanPick.SessionManager(Settings.VETO_MAPS, Settings.VETO_SEQUENCE, Settings.VETO_TURN_TIMEOUT,
+                                save=save_veto)
+
+# Limits how quickly each member and each server can use commands
+limiter = RateLimit.RateLimiter(Settings.RATE_LIMIT_USER_CAPACITY, Settings.RATE_LIMIT_USER_RATE,
+                                Settings.RATE_LIMIT_SERVER_CAPACITY, Settings.RATE_LIMIT_SERVER_RATE,
+                                Settings.RATE_LIMIT_COSTS, default_cost=Settings.RATE_LIMIT_DEFAULT_COST,
+                                max_delay=Settings.RATE_LIMIT_MAX_DELAY, idle_timeout=Settings.RATE_LIMIT_IDLE_TIMEOUT)
 
 
 @client.event
-async def on_ready():
+async def on_ready(shard=None):
     """ Is ran when the client is started
+
+    :param shard: The client whose shard is ready, or None for the bot's only client.
+    :type shard: Client, None
     """
+    # Each shard's client only knows who it is logged in as once its own shard is ready
+    shard = shard or client
     print('Logged in as')
-    print(client.user.name)
-    print(client.user.id)
+    print(shard.user.name)
+    print(shard.user.id)
     print('--------------------')
 
-    # Loads the settings from the database into the Settings.py server settings dictionary.
-    Settings.SERVER_SETTINGS = Database.get_settings()
+    # Starts listening for setting changes and writing the metrics to the log the first time the bot is ready
+    if not client.started:
+        client.started = True
+        startup.record('ready', Settings.STARTED)
+        asyncio.ensure_future(log_startup())
+        # Only postgres can send this process the setting changes made by other bot processes
+        if Settings.DB_BACKEND == 'postgres':
+            settings_listener.start()
+        if Settings.STATS_LOG_INTERVAL:
+            asyncio.ensure_future(log_stats(Settings.STATS_LOG_INTERVAL))
+
+
+async def warm_up():
+    """ Opens the pooled database connections and loads the settings of every server while the bot logs in to discord,
+    so the first messages after a restart don't each wait for a new connection and a settings query.
+    """
+    try:
+        with startup.phase('pool'):
+            await AsyncDatabase.run(Database.POOL.warm)
+        if Settings.STARTUP_PREFETCH_SETTINGS:
+            with startup.phase('settings'):
+                records = await AsyncDatabase.get_settings()
+            # Settings loaded by messages during the warm up are at least as new, so they are kept
+            if records:
+                Settings.SERVER_SETTINGS.load_all({server: record for server, record in records.items()
+                                                   if server not in Settings.SERVER_SETTINGS})
+    # The bot can still run without the warm up, loading each server's settings when they are first needed
+    except Database.DatabaseError as e:
+        log_database_error(e)
+    except Database.DRIVER_ERRORS as e:
+        error_log.error('The database connections could not be opened: %s', e, exc_info=e)
+
+
+async def log_startup():
+    """ Writes how long each phase of starting the bot took to the log, once the bot is ready and warmed up.
+    """
+    if client.warming is not None:
+        await asyncio.wait([client.warming])
+    report = '\n'.join(startup.report())
+    print(report)
+    stats_log.info(report)
+
+
+async def log_stats(interval):
+    """ Writes the bot's metrics to the log forever.
+
+    :param interval: The number of seconds between each time the metrics are written.
+    :type interval: float
+    """
+    while True:
+        await asyncio.sleep(interval)
+        stats_log.info('\n'.join(Metrics.METRICS.report()))
+
+
+async def get_server_settings(server):
+    """ Gets the settings of the discord server, loading them from the database the first time they are needed.
+
+    :param server: The discord id of the server to have the settings checked for.
+    :type server: str
+
+    :return: Returns the given server's settings, or None if they couldn't be loaded.
+    :rtype: SettingsStore.ServerSettings, None
+    """
+    # Uses the settings that are already loaded if there are any
+    settings = Settings.SERVER_SETTINGS.get(server)
+    # Otherwise loads the settings from the database, creating them if the server is new
+    if settings is None:
+        settings = await AsyncDatabase.get_server_settings(server)
+    # Returns None instead of False so callers only have to check one value
+    return settings or None
+
+
+def is_admin(member, settings):
+    """ Checks if a member is an admin of their server, either by having the server's admin role or by having the
+    administrator permission.
+
+    :param member: The member to be checked.
+    :type member: discord.Member
+
+    :param settings: The settings of the member's server.
+    :type settings: SettingsStore.ServerSettings
+
+    :return: Whether or not the member is an admin.
+    :rtype: bool
+    """
+    if settings.admin_role is not None and any(role.id == settings.admin_role for role in member.roles):
+        return True
+    return member.server_permissions.administrator
+
+
+@Commands.command('help')
+async def help_command(message, args, settings):
+    """ Sends the user a private message with a list of the commands that the bot has.
+    """
+    # Sends the user a list of commands that the bot has
+    help_string = "The bot has the following commands that it uses. The ***{1}*** server uses `{0}` as its" \
+        " command symbol, but beware as other servers may use a different symbol.\n" \
+        "`{0}help` - used to send a private message with a list of the commands that the bot has.\n" \
+        "`{0}addplayer your-ign` - adds you as a player in the server.\n" \
+        "`{0}changeign your-ign` - changes your ign.\n" \
+        "`{0}setteam @team-role` - sets the team you play for.\n" \
+        "`{0}mentionteam @team-role` - lists the players of a team and their igns.\n" \
+        "`{0}setcommandsymbol new-symbol` - changes the command symbol the server uses.\n" \
+        "`{0}score your-score opponent-score @your-team` - reports the score of your team's match this round.\n" \
+        "`{0}standings` - shows the standings of the current season.\n" \
+        "`{0}veto @your-team` - starts the map veto of your team's match this round.\n" \
+        "`{0}ban map-name` and `{0}pick map-name` - take your team's turn in a map veto.\n" \
+        "The following commands can only be used by the server's admins:\n" \
+        "`{0}importroster` - adds players from an attached csv file, or from one player on each line after the " \
+        "command.\n" \
+        "`{0}schedule` - creates the matches of the current season for all of the teams.\n" \
+        "`{0}export` - sends the server's teams, players, and matches as csv files.\n" \
+        "`{0}stats` - shows how long the bot's commands, queries, and messages are taking." \
+        .format(settings.c_symbol, message.server.name)
+    # Sends the help string to the user through private message
+    await client.send_message(message.author, help_string)
+
+
+@Commands.command('addplayer', number_of_args=2,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}addplayer your-ign`\nIf your ign is multiple words, place it in quotes, '
+                        'for example `"your-ign"`')
+async def addplayer(message, args, settings):
+    """ Adds a player to the database. They won't have a team until it is set. Requires the user to give their ign.
+    """
+    # Attempts to add the player to the database, which conflicts with the player's row if they were already added
+    try:
+        success = await AsyncDatabase.add_player(message.server.id, message.author.id, args[1])
+    except Database.Conflict:
+        success = False
+    # Checks if the player was added successfully
+    if success:
+        # Sets a success message as the new message
+        new_message = '<@{}> was successfully added.'.format(message.author.id)
+    # If there was an error adding the player, set the new message to say there was an error.
+    else:
+        new_message = 'There was an error adding <@{}> as a player.  ' \
+                      'Is it possible you are already a player in the server?'.format(message.author.id)
+    # Output the new message
+    await client.send_message(message.channel, new_message)
+
+
+@Commands.command('changeign', number_of_args=2,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}changeign your-ign`\nIf your ign is multiple words, place it in quotes, for example'
+                        '`"your-ign"`')
+async def changeign(message, args, settings):
+    """ Changes the ign of the player in the Database to the given ign.
+    """
+    # Attempts to change the player's ign
+    success = await AsyncDatabase.change_ign(message.server.id, message.author.id, args[1])
+    # If the ign was changed successfully
+    if success:
+        # Sets the new message to say the ign was changed successfully
+        new_message = 'The ign of <@{}> was successfully changed to {}'.format(message.author.id, args[1])
+    # If there was an error changing the players ign, sets the new message to an error message
+    else:
+        new_message = 'There was an error changing the ign of <@{}>'.format(message.author.id)
+    # Outputs the new message through a discord message
+    await client.send_message(message.channel, new_message)
+
+
+@Commands.command('mentionteam', number_of_args=2, number_of_roles=1,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}mentionteam @team-role` where @team-role is the mention of the team\n')
+async def mentionteam(message, args, settings):
+    """ Mention the players on a given team.
+    """
+    # The role id of the team that was mentioned
+    team = message.raw_role_mentions[0]
+    # Tries to get the players from the database
+    players = await AsyncDatabase.get_players(message.server.id, team, ign=True)
+    # If the players were found, change the new message to a success message
+    if players is not False:
+        # Checks to see if the team is not empty
+        if len(players) > 0:
+            # Lists the mention and ign of each of the team's players, which the outbound queue splits into more than
+            # one message if the team is too big for one
+            lines = ['Players on the <@&{}> team:'.format(team),
+                     '-----------------------------------------------------------------']
+            lines.extend('<@{}> - {}'.format(discord_id, ign) for discord_id, ign in players)
+            new_message = '\n'.join(lines)
+        # If there were no players on the team
+        else:
+            new_message = 'The <@&{}> team is empty'.format(team)
+    # If there was an error getting the players of the team
+    else:
+        new_message = 'There was an error retrieving the players on the <@&{}> team. ' \
+                      'Are you sure that it is a registered team and not just a normal ' \
+                      'discord role?'.format(team)
+    # Outputs the new message through a discord message
+    await client.send_message(message.channel, new_message)
+
+
+# TODO Set privilege of command to be only so captains or admins can do it
+@Commands.command('setteam', number_of_args=2, number_of_roles=1,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}setteam @team-role` where @team-role is the mention of the team\n')
+async def setteam(message, args, settings):
+    """ Adds a player to the given team.
+    """
+    # The role id of the team that was mentioned
+    team = message.raw_role_mentions[0]
+    # Attempts to move the player onto the team, which only happens if the team has room
+    result = await AsyncDatabase.join_team(message.server.id, message.author.id, team)
+    # Sets the new message according to the result of the join
+    if result == Database.JOIN_OK:
+        new_message = '<@{}>\'s team was set successfully to team <@&{}>'.format(message.author.id, team)
+    elif result == Database.JOIN_TEAM_FULL:
+        new_message = 'The <@&{}> team is already full, so <@{}> could not join it.'.format(team, message.author.id)
+    elif result == Database.JOIN_ALREADY_ON_TEAM:
+        new_message = '<@{}> is already on the <@&{}> team.'.format(message.author.id, team)
+    elif result == Database.JOIN_NO_PLAYER:
+        new_message = '<@{}> is not a player in this server yet.  Use `{}addplayer your-ign` to become one.' \
+            .format(message.author.id, settings.c_symbol)
+    else:
+        new_message = 'There was a problem setting <@{}>\'s team to <@&{}>.  ' \
+                      'Are you sure the role is a team role?'.format(message.author.id, team)
+    # Outputs the new message through a discord message
+    await client.send_message(message.channel, new_message)
+
+
+# TODO Change it so that only admins can do this command
+@Commands.command('setcommandsymbol', number_of_args=2,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}setcommandsymbol new-symbol` where new-symbol is the desired new command symbol.\n'
+                        'Command symbols should not contain a space, as it may break the bot in your server.')
+async def setcommandsymbol(message, args, settings):
+    """ Changes the server's command symbol.
+    """
+    # Attempts to change the command symbol of the server to the given symbol
+    success = await AsyncDatabase.update_settings(message.server.id, 'c_symbol', args[1])
+    # Checks if the symbol was changed successfully and creates a new message accordingly
+    if success:
+        new_message = 'The server\'s command symbol was changed to `{}`'.format(args[1])
+    else:
+        new_message = 'There was an error changing the command symbol of the bot to {}'.format(args[1])
+    # Outputs the new message through discord
+    await client.send_message(message.channel, new_message)
+
+
+async def get_round_matches(server, settings):
+    """ Gets the matches of a server's current round from the match index, loading them from the database if they
+    haven't been loaded yet.
+
+    :param server: The discord id of the server.
+    :type server: str
+
+    :param settings: The settings of the server, which give its current season and round.
+    :type settings: SettingsStore.ServerSettings
+
+    :return: The matches of the round keyed by the discord role id of each team playing in them.
+    :rtype: dict
+    """
+    matches = Database.MATCH_INDEX.get(server, settings.current_season, settings.current_round)
+    if matches is None:
+        # The version of the index before the matches are read, so matches dropped during the read aren't kept
+        version = Database.MATCH_INDEX.version
+        rows = await AsyncDatabase.get_round_matches(server, settings.current_season, settings.current_round)
+        matches = Database.MATCH_INDEX.load(server, settings.current_season, settings.current_round, rows, version)
+    return matches
+
+
+# TODO Add a try case to convert the number arguments into integers, giving an error if input is other
+@Commands.command('score', number_of_args=4, number_of_roles=1,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}score your-score opponent-score @your-team`, where your-score is an integer score '
+                        'for your team, opponent-score is an integer score for your opponent, and @your-team '
+                        'is the role mention of your team.')
+async def score(message, args, settings):
+    """ Sets the score of a game to the given scores, the first score being the score of the team submitting scores.
+    Needs the team to be mentioned to submit the proper game scores.  Reports are checked against the matches of the
+    current round first, so reports that can't succeed don't go to the database.
+    """
+    # The round that the game is being reported for
+    current_round = settings.current_round
+    team = message.raw_role_mentions[0]
+    scores_given = args[1].isdigit() and args[2].isdigit()
+    # Finds the team's match in the round, loading the round's matches if they aren't in the index yet
+    match = None
+    if scores_given:
+        match = (await get_round_matches(message.server.id, settings)).get(team)
+    # Checks for reports that can't succeed
+    new_message = None
+    if not scores_given:
+        new_message = 'Scores have to be whole numbers, such as `{}score 7 5 @your-team`.' \
+            .format(settings.c_symbol)
+    elif match is None:
+        new_message = '<@&{}> has no game in round {} to report.'.format(team, current_round)
+    elif match.state == MatchIndex.REPORTED:
+        new_message = 'Your game for round {} was already reported.'.format(current_round)
+    # Turns away the second of two reports sent at the same time, such as by the captains of both teams
+    elif match.state == MatchIndex.PENDING:
+        new_message = 'Your game for round {} is already being reported.'.format(current_round)
+    # Answers the reports that can't succeed without going to the database
+    if new_message is not None:
+        Metrics.METRICS.count('score.rejected')
+    else:
+        # Marks the game so other reports of it are turned away until this one is done
+        match.state = MatchIndex.PENDING
+        try:
+            # Attempts to set the score of the game, which is rolled back unless exactly one game is reported
+            await AsyncDatabase.update_game_scores(message.server.id, settings.current_season, current_round, team,
+                                                   int(args[1]), int(args[2]))
+            new_message = 'Your game for round {} was successfully reported with a score of {} for your team ' \
+                          'and {} for the other team'.format(current_round, args[1], args[2])
+        # If the report didn't match exactly one game the index didn't match the database, such as when the game was
+        # reported by another bot process, so the round's matches are loaded again the next time they are needed
+        except Database.GameNotReported as e:
+            Database.MATCH_INDEX.drop(message.server.id)
+            # More than one game matching is a problem with the schedule, so it is logged for the bot's admins
+            if e.games > 1:
+                log_database_error(e, 'score', message.server.id)
+            new_message = 'There was an error setting the score for your game. Are you sure the game ' \
+                          'wasn\'t already reported? Use {}help to get a message sent to you with use ' \
+                          'instructions.'.format(settings.c_symbol)
+        finally:
+            # The game is marked as reported when the scores are committed, so a game still pending wasn't reported
+            if match.state == MatchIndex.PENDING:
+                match.state = MatchIndex.UNREPORTED
+    await client.send_message(message.channel, new_message)
+
+
+async def download_roster(url, max_bytes):
+    """ Downloads a roster file attached to a message, reading no more of it than the largest file allowed.
+
+    :except aiohttp.ClientError: Raised if the file couldn't be downloaded.
+    :except ValueError: Raised if the file is larger than max_bytes or isn't utf-8 text.
+
+    :param url: The url of the attachment.
+    :type url: str
 
+    :param max_bytes: The largest file that is read.
+    :type max_bytes: int
 
-def check_c_symbol(server):
-    """ Gets the server symbol from the discord server.
+    :return: The text of the file.
+    :rtype: str
+    """
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise aiohttp.ClientError('The download returned status {}'.format(response.status))
+            # Reads up to one byte past the limit, so a file that is too large can be told apart from one right at the
+            # limit without the rest of it being downloaded
+            data = bytearray()
+            while len(data) <= max_bytes:
+                chunk = await response.content.read(max_bytes + 1 - len(data))
+                if not chunk:
+                    break
+                data += chunk
+    if len(data) > max_bytes:
+        raise ValueError('The file is larger than {} bytes'.format(max_bytes))
+    return bytes(data).decode('utf-8-sig')
+
+
+@Commands.command('importroster', admin_only=True,
+                  usage='<@{}> did not use the command properly.  To use, either attach a csv file with the columns '
+                        'discord id, ign, and team role id, or put one player on each line after the command:\n'
+                        '`{}importroster`\n`@member your-ign @team-role`\n`@member "multi word ign" @team-role`')
+async def importroster(message, args, settings):
+    """ Adds many players and their teams at once, from either an attached csv file or the lines of the message.
+    """
+    # Reads the roster from the attached csv file if there is one
+    if message.attachments:
+        attachment = message.attachments[0]
+        # Turns away files that are too large before downloading them
+        if attachment.get('size', 0) > Settings.IMPORT_ROSTER_MAX_BYTES:
+            await client.send_message(message.channel, '<@{}> the roster file is too large, it can be at most {} KB.'
+                                      .format(message.author.id, Settings.IMPORT_ROSTER_MAX_BYTES // 1000))
+            return
+        try:
+            text = await asyncio.wait_for(download_roster(attachment['url'], Settings.IMPORT_ROSTER_MAX_BYTES),
+                                          Settings.IMPORT_ROSTER_DOWNLOAD_TIMEOUT)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            error_log.error('Roster download failed: %s', e, extra={'command': 'importroster',
+                                                                     'server': message.server.id})
+            await client.send_message(message.channel, '<@{}> the roster file could not be downloaded, please try '
+                                                       'again.'.format(message.author.id))
+            return
+        rows, failures = Roster.parse_csv(text)
+    # Otherwise reads the roster from the lines after the command
+    else:
+        rows, failures = Roster.parse_lines(message.content.partition('\n')[2])
+        # Shifts the line numbers so they count the line the command is on
+        rows = [(number + 1, discord, ign, team) for number, discord, ign, team in rows]
+        failures = [(number + 1, reason) for number, reason in failures]
 
-    :param server: The discord id of the server to have the setting checked for.
+    # Outputs how to use the command if no players were given
+    if not rows and not failures:
+        new_message = Commands.COMMANDS['importroster'].usage.format(message.author.id, settings.c_symbol)
+    else:
+        # Attempts to add the players to the database
+        imported, import_failures = await AsyncDatabase.import_roster(message.server.id, rows)
+        failures = sorted(failures + import_failures)
+        new_message = '{} players were imported.'.format(imported)
+        # Lists the rows that failed, up to a limit so the message stays readable
+        if failures:
+            new_message += '  {} rows could not be imported:\n'.format(len(failures))
+            new_message += '\n'.join('row {}: {}'.format(number, reason) for number, reason in failures[:20])
+            if len(failures) > 20:
+                new_message += '\n...and {} more'.format(len(failures) - 20)
+    # Outputs the new message through discord
+    await client.send_message(message.channel, new_message)
+
+
+def schedule_season(work, server, season):
+    """ Creates the round-robin schedule of a season in a single unit of work, so the teams can't change between being
+    read and being scheduled.  Blocks, so it is ran with AsyncDatabase.transaction.
+
+    :param work: The transaction the schedule is created in.
+    :type work: Database.Transaction
+
+    :param server: The discord id of the server the season is in.
     :type server: str
 
-    :return: Returns the given server's command symbol/command prefix for messages.
+    :param season: The season to be scheduled.
+    :type season: int
+
+    :return: The number of matches created, or False if the season already has a schedule, and the number of rounds.
+    Returns None if the server has fewer than two teams.
+    :rtype: tuple, None
+    """
+    teams = work.get_teams(server)
+    if len(teams) < 2:
+        return None
+    # Creates the matches of each round and adds them to the database
+    rounds = Scheduler.round_robin(teams)
+    return work.create_schedule(server, season, rounds), len(rounds)
+
+
+@Commands.command('schedule', number_of_args=1, admin_only=True,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}schedule`, which creates the matches of the current season for all of the teams.')
+async def schedule(message, args, settings):
+    """ Creates a round-robin schedule of the current season's matches and starts the season from its first round.
+    """
+    # The season that the schedule is made for
+    season = settings.current_season
+    # Reads the server's teams and schedules them together
+    result = await AsyncDatabase.transaction(schedule_season, message.server.id, season)
+    if result is None:
+        new_message = 'At least two teams are needed to create a schedule.'
+    else:
+        created, number_of_rounds = result
+        if created:
+            new_message = 'Season {} was scheduled with {} matches over {} rounds.  Round 1 has started.' \
+                .format(season, created, number_of_rounds)
+        else:
+            new_message = 'Season {} already has a schedule.'.format(season)
+    # Outputs the new message through discord
+    await client.send_message(message.channel, new_message)
+
+
+@Commands.command('standings', number_of_args=1,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}standings`, which shows the standings of the current season.')
+async def standings(message, args, settings):
+    """ Shows the standings of the current season.
+    """
+    # The season to show the standings of
+    season = settings.current_season
+    # Gets the standings from the database
+    rows = await AsyncDatabase.get_standings(message.server.id, season)
+    if not rows:
+        new_message = 'No games have been reported in season {} yet.'.format(season)
+    else:
+        # Lists each team with its record, round difference, and points
+        lines = ['Standings for season {}:'.format(season),
+                 '-----------------------------------------------------------------']
+        for place, (team, wins, losses, draws, round_difference, points) in enumerate(rows, 1):
+            lines.append('{}. <@&{}> - {}W {}L {}D, {:+d} rounds, {} points'
+                         .format(place, team, wins, losses, draws, round_difference, points))
+        new_message = '\n'.join(lines)
+    # Outputs the new message through discord
+    await client.send_message(message.channel, new_message)
+
+
+@Commands.command('stats', number_of_args=1, admin_only=True,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}stats`, which shows how long the bot\'s commands, queries, and messages are taking.')
+async def stats(message, args, settings):
+    """ Shows the bot's counters and latency histograms, along with how well the roster cache is doing.
+    """
+    lines = Metrics.METRICS.report()
+    cache = Database.ROSTER_CACHE.stats()
+    lines.append('roster cache: {} teams, {} hits, {} misses, {:.0%} hit rate'
+                 .format(cache['size'], cache['hits'], cache['misses'], cache['hit_rate']))
+    # Splits the lines into code blocks that fit in a discord message
+    block = list()
+    for line in lines:
+        if block and sum(len(blocked) + 1 for blocked in block) + len(line) > 1900:
+            await client.send_message(message.channel, '```\n{}\n```'.format('\n'.join(block)))
+            block = list()
+        block.append(line)
+    await client.send_message(message.channel, '```\n{}\n```'.format('\n'.join(block)))
+
+
+@Commands.command('export', number_of_args=1, admin_only=True,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}export`, which sends the server\'s teams, players, and matches as csv files.')
+async def export(message, args, settings):
+    """ Sends the server's teams, players, and matches as a zip file of csv files.  The archive is built on disk while
+    the rows are streamed out of the database, so the bot's memory doesn't grow with the size of the league.
+    """
+    with tempfile.TemporaryFile() as archive:
+        counts = await AsyncDatabase.write_archive(message.server.id, archive, Settings.EXPORT_CHUNK_SIZE)
+        size = archive.tell()
+        if size > Settings.EXPORT_MAX_BYTES:
+            await client.send_message(message.channel, 'The export is {:.1f} MB, which is too big to upload to discord.'
+                                      .format(size / 1000000))
+        else:
+            archive.seek(0)
+            await client.send_file(message.channel, archive, filename='{}-export.zip'.format(message.server.id),
+                                   content='Exported {} teams, {} players, and {} matches.'
+                                   .format(counts['teams.csv'], counts['players.csv'], counts['matches.csv']))
+
+
+def describe_veto(session):
+    """ Describes the state of a map veto.
+
+    :param session: The veto to be described.
+    :type session: BanPick.VetoSession
+
+    :return: A message describing what happens next in the veto, or its result if it is finished.
     :rtype: str
     """
-    return Settings.SERVER_SETTINGS[server]['c_symbol']
-
-
-def get_args(message):
-    """ Takes a string and separates it into a list of it's arguments.  Arguments are separated by spaces, and
-    multi-word arguments are contained within a string.  If the message string starts with the command that was used,
-    then the first item in the list will be the command used.
-
-    :param message: The message that you would like to have split into a list of arguments.
-    :type message: str
-
-    :return: The list of arguments.
-    :rtype: list
-    """
-    # A tuple that will hold the arguments given in the message
-    message_args = list()
-    # The temporary argument string used when characters are being read
-    temp_arg = ''
-    # Says if a quote has been reached once already, so that multi-word arguments can be read
-    quote_already_seen = False
-    # Loops through all the characters in the message
-    for c in message:
-        # Reads in the character to temp_arg if it isn't a space or a "
-        if ((c != ' ' and c != '"') and not quote_already_seen) or (c != '"' and quote_already_seen):
-            # Appends the current character to the temp_arg
-            temp_arg += c
-        # If the char is the second quote or a space, adds the temp_arg to the args list
-        elif ((c == '"' and quote_already_seen) or (c == ' ' and not quote_already_seen)) and len(temp_arg) > 0:
-            # Appends the temp arg to the list
-            message_args.append(temp_arg)
-            # Clears the temp arg for the next loop
-            temp_arg = ''
-            # Resets the quote_already_seen bool to False for the next iteration of the loop
-            quote_already_seen = False
-        # If it is the first quote seen, sets quote_already_seen to True
-        elif c == '"' and not quote_already_seen:
-            # Sets the quote_already_seen value to True
-            quote_already_seen = True
-    # Adds the last word to the args list
-    if len(message_args) != 0 and len(temp_arg) > 0:
-        message_args.append(temp_arg)
-    # Returns the args list
-    return message_args
+    if session.finished:
+        return 'The veto between <@&{}> and <@&{}> is finished.  Maps: {}.  Banned: {}.' \
+            .format(session.teams[0], session.teams[1], ', '.join(session.picks), ', '.join(session.bans))
+    return 'It is <@&{}>\'s turn to {} a map.  Remaining maps: {}' \
+        .format(session.current_team, session.current_action, ', '.join(session.remaining))
+
+
+def get_veto_team(member, server):
+    """ Finds the team a member is running a veto for.
+
+    :param member: The member taking a veto action.
+    :type member: discord.Member
+
+    :param server: The discord id of the server.
+    :type server: str
+
+    :return: The veto and the member's team in it, or None and None if the member's teams aren't in a veto.
+    :rtype: tuple
+    """
+    for role in member.roles:
+        session = vetoes.find(server, role.id)
+        if session is not None:
+            return session, role.id
+    return None, None
+
+
+@Commands.command('veto', number_of_args=2, number_of_roles=1,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}veto @your-team` where @your-team is the mention of your team, which starts the map '
+                        'veto of your team\'s match this round.')
+async def veto(message, args, settings):
+    """ Starts the map veto of the mentioned team's match in the current round.
+    """
+    # The team that is starting the veto
+    team = message.raw_role_mentions[0]
+    # Only members of the team can start its veto
+    if not any(role.id == team for role in message.author.roles):
+        new_message = '<@{}> you are not on the <@&{}> team.'.format(message.author.id, team)
+    else:
+        # Checks the team's match this round against the match index first, so reported matches aren't vetoed
+        indexed = (await get_round_matches(message.server.id, settings)).get(team)
+        match = False
+        if indexed is not None and indexed.state == MatchIndex.UNREPORTED:
+            # Gets the teams of the match, which is only found if it still hasn't been reported
+            match = await AsyncDatabase.get_match(message.server.id, settings.current_season,
+                                                  settings.current_round, team)
+            # The index didn't match the database, such as when the match was reported by another bot process, so
+            # the round's matches are loaded again the next time they are needed
+            if match is False:
+                Database.MATCH_INDEX.drop(message.server.id)
+        if indexed is None:
+            new_message = 'The <@&{}> team does not have a match in round {}.'.format(team, settings.current_round)
+        elif match is False:
+            new_message = 'The <@&{}> team\'s match in round {} was already reported, so it can\'t be vetoed.' \
+                .format(team, settings.current_round)
+        else:
+            match_id, team_1, team_2 = match
+            # The channel the veto's timeouts are announced in
+            channel = message.channel
+
+            def announce_timeout(session, action):
+                """ Tells the channel that a captain ran out of time and which map was chosen for them.
+                """
+                timed_out_team, timed_out_action, map_name = action
+                asyncio.ensure_future(client.send_message(
+                    channel, '<@&{}> ran out of time, so {} was chosen as their {}.\n{}'
+                    .format(timed_out_team, map_name, timed_out_action, describe_veto(session))))
+
+            try:
+                # The member who starts the veto is their team's captain for it
+                session = vetoes.start(message.server.id, match_id, team_1, team_2, settings.game_type,
+                                       on_timeout=announce_timeout, captains={team: message.author.id})
+                new_message = 'The map veto between <@&{}> and <@&{}> has started.\n{}' \
+                    .format(team_1, team_2, describe_veto(session))
+            except BanPick.VetoError as e:
+                new_message = str(e)
+    # Outputs the new message through discord
+    await client.send_message(message.channel, new_message)
+
+
+async def veto_action(message, args, action):
+    """ Bans or picks a map in the veto of the author's team, if the author is the team's captain.
+
+    :param message: The message of the command.
+    :type message: discord.Message
+
+    :param args: The arguments of the command.
+    :type args: list
+
+    :param action: Either BanPick.BAN or BanPick.PICK.
+    :type action: str
+    """
+    session, team = get_veto_team(message.author, message.server.id)
+    if session is None:
+        new_message = '<@{}> your team is not in a map veto.'.format(message.author.id)
+    else:
+        try:
+            map_name = session.act(team, action, args[1], message.author.id)
+            new_message = '<@&{}> chose to {} {}.\n{}'.format(team, action, map_name, describe_veto(session))
+        except BanPick.VetoError as e:
+            new_message = '<@{}> {}.'.format(message.author.id, e)
+    # Outputs the new message through discord
+    await client.send_message(message.channel, new_message)
+
+
+@Commands.command('ban', number_of_args=2,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}ban map-name`\nIf the map name is multiple words, place it in quotes.')
+async def ban(message, args, settings):
+    """ Bans a map in the veto of the author's team.
+    """
+    await veto_action(message, args, BanPick.BAN)
+
+
+@Commands.command('pick', number_of_args=2,
+                  usage='<@{}> did not use the command properly.  To use, use the following format:\n'
+                        '`{}pick map-name`\nIf the map name is multiple words, place it in quotes.')
+async def pick(message, args, settings):
+    """ Picks a map in the veto of the author's team.
+    """
+    await veto_action(message, args, BanPick.PICK)
+
+
+async def run_command(cmd, message, args, settings):
+    """ Runs a command that was used properly, once the member and server have the rate limit tokens for it.
+
+    :param cmd: The command that was used.
+    :type cmd: Commands.Command
+
+    :param message: The message of the command.
+    :type message: discord.Message
+
+    :param args: The arguments of the command.
+    :type args: list
+
+    :param settings: The settings of the server, which are given to the command so it doesn't have to look them up
+    again after waiting for the rate limit.
+    :type settings: SettingsStore.ServerSettings
+    """
+    # Holds the command back for a moment, or rejects it, if the member or server is using commands too quickly
+    wait = limiter.acquire(message.server.id, message.author.id, cmd.name)
+    if wait is None:
+        Metrics.METRICS.count('rate_limit.rejected')
+        # Only tells the member once, so the replies to someone spamming commands aren't spam themselves
+        if limiter.warn(message.server.id, message.author.id):
+            await client.send_message(message.channel, '<@{}> you are using commands too quickly, please wait a few '
+                                                       'seconds and try again.'.format(message.author.id))
+        return
+    if wait:
+        Metrics.METRICS.count('rate_limit.delayed')
+        await asyncio.sleep(wait)
+    # Runs the command, timing it from after it was parsed and allowed through
+    try:
+        with Metrics.METRICS.timer('command.' + cmd.name):
+            await cmd.handler(message, args, settings)
+    # Logs database errors and tells the user why their command failed
+    except Database.DatabaseError as e:
+        log_database_error(e, cmd.name, message.server.id)
+        await client.send_message(message.channel, '<@{}> {}'.format(message.author.id, e.user_message))
 
 
 @client.event
 async def on_message(message):
+    start = time.perf_counter()
     # Checks to make sure the message was not sent as a private message
     if message.server is not None:
-        # Gets the command symbol of the server
-        c_symbol = check_c_symbol(message.server.id)
-        # Gets the message arguments as a list
-        args = get_args(message.content)
-        # The number of arguments given
-        number_of_args = len(args)
-
-        # Sends the user a private message with a list of the commands that the bot has
-        if message.content.startswith("{}help".format(c_symbol)):
-            # Sends the user a list of commands that the bot has
-            help_string = "The bot has the following commands that it uses. The ***{1}*** server uses `{0}` as its" \
-                " command symbol, but beware as other servers may use a different symbol.\n" \
-                "`{0}help` - used to send a private message with a list of the commands that the bot has." \
-                .format(c_symbol, message.server.name)
-            # Sends the help string to the user through private message
-            await client.send_message(message.author, help_string)
-
-        # TODO add description to the help message
-        # Adds a player to the database. They won't have a team until it is set. Requires the user to give their ign
-        elif message.content.startswith("{}addplayer".format(c_symbol)):
-            # Checks to see if the user provided the proper number of arguments
-            if number_of_args == 2:
-                # Attempts to add the player to the database
-                success = Database.add_player(message.server.id, message.author.id, args[1])
-                # Checks if the player was added successfully
-                if success:
-                    # Sets a success message as the new message
-                    new_message = '<@{}> was successfully added.'.format(message.author.id)
-                # If there was an error adding the player, set the new message to say there was an error.
-                else:
-                    new_message = 'There was an error adding <@{}> as a player.  ' \
-                                  'Is it possible you are already a player in the server?'.format(message.author.id)
-            # If the person didn't provide the correct number of arguments
-            else:
-                # Sets the new message to a description of how to use the command
-                new_message = '<@{}> did not use the command properly.  To use, use the following format:\n' \
-                              '`{}addplayer your-ign`\nIf your ign is multiple words, place it in quotes, ' \
-                              'for example `"your-ign"`'.format(message.author.id, c_symbol)
-            # Output the new message
-            await client.send_message(message.channel, new_message)
-
-        # TODO add description to the help message
-        # Changes the ign of the player in the Database to the given ign.
-        elif message.content.startswith("{}changeign".format(c_symbol)):
-            # Checks to see if the user provided the proper number of arguments
-            if number_of_args == 2:
-                # Attempts to change the player's ign
-                success = Database.change_ign(message.server.id, message.author.id, args[1])
-                # If the ign was changed successfully
-                if success:
-                    # Sets the new message to say the ign was changed successfully
-                    new_message = 'The ign of <@{}> was successfully changed to {}'.format(message.author.id, args[1])
-                # If there was an error changing the players ign, sets the new message to an error message
-                else:
-                    new_message = 'There was an error changing the ign of <@{}>'.format(message.author.id)
-            # If the person didn't provide the correct number of arguments
-            else:
-                # The error message to be outputted.
-                new_message = '<@{}> did not use the command properly.  To use, use the following format:\n' \
-                              '`{}changeign your-ign`\nIf your ign is multiple words, place it in quotes, for example' \
-                              '`"your-ign"`'.format(message.author.id, c_symbol)
-            # Outputs the new message through a discord message
-            await client.send_message(message.channel, new_message)
-
-        # TODO add description to the help message
-        # Mention the players on a given team
-        elif message.content.startswith("{}mentionteam".format(c_symbol)):
-            # Gets a list of roles mentioned in the message
-            roles = message.raw_role_mentions
-            # If the correct number of args  was used, including mentioning the role
-            if number_of_args == 2 and len(roles) == 1:
-                # Tries to get the players from the database
-                players = Database.get_players(message.server.id, roles[0], ign=True)
-                # If the player was added successfully, change the new message to a success message
-                if players is not False and players is not None:
-                    # Checks to see if the team is not empty
-                    if len(players) > 0:
-                        # Initializes a new message that will send all of the team's player's information
-                        new_message = 'Players on the <@&{}> team:\n' \
-                                      '-----------------------------------------------------------------\n'\
-                            .format(roles[0])
-                        # Loops through all of the players
-                        for player in players:
-                            # Adds the mention of the player to the string
-                            new_message += '<@{}> - {}\n'.format(player[0], player[1])
-                    # If there were no players on the team
-                    else:
-                        new_message = 'The <@&{}> team is empty'.format(roles[0])
-                # If there was an error getting the players of the team
+        # Holds messages back while the bot is warming up so they use the open connections and loaded settings,
+        # but only for so long, since the warm up can be slow if the database is having trouble
+        if client.warming is not None and not client.warming.done():
+            Metrics.METRICS.count('startup.deferred')
+            await asyncio.wait([client.warming], timeout=Settings.STARTUP_COMMAND_WAIT)
+        # Gets the settings of the server, and ignores the message if they couldn't be loaded
+        try:
+            settings = await get_server_settings(message.server.id)
+        except Database.DatabaseError as e:
+            log_database_error(e, server=message.server.id)
+            settings = None
+        if settings is not None:
+            # Gets the command symbol of the server
+            c_symbol = settings.c_symbol
+            # Finds the command used by the message, skipping normal chat before it is parsed
+            cmd = Commands.get_command(message.content, c_symbol)
+            # Stops members that aren't admins from using admin commands
+            if cmd is not None and cmd.admin_only and not is_admin(message.author, settings):
+                await client.send_message(message.channel, '<@{}> only admins can use that command.'
+                                          .format(message.author.id))
+            elif cmd is not None:
+                parse_start = time.perf_counter()
+                # Gets the message arguments as a list
+                args = Commands.get_args(message.content)
+                used_properly = Commands.check_usage(cmd, args, message.raw_role_mentions)
+                Metrics.METRICS.observe('parse', time.perf_counter() - parse_start)
+                # Runs the command if it was used properly
+                if used_properly:
+                    await run_command(cmd, message, args, settings)
+                # If the command wasn't used properly, output how to use the command
                 else:
-                    new_message = 'There was an error retrieving the players on the <@&{}> team. ' \
-                                  'Are you sure that it is a registered team and not just a normal ' \
-                                  'discord role?'.format(roles[0])
-            # If the correct number of args wasn't used, output how to use the command
-            else:
-                new_message = '<@{}> did not use the command properly.  To use, use the following format:\n' \
-                              '`{}mentionteam @team-role` where @team-role is the mention of the team\n' \
-                              .format(message.author.id, c_symbol)
-            # Outputs the new message through a discord message
-            await client.send_message(message.channel, new_message)
-
-        # TODO add description to the help message
-        # Adds a player to the given team
-        # TODO Set privilege of command to be only so captains or admins can do it
-        elif message.content.startswith("{}setteam".format(c_symbol)):
-            # Gets a list of roles mentioned in the message
-            roles = message.raw_role_mentions
-            # If the correct number of args  was used, including mentioning the role
-            if number_of_args == 2 and len(roles) == 1:
-                # Attempts to set the team of the player in the database
-                success = Database.set_team(message.server.id, message.author.id, roles[0])
-                # Checks if the team was set successfully and sets the new message accordingly
-                if success:
-                    new_message = '<@{}>\'s team was set successfully to team <@&{}>'\
-                        .format(message.author.id, roles[0])
-                else:
-                    new_message = 'There was a problem setting <@{}>\'s team to <@&{}>.  ' \
-                                  'Are you sure the role is a team role?'\
-                        .format(message.author.id, roles[0])
-            # If the correct number of args wasn't used, output how to use the command
-            else:
-                new_message = '<@{}> did not use the command properly.  To use, use the following format:\n' \
-                              '`{}setteam @team-role` where @team-role is the mention of the team\n' \
-                              .format(message.author.id, c_symbol)
-            # Outputs the new message through a discord message
-            await client.send_message(message.channel, new_message)
-
-        # TODO Change it so that only admins can do this command
-        # TODO Add this function to the help message
-        # Changes the server's command symbol.
-        elif message.content.startswith("{}setcommandsymbol".format(c_symbol)):
-            # Checks if the correct number of arguments was given
-            if number_of_args == 2:
-                # Attempts to change the command symbol of the server to the given symbol
-                success = Database.update_settings(message.server.id, 'c_symbol', args[1])
-                # Checks if the symbol was changed successfully and creates a new message accordingly
-                if success:
-                    new_message = 'The server\'s command symbol was changed to `{}`'.format(args[1])
-                else:
-                    new_message = 'There was an error changing the command symbol of the bot to {}'.format(args[1])
-            # If the correct number of args wasn't used, output how to use the command
-            else:
-                new_message = '<@{}> did not use the command properly.  To use, use the following format:\n' \
-                              '`{}setcommandsymbol new-symbol` where new-symbol is the desired new command symbol.\n' \
-                              'Command symbols should not contain a space, as it may break the bot in your server.'
-            # Outputs the new message through discord
-            await client.send_message(message.channel, new_message)
-
-        # TODO Add this function to the help message
-        # TODO Add a try case to convert the number arguments into integers, giving an error if input is other
-        # Sets the score of a game to the given scores, the first score being the score of the team submitting scores
-        # Needs the team to be mentioned to submit the proper game scores
-        elif message.content.startswith("{}score".format(c_symbol)):
-            # Gets a list of roles mentioned in the message
-            roles = message.raw_role_mentions
-            # If the correct number of args was used, including mentioning the role
-            if number_of_args == 4 and len(roles) == 1:
-                # Attempts to set the score of the game
-                success = Database.update_game_scores(message.server.id,
-                                                      Settings.SERVER_SETTINGS[message.server.id]['current_round'],
-                                                      roles[0], int(args[1]), int(args[2]))
-                # If update was successful
-                if success:
-                    new_message = 'Your game for round {} was successfully reported with a score of {} for your team ' \
-                                  'and {} for the other team'\
-                        .format(Settings.SERVER_SETTINGS[message.server.id]['current_round'], args[1], args[2])
-                # If it wasn't updated successfully
-                else:
-                    new_message = 'There was an error setting the score for your game. Are you sure the game ' \
-                                  'wasn\'t already reported, and that you used numbers to input your scores? ' \
-                                  'Use {}help to get a message sent to you with use instructions.'.format(c_symbol)
-            # If the wrong number of arguments was given
-            else:
-                new_message = '<@{}> did not use the command properly.  To use, use the following format:\n;' \
-                              '`{}score your-score opponent-score @your-team`, where your-score is an integer score ' \
-                              'for your team, opponent-score is an integer score for your opponent, and @your-team ' \
-                              'is the role mention of your team.'
-            await client.send_message(message.channel, new_message)
-
-
-# Runs the discord bot
-client.run(Settings.TOKEN)
+                    Metrics.METRICS.count('usage_errors')
+                    await client.send_message(message.channel, cmd.usage.format(message.author.id, c_symbol))
+    # Times every message, including the normal chat that is skipped
+    Metrics.METRICS.observe('on_message', time.perf_counter() - start)
+
+
+def make_client(shard_id=None, shard_count=None, client_type=Client):
+    """ Creates a client that handles the bot's events.
+
+    :param shard_id: The shard of the bot's servers the client connects to discord for.
+    :type shard_id: int, None
+
+    :param shard_count: The number of shards the bot's servers are split into, or None if the bot isn't sharded.
+    :type shard_count: int, None
+
+    :param client_type: The type of client to create, which can be swapped for one with a fake gateway.
+    :type client_type: type
+
+    :rtype: Client
+    """
+    new_client = client_type(shard_id=shard_id, shard_count=shard_count)
+
+    async def on_shard_ready():
+        await on_ready(new_client)
+
+    on_shard_ready.__name__ = 'on_ready'
+    new_client.event(on_shard_ready)
+    new_client.event(on_message)
+    return new_client
+
+
+def run(shard_ids=None, shard_count=None, client_type=Client):
+    """ Runs the bot until it is stopped, warming up the database while it logs in.  Each shard gets a client of its
+    own, all on the same event loop.  Any client can send messages to any channel, so the first client sends every
+    reply and the shards share its outbound queue.
+
+    :param shard_ids: The shards ran by this process, or None to run the bot without sharding.
+    :type shard_ids: list, None
+
+    :param shard_count: The number of shards the bot's servers are split into, or None if the bot isn't sharded.
+    :type shard_count: int, None
+
+    :param client_type: The type of client to create, which can be swapped for one with a fake gateway.
+    :type client_type: type
+    """
+    global client
+    Log.start_from_settings()
+    if shard_count is None and client_type is Client:
+        shards = [client]
+    else:
+        shards = [make_client(shard_id, shard_count, client_type) for shard_id in (shard_ids or [None])]
+        client = shards[0]
+    startup.record('modules', Settings.STARTED)
+    loop = client.loop
+    # Warms up the database on the clients' event loop while the clients log in to discord
+    client.warming = asyncio.ensure_future(warm_up(), loop=loop)
+    try:
+        loop.run_until_complete(asyncio.gather(*[shard.start(Settings.TOKEN) for shard in shards]))
+    except KeyboardInterrupt:
+        loop.run_until_complete(asyncio.gather(*[shard.logout() for shard in shards]))
+    finally:
+        loop.close()
+
+
+# Runs the discord bot when the file is ran, rather than imported
+if __name__ == '__main__':
+    run()
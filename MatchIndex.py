@@ -0,0 +1,142 @@
+import threading  # Used to make the index safe to change from the database threads
+
+# The states of an indexed match.  A match is pending while a report of its score is being written to the database.
+UNREPORTED = 'unreported'
+PENDING = 'pending'
+REPORTED = 'reported'
+
+# The server settings that change which matches are in a server's current round
+ROUND_SETTINGS = ('current_season', 'current_round')
+
+
+class IndexedMatch:
+    """ A match of a server's current round.  Both teams of the match share the same record, so a report by either
+    team is seen by the other.
+    """
+    __slots__ = ('id', 'state')
+
+    def __init__(self, match_id, state):
+        """ Creates the record of a match.
+
+        :param match_id: The database id of the match.
+        :type match_id: int
+
+        :param state: Whether the match is unreported, pending, or reported.
+        :type state: str
+        """
+        self.id = match_id
+        self.state = state
+
+
+class MatchIndex:
+    """ Holds the matches of each server's current round, keyed by the discord role id of the teams playing in them,
+    so reports for teams without a match or for matches that were already reported can be turned away without going to
+    the database.  A server's matches are loaded the first time they are needed in a round, and are dropped when the
+    server's round or season changes.
+    """
+
+    def __init__(self):
+        # Increased whenever a server is dropped, so matches loaded before the drop are not kept
+        self.version = 0
+        # The season, round, and matches keyed by team of each server, where the key is the server's discord id
+        self._servers = dict()
+        # Used to keep the database threads from changing the index while it is being loaded
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._servers)
+
+    def get(self, server, season, match_round):
+        """ Gets the matches of a server's round if they have been loaded.
+
+        :param server: The discord id of the server.
+        :type server: str
+
+        :param season: The server's current season.
+        :type season: int
+
+        :param match_round: The server's current round.
+        :type match_round: int
+
+        :return: The matches of the round keyed by the discord role id of each team playing in them, or None if they
+        haven't been loaded.
+        :rtype: dict, None
+        """
+        entry = self._servers.get(server)
+        if entry is None or entry[0] != season or entry[1] != match_round:
+            return None
+        return entry[2]
+
+    def load(self, server, season, match_round, rows, version=None):
+        """ Adds the matches of a server's round.  If they were loaded by another command while these were being read,
+        the matches already in the index are kept, so the reports pending on them aren't lost.
+
+        :param server: The discord id of the server.
+        :type server: str
+
+        :param season: The season the matches are played in.
+        :type season: int
+
+        :param match_round: The round the matches are played in.
+        :type match_round: int
+
+        :param rows: The database id, the discord role ids of both teams, and whether the match was reported, of each
+        match in the round.
+        :type rows: list
+
+        :param version: The index's version from before the matches were read.  If a server was dropped since then the
+        matches may be stale, so they are returned without being kept.
+        :type version: int, None
+
+        :return: The matches of the round keyed by the discord role id of each team playing in them.
+        :rtype: dict
+        """
+        with self._lock:
+            matches = self.get(server, season, match_round)
+            if matches is not None:
+                return matches
+            matches = dict()
+            for match_id, team_1, team_2, reported in rows:
+                match = IndexedMatch(match_id, REPORTED if reported else UNREPORTED)
+                matches[team_1] = match
+                matches[team_2] = match
+            if version is None or version == self.version:
+                self._servers[server] = (season, match_round, matches)
+            return matches
+
+    def reported(self, server, season, match_round, team):
+        """ Marks the match a team played in a round as reported, if the server's matches for the round are loaded.
+
+        :param server: The discord id of the server.
+        :type server: str
+
+        :param season: The season the match was played in.
+        :type season: int
+
+        :param match_round: The round the match was played in.
+        :type match_round: int
+
+        :param team: The discord role id of either team of the match.
+        :type team: str
+        """
+        with self._lock:
+            entry = self._servers.get(server)
+            if entry is not None and entry[0] == season and entry[1] == match_round and team in entry[2]:
+                entry[2][team].state = REPORTED
+
+    def drop(self, server):
+        """ Removes the matches of a server, so they are loaded again the next time they are needed.
+
+        :param server: The discord id of the server.
+        :type server: str
+        """
+        with self._lock:
+            self.version += 1
+            self._servers.pop(server, None)
+
+    def clear(self):
+        """ Removes the matches of every server.
+        """
+        with self._lock:
+            self.version += 1
+            self._servers.clear()
@@ -0,0 +1,226 @@
+import bisect  # Used to find the bucket each timing falls in
+import threading  # Used to make the metrics safe to update from the database threads
+import time  # Used to time the sections of code being measured
+from contextlib import contextmanager  # Used to time blocks of code with a with statement
+
+# The upper bounds of the latency histogram buckets in seconds.  Every histogram uses the same buckets so recording a
+# timing is a single bisect with no allocation, and anything slower than the last bound goes in an overflow bucket.
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """ Counts timings in fixed latency buckets, along with the total and largest timing, so percentiles can be
+    estimated without keeping every timing.
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'max', '_lock')
+
+    def __init__(self):
+        """ Creates an empty histogram.
+        """
+        # The number of timings in each bucket, with the last bucket holding the timings past the last bound
+        self.counts = [0] * (len(BUCKETS) + 1)
+        # The number of timings recorded
+        self.count = 0
+        # The sum of the timings in seconds
+        self.total = 0.0
+        # The largest timing in seconds
+        self.max = 0.0
+        # Used to keep the database threads from recording at the same time
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """ Records a timing.
+
+        :param seconds: The timing to be recorded.
+        :type seconds: float
+        """
+        bucket = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, fraction):
+        """ Estimates a percentile of the recorded timings by interpolating within the bucket it falls in.
+
+        :param fraction: The percentile as a fraction, for example 0.99.
+        :type fraction: float
+
+        :return: The estimated timing in seconds, or 0 if nothing has been recorded.
+        :rtype: float
+        """
+        with self._lock:
+            counts, count, largest = list(self.counts), self.count, self.max
+        # The number of timings that have to be at or below the percentile
+        needed = fraction * count
+        seen = 0
+        lower = 0.0
+        for bound, bucket_count in zip(BUCKETS, counts):
+            if bucket_count and seen + bucket_count >= needed:
+                # Assumes the timings are spread evenly through the bucket, which can't go past the largest timing
+                estimate = lower + (bound - lower) * (needed - seen) / bucket_count
+                return min(estimate, largest)
+            seen += bucket_count
+            lower = bound
+        return largest
+
+    def state(self):
+        """ Copies the histogram into plain values that can be sent to another process.
+
+        :return: The count of each bucket, the number of timings, their total, and the largest timing.
+        :rtype: tuple
+        """
+        with self._lock:
+            return list(self.counts), self.count, self.total, self.max
+
+    def add(self, state):
+        """ Adds the timings of another histogram to this one.
+
+        :param state: The state of the other histogram, as given by its state method.
+        :type state: tuple
+        """
+        counts, count, total, largest = state
+        with self._lock:
+            for bucket, bucket_count in enumerate(counts):
+                self.counts[bucket] += bucket_count
+            self.count += count
+            self.total += total
+            if largest > self.max:
+                self.max = largest
+
+
+class Metrics:
+    """ Holds named counters and latency histograms.  Names are created the first time they are used.
+    """
+
+    def __init__(self):
+        """ Creates an empty set of metrics.
+        """
+        # The counters, keyed by name
+        self.counters = dict()
+        # The latency histograms, keyed by name
+        self.histograms = dict()
+        # The time the metrics were created or last reset
+        self.started = time.monotonic()
+        # Used to keep two threads from creating the same metric at the same time
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        """ Adds to a counter.
+
+        :param name: The name of the counter.
+        :type name: str
+
+        :param amount: The amount to add.
+        :type amount: int
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def histogram(self, name):
+        """ Gets a latency histogram, creating it if it doesn't exist yet.
+
+        :param name: The name of the histogram.
+        :type name: str
+
+        :rtype: Histogram
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, name, seconds):
+        """ Records a timing in a latency histogram.
+
+        :param name: The name of the histogram.
+        :type name: str
+
+        :param seconds: The timing to be recorded.
+        :type seconds: float
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histogram(name)
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """ Times the block of a with statement, recording the timing even if the block raises an exception.
+
+        :param name: The name of the histogram the timing is recorded in.
+        :type name: str
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def reset(self):
+        """ Removes all of the counters and histograms.
+        """
+        with self._lock:
+            self.counters = dict()
+            self.histograms = dict()
+            self.started = time.monotonic()
+
+    def snapshot(self):
+        """ Copies the metrics into plain values that can be sent to another process, such as from a worker process to
+        the launcher.
+
+        :return: The seconds the metrics cover, the counters, and the state of each histogram.
+        :rtype: dict
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = list(self.histograms.items())
+            started = self.started
+        return {'seconds': time.monotonic() - started, 'counters': counters,
+                'histograms': {name: histogram.state() for name, histogram in histograms}}
+
+    def merge(self, snapshot):
+        """ Adds the metrics of a snapshot to these metrics.  The metrics then cover the longest time covered by
+        either of them.
+
+        :param snapshot: The snapshot given by the snapshot method of another set of metrics.
+        :type snapshot: dict
+        """
+        for name, value in snapshot['counters'].items():
+            self.count(name, value)
+        for name, state in snapshot['histograms'].items():
+            self.histogram(name).add(state)
+        with self._lock:
+            self.started = min(self.started, time.monotonic() - snapshot['seconds'])
+
+    def report(self):
+        """ Describes the metrics as lines of text, with the count, mean, estimated p50 and p99, and largest timing of
+        each histogram in milliseconds.
+
+        :rtype: list
+        """
+        # Copies the metrics so the database threads can keep adding to them while the report is made
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+        lines = ['Metrics for the last {:.0f} seconds'.format(time.monotonic() - self.started)]
+        for name, value in counters:
+            lines.append('{:<32} {:>9}'.format(name, value))
+        if histograms:
+            lines.append('{:<32} {:>9} {:>9} {:>9} {:>9} {:>9}'.format('timing (ms)', 'count', 'mean', 'p50', 'p99',
+                                                                      'max'))
+        for name, histogram in histograms:
+            if histogram.count:
+                lines.append('{:<32} {:>9} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}'.format(
+                    name, histogram.count, histogram.total / histogram.count * 1000,
+                    histogram.percentile(0.5) * 1000, histogram.percentile(0.99) * 1000, histogram.max * 1000))
+        return lines
+
+
+# The metrics of the bot process, shared by every module that is instrumented
+METRICS = Metrics()
@@ -0,0 +1,188 @@
+import Database  # Used to connect to the database that is being migrated
+import Settings  # Used to get the points of each result for the standings backfill
+
+# The schema changes of the bot's database, in the order they are applied.  Each migration is a tuple of its version
+# number, a description, the sql that applies it, and optionally the parameters of the sql.  Migrations that have been
+# released must never be changed, new changes to the schema are added as a new migration at the end of the list.
+MIGRATIONS = [
+    (1, 'Create the bot tables', """
+        CREATE TABLE IF NOT EXISTS "Settings" (
+            server text PRIMARY KEY,
+            c_symbol text NOT NULL DEFAULT '!',
+            game_type text,
+            current_season integer NOT NULL DEFAULT 1,
+            current_round integer NOT NULL DEFAULT 1,
+            admin_role text,
+            team_size integer
+        );
+        CREATE TABLE IF NOT EXISTS "Teams" (
+            id serial PRIMARY KEY,
+            server text NOT NULL,
+            discord text NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS "Players" (
+            id serial PRIMARY KEY,
+            server text NOT NULL,
+            discord text NOT NULL,
+            ign text NOT NULL,
+            team integer REFERENCES "Teams" (id) ON DELETE SET NULL
+        );
+        CREATE TABLE IF NOT EXISTS "Matches" (
+            id serial PRIMARY KEY,
+            server text NOT NULL,
+            round integer NOT NULL,
+            team_1 integer NOT NULL REFERENCES "Teams" (id),
+            team_2 integer NOT NULL REFERENCES "Teams" (id),
+            team_1_score integer,
+            team_2_score integer
+        );"""),
+    (2, 'Add the unique constraints and indexes used by the hot queries', """
+        CREATE UNIQUE INDEX IF NOT EXISTS "Teams_server_discord_key" ON "Teams" (server, discord);
+        CREATE UNIQUE INDEX IF NOT EXISTS "Players_server_discord_key" ON "Players" (server, discord);
+        CREATE INDEX IF NOT EXISTS "Players_team_idx" ON "Players" (team);
+        CREATE INDEX IF NOT EXISTS "Matches_server_round_team_1_idx" ON "Matches" (server, round, team_1);
+        CREATE INDEX IF NOT EXISTS "Matches_server_round_team_2_idx" ON "Matches" (server, round, team_2);"""),
+    # The result codes returned by join_team match the JOIN_ constants in Database.py
+    (3, 'Add the join_team function that only lets players join teams with room', """
+        CREATE OR REPLACE FUNCTION join_team(p_server text, p_player text, p_team text,
+                                             OUT result integer, OUT old_team text) AS $$
+        DECLARE
+            team_id integer;
+            player_id integer;
+            player_team integer;
+            max_size integer;
+            team_players integer;
+        BEGIN
+            -- Locks the team so that players joining it at the same time are counted one after another.  Each
+            -- statement below sees the joins committed by whoever held the lock before.
+            SELECT id INTO team_id FROM "Teams" WHERE server = p_server AND discord = p_team FOR UPDATE;
+            IF team_id IS NULL THEN
+                result := 1;
+                RETURN;
+            END IF;
+            SELECT p.id, p.team, t.discord INTO player_id, player_team, old_team
+                FROM "Players" p LEFT JOIN "Teams" t ON t.id = p.team
+                WHERE p.server = p_server AND p.discord = p_player;
+            IF player_id IS NULL THEN
+                result := 2;
+                RETURN;
+            END IF;
+            IF player_team = team_id THEN
+                result := 3;
+                RETURN;
+            END IF;
+            SELECT team_size INTO max_size FROM "Settings" WHERE server = p_server;
+            SELECT COUNT(*) INTO team_players FROM "Players" WHERE team = team_id;
+            IF max_size IS NOT NULL AND team_players >= max_size THEN
+                result := 4;
+                RETURN;
+            END IF;
+            UPDATE "Players" SET team = team_id WHERE id = player_id;
+            result := 0;
+        END;
+        $$ LANGUAGE plpgsql;"""),
+    (4, 'Add the season of each match', """
+        ALTER TABLE "Matches" ADD COLUMN IF NOT EXISTS season integer NOT NULL DEFAULT 1;
+        CREATE INDEX IF NOT EXISTS "Matches_server_season_round_idx" ON "Matches" (server, season, round);"""),
+    # The matches reported before the standings existed are counted with the points from Config.yaml
+    (5, 'Add the standings of each team, filled in from the matches that were already reported', """
+        CREATE TABLE IF NOT EXISTS "Standings" (
+            server text NOT NULL,
+            season integer NOT NULL,
+            team integer NOT NULL REFERENCES "Teams" (id) ON DELETE CASCADE,
+            wins integer NOT NULL DEFAULT 0,
+            losses integer NOT NULL DEFAULT 0,
+            draws integer NOT NULL DEFAULT 0,
+            round_difference integer NOT NULL DEFAULT 0,
+            points integer NOT NULL DEFAULT 0,
+            PRIMARY KEY (server, season, team)
+        );
+        INSERT INTO "Standings"(server, season, team, wins, losses, draws, round_difference, points)
+        SELECT server, season, team, COUNT(*) FILTER (WHERE scored > conceded),
+            COUNT(*) FILTER (WHERE scored < conceded), COUNT(*) FILTER (WHERE scored = conceded),
+            SUM(scored - conceded), %s * COUNT(*) FILTER (WHERE scored > conceded)
+                + %s * COUNT(*) FILTER (WHERE scored = conceded) + %s * COUNT(*) FILTER (WHERE scored < conceded)
+        FROM (
+            SELECT server, season, team_1 AS team, team_1_score AS scored, team_2_score AS conceded FROM "Matches"
+                WHERE team_1_score IS NOT NULL AND team_2_score IS NOT NULL
+            UNION ALL
+            SELECT server, season, team_2, team_2_score, team_1_score FROM "Matches"
+                WHERE team_1_score IS NOT NULL AND team_2_score IS NOT NULL
+        ) sides
+        GROUP BY server, season, team
+        ON CONFLICT (server, season, team) DO NOTHING;""",
+     (Settings.POINTS_WIN, Settings.POINTS_DRAW, Settings.POINTS_LOSS)),
+    (6, 'Add the map veto results of each match', """
+        CREATE TABLE IF NOT EXISTS "Vetoes" (
+            match integer PRIMARY KEY REFERENCES "Matches" (id) ON DELETE CASCADE,
+            server text NOT NULL,
+            maps text[] NOT NULL,
+            bans text[] NOT NULL,
+            completed_at timestamp with time zone NOT NULL DEFAULT now()
+        );"""),
+]
+
+# The key of the advisory lock that keeps two bot processes from migrating the database at the same time
+LOCK_KEY = 7243
+
+
+def get_version(cursor):
+    """ Gets the version of the schema, creating the table that tracks it if it doesn't exist.
+
+    :param cursor: The cursor to use.
+    :type cursor: psycopg2.extensions.cursor
+
+    :return: The version of the newest migration that has been applied, or 0 if none have.
+    :rtype: int
+    """
+    cursor.execute("""CREATE TABLE IF NOT EXISTS "SchemaVersion" (
+        version integer PRIMARY KEY,
+        description text NOT NULL,
+        applied_at timestamp with time zone NOT NULL DEFAULT now());""")
+    cursor.execute("""SELECT COALESCE(MAX(version), 0) FROM "SchemaVersion";""")
+    return cursor.fetchone()[0]
+
+
+def migrate(target=None):
+    """ Applies the migrations that haven't been applied to the database yet, all in a single transaction.
+
+    :param target: The version to migrate up to.  Defaults to the newest migration.
+    :type target: int, None
+
+    :except Database.DatabaseError: Raised if an error occurs in connect, in which case no migrations are applied.
+
+    :return: The versions of the migrations that were applied.
+    :rtype: list
+    """
+
+    # The sqlite backend makes its schema whenever it opens the database, so it has nothing to migrate
+    if Database.POOL.backend != 'postgres':
+        return list()
+    # Opens a database connection where commits can occur, with a cursor object to use in that connection
+    with Database.connect(commit=True) as cursor:
+        # Waits for any other process that is migrating the database to finish
+        cursor.execute('SELECT pg_advisory_xact_lock(%s);', (LOCK_KEY,))
+        # The version the database is at
+        version = get_version(cursor)
+        # The migrations that were applied
+        applied = list()
+        for number, description, sql, *params in MIGRATIONS:
+            if number > version and (target is None or number <= target):
+                # The migrations with parameters are given them, the rest are ran as they are
+                cursor.execute(sql, *params)
+                cursor.execute("""INSERT INTO "SchemaVersion"(version, description) VALUES (%s, %s);""",
+                               (number, description))
+                applied.append(number)
+        return applied
+
+
+if __name__ == '__main__':
+    try:
+        applied_versions = migrate()
+    except Database.DatabaseError as e:
+        print('The migrations failed: {}'.format(e))
+    else:
+        if applied_versions:
+            print('Applied migrations {}'.format(', '.join(str(number) for number in applied_versions)))
+        else:
+            print('The database is already up to date')
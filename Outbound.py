@@ -0,0 +1,167 @@
+import asyncio  # Used to send each channel's messages in the background and to wait out rate limits
+import collections  # Used to hold the messages waiting to be sent to each channel
+import discord  # Used to recognize the rate limit errors given by discord
+import Metrics  # Used to count the messages that are merged, split, and retried
+
+# The longest message discord allows
+MAX_LENGTH = 2000
+
+
+def split(content, max_length=MAX_LENGTH):
+    """ Splits a message into pieces that fit in a discord message, breaking it between lines where it can.  Lines
+    that are too long on their own are broken at the length limit.
+
+    :param content: The message to be split.
+    :type content: str
+
+    :param max_length: The longest each piece can be.
+    :type max_length: int
+
+    :return: The pieces of the message in order.
+    :rtype: list
+    """
+    if len(content) <= max_length:
+        return [content]
+    pieces = list()
+    # The lines of the piece being built, and its length including the new lines between them
+    lines = list()
+    length = 0
+    for line in content.split('\n'):
+        # Breaks up a line that can't fit in a piece by itself
+        while len(line) > max_length:
+            if lines:
+                pieces.append('\n'.join(lines))
+                lines, length = list(), 0
+            pieces.append(line[:max_length])
+            line = line[max_length:]
+        # Starts a new piece if the line doesn't fit in the current one
+        if lines and length + 1 + len(line) > max_length:
+            pieces.append('\n'.join(lines))
+            lines, length = list(), 0
+        length += len(line) + (1 if lines else 0)
+        lines.append(line)
+    if lines:
+        pieces.append('\n'.join(lines))
+    return pieces
+
+
+def retry_after(error, default=1.0):
+    """ Gets the number of seconds discord asked the bot to wait before sending again.
+
+    :param error: The rate limit error.
+    :type error: discord.HTTPException
+
+    :param default: The number of seconds to wait if discord didn't say.
+    :type default: float
+
+    :rtype: float
+    """
+    try:
+        return float(error.response.headers['Retry-After'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return default
+
+
+class OutboundQueue:
+    """ Sends the bot's messages through a queue for each channel.  Each channel's messages are sent one at a time in
+    the order they were queued, short messages that pile up while a channel is busy are merged into one message, long
+    messages are split at line breaks to fit discord's length limit, and sends that hit a rate limit are retried once
+    discord's retry-after has passed.
+    """
+
+    def __init__(self, sender, max_length=MAX_LENGTH, max_retries=3):
+        """ Creates the queue.
+
+        :param sender: The coroutine function that sends a message right away, given the destination and content.
+        :type sender: function
+
+        :param max_length: The longest message that can be sent.
+        :type max_length: int
+
+        :param max_retries: The number of times a rate limited send is retried before its error is raised.
+        :type max_retries: int
+        """
+        self.sender = sender
+        self.max_length = max_length
+        self.max_retries = max_retries
+        # The messages waiting to be sent to each channel, as tuples of the content and the future of the sender,
+        # keyed by the id of the channel.  A channel is only in here while its messages are being sent.
+        self._pending = dict()
+
+    def __len__(self):
+        return sum(len(pending) for pending in self._pending.values())
+
+    async def send(self, destination, content):
+        """ Queues a message and waits for it to be sent.
+
+        :param destination: The channel or user the message is sent to.
+        :type destination: discord.Channel, discord.User
+
+        :param content: The content of the message.
+        :type content: str
+
+        :return: The message holding the end of the content, which may include other messages merged with it.
+        :rtype: discord.Message
+        """
+        future = asyncio.get_event_loop().create_future()
+        pending = self._pending.get(destination.id)
+        # Starts sending the channel's messages if it isn't already
+        if pending is None:
+            pending = self._pending[destination.id] = collections.deque()
+            asyncio.ensure_future(self._drain(destination, pending))
+        pending.append((content, future))
+        return await future
+
+    def _take(self, pending):
+        """ Takes the next message to be sent off of a channel's queue, merging in the short messages queued after it
+        while they fit in one message.
+
+        :return: The content to be sent and the futures of the messages it holds.
+        :rtype: tuple
+        """
+        content, future = pending.popleft()
+        contents, futures = [content], [future]
+        length = len(content)
+        while pending and length + 1 + len(pending[0][0]) <= self.max_length:
+            content, future = pending.popleft()
+            contents.append(content)
+            futures.append(future)
+            length += 1 + len(content)
+        if len(contents) > 1:
+            Metrics.METRICS.count('outbound.merged', len(contents) - 1)
+        return '\n'.join(contents), futures
+
+    async def _drain(self, destination, pending):
+        """ Sends a channel's messages until its queue is empty, then forgets the channel.
+        """
+        try:
+            while pending:
+                content, futures = self._take(pending)
+                try:
+                    pieces = split(content, self.max_length)
+                    if len(pieces) > 1:
+                        Metrics.METRICS.count('outbound.split', len(pieces) - 1)
+                    for piece in pieces:
+                        message = await self._send(destination, piece)
+                except Exception as e:
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(message)
+        finally:
+            del self._pending[destination.id]
+
+    async def _send(self, destination, content):
+        """ Sends a message, waiting and trying again if discord says the bot is being rate limited.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.sender(destination, content)
+            except discord.HTTPException as e:
+                if getattr(getattr(e, 'response', None), 'status', None) != 429 or attempt == self.max_retries:
+                    raise
+                Metrics.METRICS.count('outbound.retries')
+                await asyncio.sleep(retry_after(e))
@@ -0,0 +1,242 @@
+import psycopg2  # Used to open the connections held by the pool
+import psycopg2.extensions  # Used to subclass the psycopg2 connection so pool bookkeeping can be attached to it
+import threading  # Used to make the pool safe to use from multiple threads
+import time  # Used to track how long connections have been idle
+
+
+class PoolExhausted(psycopg2.OperationalError):
+    """ Raised when no connection could be checked out of the pool before the checkout timeout ran out.
+    """
+    pass
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """ A psycopg2 connection that remembers when it was last returned to the pool and which statements have been
+    prepared on it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The time the connection was last put back into the pool
+        self.last_used = time.monotonic()
+        # The names of the statements that have been prepared on the connection
+        self.prepared_statements = set()
+
+
+class ConnectionPool:
+    """ A bounded pool of PostgreSQL connections.  Connections that have sat idle for a while are checked for health
+    when they are checked out and replaced when they are dead, and connections that have sat idle in the pool for too
+    long are closed.  Connections that were used recently are handed out without a check, since a connection that
+    breaks while it is being used raises an OperationalError and is thrown away when it is returned.
+    """
+
+    # The name of the backend, which picks the queries that are ran on the pool's connections
+    backend = 'postgres'
+    # The base class of the errors raised by the pool's connections
+    Error = psycopg2.Error
+
+    def __init__(self, conn_string, min_size=1, max_size=10, idle_timeout=300, checkout_timeout=10,
+                 health_check_after=30):
+        """ Creates the pool.  No connections are opened until the first checkout or a call to warm.
+
+        :param conn_string: The string to be used to connect to the database.
+        :type conn_string: str
+
+        :param min_size: The number of connections that are kept open even when they are idle.
+        :type min_size: int
+
+        :param max_size: The largest number of connections that can be open at once.
+        :type max_size: int
+
+        :param idle_timeout: The number of seconds a connection above min_size can sit unused before it is closed.
+        :type idle_timeout: float
+
+        :param checkout_timeout: The number of seconds to wait for a free connection before giving up.
+        :type checkout_timeout: float
+
+        :param health_check_after: The number of seconds a connection can sit idle before it is checked for health
+        when it is checked out.
+        :type health_check_after: float
+        """
+        self.conn_string = conn_string
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_after = health_check_after
+        # The connections that are open and waiting to be used, the most recently used connection being last
+        self._idle = list()
+        # The number of connections that are open, including the ones that are checked out
+        self._size = 0
+        # Used to wait for a connection to be returned when the pool is at its maximum size
+        self._condition = threading.Condition()
+
+    def _open(self):
+        """ Opens a new connection to the database.
+
+        :return: The new connection.
+        :rtype: PooledConnection
+        """
+        return psycopg2.connect(self.conn_string, connection_factory=PooledConnection)
+
+    @staticmethod
+    def _is_healthy(conn):
+        """ Checks that a connection is still usable by sending it a trivial query.
+
+        :param conn: The connection to be checked.
+        :type conn: PooledConnection
+
+        :return: Whether or not the connection can still be used.
+        :rtype: bool
+        """
+        # A connection that was closed by psycopg2 can't be used again
+        if conn.closed:
+            return False
+        try:
+            # Sends a query to make sure the server is still on the other end of the connection
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            # Ends the transaction opened by the health check
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _close(self, conn):
+        """ Closes a connection, ignoring errors from connections that are already broken.
+
+        :param conn: The connection to be closed.
+        :type conn: PooledConnection
+        """
+        try:
+            conn.close()
+        except self.Error:
+            pass
+
+    def _discard_idle(self):
+        """ Removes connections above min_size that have been idle for longer than the idle timeout.  Must be called
+        while holding the pool's condition.
+
+        :return: The connections that were removed from the pool and need to be closed.
+        :rtype: list
+        """
+        expired = list()
+        # The oldest connections are at the front of the idle list
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._size > self.min_size and self._idle[0].last_used < cutoff:
+            expired.append(self._idle.pop(0))
+            self._size -= 1
+        return expired
+
+    def getconn(self):
+        """ Checks a connection out of the pool, opening a new one if none are idle and the pool isn't full.  Dead
+        connections are replaced with new ones.
+
+        :except PoolExhausted: Raised if no connection was freed up before the checkout timeout.
+
+        :return: A connection that is ready to be used.
+        :rtype: PooledConnection
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            conn = None
+            with self._condition:
+                expired = self._discard_idle()
+                # Waits for a connection to be returned if the pool is full and all connections are in use
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        raise PoolExhausted('No database connection was freed within {} seconds'
+                                            .format(self.checkout_timeout))
+                # Reuses the most recently used connection, since it is the most likely to still be alive
+                if self._idle:
+                    conn = self._idle.pop()
+                # Reserves a spot in the pool for the new connection before opening it
+                else:
+                    self._size += 1
+            # Closes the expired connections outside of the lock
+            for expired_conn in expired:
+                self._close(expired_conn)
+
+            # Opens a new connection if there wasn't an idle one to reuse
+            if conn is None:
+                try:
+                    return self._open()
+                except self.Error:
+                    # Gives the reserved spot back to the pool if the connection couldn't be made
+                    self._release_slot()
+                    raise
+            # Hands out the idle connection if it is still alive, only sending it a query to check if it has sat idle
+            # long enough for the server or the network to have dropped it
+            if not conn.closed and (time.monotonic() - conn.last_used < self.health_check_after
+                                    or self._is_healthy(conn)):
+                return conn
+            # Otherwise throws the dead connection away and tries again, which will reconnect
+            self._close(conn)
+            self._release_slot()
+
+    def cursor(self, conn, write=False):
+        """ Starts a transaction on a connection.  Psycopg2 starts the transaction itself when the first query is sent,
+        so this only has to create the cursor.
+
+        :param conn: The connection that was checked out with getconn.
+        :type conn: PooledConnection
+
+        :param write: Says if the transaction is going to change the database.
+        :type write: bool
+
+        :rtype: psycopg2.extensions.cursor
+        """
+        return conn.cursor()
+
+    def putconn(self, conn, discard=False):
+        """ Returns a connection to the pool.
+
+        :param conn: The connection that was checked out with getconn.
+        :type conn: PooledConnection
+
+        :param discard: Closes the connection instead of reusing it, such as when it is known to be broken.
+        :type discard: bool
+        """
+        if discard or conn.closed:
+            self._close(conn)
+            self._release_slot()
+        else:
+            conn.last_used = time.monotonic()
+            with self._condition:
+                self._idle.append(conn)
+                self._condition.notify()
+
+    def _release_slot(self):
+        """ Frees up the spot in the pool of a connection that was closed.
+        """
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def warm(self):
+        """ Opens connections until the pool holds at least min_size connections.
+        """
+        opened = list()
+        with self._condition:
+            missing = max(0, self.min_size - self._size)
+            self._size += missing
+        try:
+            for _ in range(missing):
+                opened.append(self._open())
+        finally:
+            # Gives back the spots of any connections that failed to open
+            for _ in range(missing - len(opened)):
+                self._release_slot()
+            for conn in opened:
+                self.putconn(conn)
+
+    def closeall(self):
+        """ Closes all of the idle connections in the pool.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, list()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for conn in idle:
+            self._close(conn)
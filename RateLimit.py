@@ -0,0 +1,177 @@
+import collections  # Used to keep the buckets in least recently used order so idle buckets can be evicted cheaply
+import time  # Used to refill the buckets as time passes
+
+
+class TokenBucket:
+    """ Holds the tokens of a single user or server.  The bucket refills at a steady rate up to its capacity, and can
+    go below zero when commands are delayed rather than rejected, in which case the debt is paid off before anything
+    else is allowed.
+    """
+
+    __slots__ = ('tokens', 'updated', 'warned')
+
+    def __init__(self, capacity, now):
+        """ Creates a full bucket.
+
+        :param capacity: The number of tokens the bucket starts with.
+        :type capacity: float
+
+        :param now: The current time of the limiter's clock.
+        :type now: float
+        """
+        self.tokens = capacity
+        self.updated = now
+        # Says if the owner of the bucket has been told they are being limited since they last got through
+        self.warned = False
+
+    def refill(self, capacity, rate, now):
+        """ Adds the tokens earned since the bucket was last updated.
+        """
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """ Limits how often commands can be used with a token bucket for each user and one for each server.  A command
+    takes its cost from both buckets, so one member can't use up their server's share and one busy server can't
+    starve the others.  Buckets that have been idle long enough to refill are evicted, since a new bucket would be
+    identical, which keeps memory bounded by the number of recently active users and servers.
+    """
+
+    def __init__(self, user_capacity, user_rate, server_capacity, server_rate, costs, default_cost=1, max_delay=0,
+                 idle_timeout=600, clock=time.monotonic):
+        """ Creates the limiter.
+
+        :param user_capacity: The most tokens a user can save up, which is the largest burst of commands they can use.
+        :type user_capacity: float
+
+        :param user_rate: The number of tokens a user gets back each second.
+        :type user_rate: float
+
+        :param server_capacity: The most tokens a server can save up.
+        :type server_capacity: float
+
+        :param server_rate: The number of tokens a server gets back each second.
+        :type server_rate: float
+
+        :param costs: The number of tokens each command takes, keyed by the name of the command.
+        :type costs: dict
+
+        :param default_cost: The number of tokens taken by commands that aren't in costs.
+        :type default_cost: float
+
+        :param max_delay: The most seconds a command is held back to wait for tokens before it is rejected instead.
+        :type max_delay: float
+
+        :param idle_timeout: The seconds a bucket can go unused before it is evicted.
+        :type idle_timeout: float
+
+        :param clock: The function that gives the current time in seconds.
+        :type clock: function
+
+        :except ValueError: Raised if a command costs more tokens than a user or server bucket can hold, since the
+        command could never be used.
+        """
+        # The most tokens a command can take, since both buckets have to be able to hold its cost
+        largest_cost = min(user_capacity, server_capacity)
+        for command, cost in sorted(costs.items()) + [('default', default_cost)]:
+            if cost > largest_cost:
+                raise ValueError('The {} cost of {} is more than the bucket capacity of {}, so it could never be used'
+                                 .format(command, cost, largest_cost))
+        self.user_capacity = user_capacity
+        self.user_rate = user_rate
+        self.server_capacity = server_capacity
+        self.server_rate = server_rate
+        self.costs = costs
+        self.default_cost = default_cost
+        self.max_delay = max_delay
+        # A bucket can't be evicted before it has had time to refill from its lowest point, or evicting it would hand
+        # out free tokens
+        self.idle_timeout = max(idle_timeout, user_capacity / user_rate + max_delay,
+                                server_capacity / server_rate + max_delay)
+        self.clock = clock
+        # The buckets of each user keyed by the server id and user id, and of each server keyed by the server id,
+        # from least to most recently used
+        self._users = collections.OrderedDict()
+        self._servers = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._users) + len(self._servers)
+
+    def cost(self, command):
+        """ Gets the number of tokens a command takes.
+
+        :param command: The name of the command.
+        :type command: str
+
+        :rtype: float
+        """
+        return self.costs.get(command, self.default_cost)
+
+    def acquire(self, server, user, command):
+        """ Takes the tokens for a command from the user's and the server's buckets if the command is allowed.
+
+        :param server: The discord id of the server the command was used in.
+        :type server: str
+
+        :param user: The discord id of the member that used the command.
+        :type user: str
+
+        :param command: The name of the command.
+        :type command: str
+
+        :return: The number of seconds the command has to wait before it is ran, which is 0 if it can be ran right
+        away.  Returns None if the command is rejected, in which case no tokens are taken.
+        :rtype: float, None
+        """
+        cost = self.cost(command)
+        if cost <= 0:
+            return 0
+        now = self.clock()
+        self._evict(now)
+        user_bucket = self._get(self._users, (server, user), self.user_capacity, self.user_rate, now)
+        server_bucket = self._get(self._servers, server, self.server_capacity, self.server_rate, now)
+        # The seconds until both buckets have enough tokens for the command
+        wait = max(0.0, (cost - user_bucket.tokens) / self.user_rate, (cost - server_bucket.tokens) / self.server_rate)
+        if wait > self.max_delay:
+            return None
+        user_bucket.tokens -= cost
+        server_bucket.tokens -= cost
+        user_bucket.warned = False
+        return wait
+
+    def warn(self, server, user):
+        """ Says if a rejected user should be told they are being limited, which only happens once until they get a
+        command through again, so the replies to a spammer can't become spam themselves.
+
+        :rtype: bool
+        """
+        bucket = self._users.get((server, user))
+        if bucket is None or bucket.warned:
+            return False
+        bucket.warned = True
+        return True
+
+    @staticmethod
+    def _get(buckets, key, capacity, rate, now):
+        """ Gets a bucket, creating it if it doesn't exist, refilling it, and marking it as the most recently used.
+        """
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(capacity, now)
+        else:
+            bucket.refill(capacity, rate, now)
+            buckets.move_to_end(key)
+        return bucket
+
+    def _evict(self, now):
+        """ Removes the buckets that have gone unused for longer than the idle timeout.  Only the least recently used
+        buckets are looked at, so this is cheap enough to do on every command.
+        """
+        cutoff = now - self.idle_timeout
+        for buckets in (self._users, self._servers):
+            while buckets:
+                key, bucket = next(iter(buckets.items()))
+                if bucket.updated > cutoff:
+                    break
+                del buckets[key]
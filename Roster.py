@@ -0,0 +1,52 @@
+import csv  # Used to read rosters that are attached as csv files
+import re  # Used to read the mentions in rosters that are written in a message
+
+# Matches a roster line written in a message, in the form `@member ign @team` where the team is optional.  The ign can
+# be placed in quotes if it has spaces in it.
+LINE_PATTERN = re.compile(r'^\s*<@!?(\d+)>\s+"?(.+?)"?(?:\s+<@&(\d+)>)?\s*$')
+
+
+def parse_lines(text):
+    """ Reads a roster written as lines of `@member ign @team` mentions.  Blank lines are skipped.
+
+    :param text: The lines of the roster.
+    :type text: str
+
+    :return: A list of the rows that were read as tuples of the line number, discord id, ign, and team role id (or
+    None if no team was given), and a list of tuples of the line number and reason for each line that couldn't be read.
+    :rtype: tuple
+    """
+    rows = list()
+    failures = list()
+    for number, line in enumerate(text.splitlines(), 1):
+        if line.strip():
+            match = LINE_PATTERN.match(line)
+            if match is not None:
+                rows.append((number, match.group(1), match.group(2), match.group(3)))
+            else:
+                failures.append((number, 'expected `@member ign @team`'))
+    return rows, failures
+
+
+def parse_csv(text):
+    """ Reads a roster from a csv file with the columns discord id, ign, and an optional team role id.  A first row
+    that isn't a discord id is treated as a header and skipped.
+
+    :param text: The contents of the csv file.
+    :type text: str
+
+    :return: The rows and failures, in the same form as parse_lines.
+    :rtype: tuple
+    """
+    rows = list()
+    failures = list()
+    for number, record in enumerate(csv.reader(text.splitlines()), 1):
+        # Strips the whitespace around each column, then skips blank rows and the header
+        record = [column.strip() for column in record]
+        if not any(record) or (number == 1 and record and not record[0].isdigit()):
+            continue
+        if len(record) in (2, 3) and record[0].isdigit() and record[1]:
+            rows.append((number, record[0], record[1], record[2] if len(record) == 3 and record[2] else None))
+        else:
+            failures.append((number, 'expected the columns discord id, ign, team role id'))
+    return rows, failures
@@ -0,0 +1,179 @@
+import sqlite3  # Used to keep the bot's data in a single file for small leagues
+import Pool  # Used to share the bookkeeping of the postgres connection pool
+
+# The tables of the bot, matching the postgres schema made by Migrations.py.  Every statement can be ran again safely,
+# so the schema is made each time a connection is opened instead of through migrations.  Vetoes keep their maps and
+# bans as json arrays, since sqlite has no array type.
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS "Settings" (
+        server text PRIMARY KEY,
+        c_symbol text NOT NULL DEFAULT '!',
+        game_type text,
+        current_season integer NOT NULL DEFAULT 1,
+        current_round integer NOT NULL DEFAULT 1,
+        admin_role text,
+        team_size integer
+    );
+    CREATE TABLE IF NOT EXISTS "Teams" (
+        id integer PRIMARY KEY,
+        server text NOT NULL,
+        discord text NOT NULL,
+        UNIQUE (server, discord)
+    );
+    CREATE TABLE IF NOT EXISTS "Players" (
+        id integer PRIMARY KEY,
+        server text NOT NULL,
+        discord text NOT NULL,
+        ign text NOT NULL,
+        team integer REFERENCES "Teams" (id) ON DELETE SET NULL,
+        UNIQUE (server, discord)
+    );
+    CREATE INDEX IF NOT EXISTS "Players_team_idx" ON "Players" (team);
+    CREATE TABLE IF NOT EXISTS "Matches" (
+        id integer PRIMARY KEY,
+        server text NOT NULL,
+        season integer NOT NULL DEFAULT 1,
+        round integer NOT NULL,
+        team_1 integer NOT NULL REFERENCES "Teams" (id),
+        team_2 integer NOT NULL REFERENCES "Teams" (id),
+        team_1_score integer,
+        team_2_score integer
+    );
+    CREATE INDEX IF NOT EXISTS "Matches_server_round_team_1_idx" ON "Matches" (server, round, team_1);
+    CREATE INDEX IF NOT EXISTS "Matches_server_round_team_2_idx" ON "Matches" (server, round, team_2);
+    CREATE INDEX IF NOT EXISTS "Matches_server_season_round_idx" ON "Matches" (server, season, round);
+    CREATE TABLE IF NOT EXISTS "Standings" (
+        server text NOT NULL,
+        season integer NOT NULL,
+        team integer NOT NULL REFERENCES "Teams" (id) ON DELETE CASCADE,
+        wins integer NOT NULL DEFAULT 0,
+        losses integer NOT NULL DEFAULT 0,
+        draws integer NOT NULL DEFAULT 0,
+        round_difference integer NOT NULL DEFAULT 0,
+        points integer NOT NULL DEFAULT 0,
+        PRIMARY KEY (server, season, team)
+    );
+    CREATE TABLE IF NOT EXISTS "Vetoes" (
+        match integer PRIMARY KEY REFERENCES "Matches" (id) ON DELETE CASCADE,
+        server text NOT NULL,
+        maps text NOT NULL,
+        bans text NOT NULL,
+        completed_at text NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );"""
+
+# The start of the messages of the sqlite errors that mean the database can't be used right now, rather than that the
+# query was wrong.  Sqlite raises both kinds as an OperationalError.
+UNAVAILABLE_MESSAGES = ('database is locked', 'unable to open', 'disk I/O error', 'database or disk is full')
+
+
+def is_unavailable(error):
+    """ Checks if an error means the sqlite database can't be used right now.
+
+    :param error: The error to be checked.
+    :type error: Exception
+
+    :rtype: bool
+    """
+    return isinstance(error, sqlite3.OperationalError) and str(error).startswith(UNAVAILABLE_MESSAGES)
+
+
+class SQLiteCursor(sqlite3.Cursor):
+    """ A sqlite cursor that takes the %s placeholders used by psycopg2, so queries written in standard sql can be ran
+    on both backends.  Can be used in a with statement like a psycopg2 cursor.
+    """
+
+    def execute(self, sql, params=()):
+        return super().execute(sql.replace('%s', '?'), params)
+
+    def executemany(self, sql, seq_of_params):
+        return super().executemany(sql.replace('%s', '?'), seq_of_params)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SQLiteConnection(sqlite3.Connection):
+    """ A sqlite connection with the attributes the connection pool keeps on a psycopg2 connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The time the connection was last put back into the pool
+        self.last_used = 0.0
+        # Says if the connection has been closed, which psycopg2 connections keep track of themselves
+        self.closed = False
+
+    def cursor(self, name=None):
+        """ Creates a cursor.  Sqlite cursors already step through their rows as they are fetched, so the name that
+        makes a psycopg2 cursor keep its rows on the server is ignored.
+
+        :param name: The name a server side cursor would be given in postgres.
+        :type name: str, None
+
+        :rtype: SQLiteCursor
+        """
+        return super().cursor(SQLiteCursor)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+class ConnectionPool(Pool.ConnectionPool):
+    """ A bounded pool of connections to a sqlite database file.  The database is opened in write-ahead log mode, so
+    commands reading the database aren't blocked by a command that is writing to it.  Only one connection can write at
+    a time, and the others wait up to the checkout timeout for their turn.
+    """
+
+    # The name of the backend, which picks the queries that are ran on the pool's connections
+    backend = 'sqlite'
+    # The base class of the errors raised by the pool's connections
+    Error = sqlite3.Error
+
+    def _open(self):
+        """ Opens a new connection to the database file, creating the tables if they don't exist yet.
+
+        :return: The new connection.
+        :rtype: SQLiteConnection
+        """
+        # Transactions are started by cursor instead of by the sqlite module, so savepoints can be used inside of them
+        conn = sqlite3.connect(self.conn_string, timeout=self.checkout_timeout, isolation_level=None,
+                               check_same_thread=False, factory=SQLiteConnection)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Commits only wait for the log to be written, which can't corrupt the database in write-ahead log mode
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            conn.executescript(SCHEMA)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn):
+        """ Checks that a connection hasn't been closed.  There is no server on the other end that could have gone
+        away, so nothing has to be sent.
+
+        :rtype: bool
+        """
+        return not conn.closed
+
+    def cursor(self, conn, write=False):
+        """ Starts a transaction on a connection.  Transactions that write take the database's write lock right away,
+        so they wait for the other writers when they start instead of failing once they have already read something.
+
+        :param conn: The connection that was checked out with getconn.
+        :type conn: SQLiteConnection
+
+        :param write: Says if the transaction is going to change the database.
+        :type write: bool
+
+        :rtype: SQLiteCursor
+        """
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+        return cursor
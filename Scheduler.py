@@ -0,0 +1,29 @@
+def round_robin(teams):
+    """ Creates the rounds of a single round-robin season, where every team plays every other team once.  Uses the
+    circle method: the first team stays in place while the others rotate around it each round.  When there is an odd
+    number of teams, one team sits out each round.  Which team is listed first alternates so that no team is always
+    listed first.
+
+    :param teams: The teams in the season.
+    :type teams: list
+
+    :return: The matches of each round, as lists of tuples holding the two teams of each match.
+    :rtype: list
+    """
+    # Adds a placeholder for the team that sits out each round when there is an odd number of teams
+    slots = list(teams) + [None] if len(teams) % 2 else list(teams)
+    # The number of teams, including the placeholder
+    size = len(slots)
+    rounds = list()
+    for number in range(size - 1):
+        matches = list()
+        for i in range(size // 2):
+            team_1, team_2 = slots[i], slots[size - 1 - i]
+            # Skips the match against the placeholder, since that team sits out the round
+            if team_1 is not None and team_2 is not None:
+                # Swaps the order of the match every other round
+                matches.append((team_1, team_2) if (number + i) % 2 == 0 else (team_2, team_1))
+        rounds.append(matches)
+        # Rotates every team except the first one position around the circle
+        slots.insert(1, slots.pop())
+    return rounds
@@ -1,8 +1,126 @@
+import time  # Used to time how long the bot takes to start
 import yaml  # Used to load the settings from the Config.yaml file
+import SettingsStore  # Used to hold the settings of each server
 
-# Load the config file into a dictionary
+# The time the bot started loading its settings, which the startup timings in Main.py are measured from
+STARTED = time.perf_counter()
+
+# The safe loader only creates plain values such as strings, numbers, lists, and dictionaries.  The C version is used
+# when PyYAML was built with libyaml, since it parses the config many times faster.
+LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# The settings that have to be in the Config.yaml file, as tuples of the keys leading to the setting and the types it
+# can have.  Checking them all at once gives a single error listing every problem, instead of a KeyError for the first.
+NUMBER = (int, float)
+REQUIRED = (
+    (('database', 'backend'), str),
+    (('database', 'sqlite', 'path'), str),
+    (('database', 'host'), str),
+    (('database', 'user'), str),
+    (('database', 'password'), str),
+    (('database', 'name'), str),
+    (('database', 'notify_channel'), str),
+    (('database', 'pool', 'min_size'), int),
+    (('database', 'pool', 'max_size'), int),
+    (('database', 'pool', 'idle_timeout'), NUMBER),
+    (('database', 'pool', 'checkout_timeout'), NUMBER),
+    (('database', 'pool', 'health_check_after'), NUMBER),
+    (('server_defaults',), dict),
+    (('standings', 'win'), int),
+    (('standings', 'draw'), int),
+    (('standings', 'loss'), int),
+    (('veto', 'turn_timeout'), NUMBER),
+    (('veto', 'sequence'), list),
+    (('veto', 'maps'), dict),
+    (('cache', 'roster', 'max_size'), int),
+    (('cache', 'roster', 'ttl'), NUMBER),
+    (('rate_limit', 'user', 'capacity'), NUMBER),
+    (('rate_limit', 'user', 'rate'), NUMBER),
+    (('rate_limit', 'server', 'capacity'), NUMBER),
+    (('rate_limit', 'server', 'rate'), NUMBER),
+    (('rate_limit', 'costs'), dict),
+    (('rate_limit', 'default_cost'), NUMBER),
+    (('rate_limit', 'max_delay'), NUMBER),
+    (('rate_limit', 'idle_timeout'), NUMBER),
+    (('export', 'chunk_size'), int),
+    (('export', 'max_bytes'), int),
+    (('import_roster', 'max_bytes'), int),
+    (('import_roster', 'download_timeout'), NUMBER),
+    (('stats', 'log_interval'), NUMBER + (type(None),)),
+    (('startup', 'prefetch_settings'), bool),
+    (('startup', 'command_wait'), NUMBER),
+    (('launcher', 'workers'), int),
+    (('launcher', 'shard_count'), int),
+    (('launcher', 'restart_delay'), NUMBER),
+    (('launcher', 'max_restart_delay'), NUMBER),
+    (('launcher', 'stable_after'), NUMBER),
+    (('launcher', 'stats_interval'), NUMBER),
+    (('token',), str),
+    (('log', 'file'), str),
+    (('log', 'max_bytes'), int),
+    (('log', 'backup_count'), int),
+)
+
+# The settings that have to be above zero, since they are divided by or used as sizes
+POSITIVE = (('database', 'pool', 'max_size'), ('rate_limit', 'user', 'rate'), ('rate_limit', 'server', 'rate'),
+            ('export', 'chunk_size'), ('import_roster', 'max_bytes'), ('import_roster', 'download_timeout'),
+            ('launcher', 'workers'), ('launcher', 'shard_count'), ('launcher', 'stats_interval'))
+
+
+class ConfigError(Exception):
+    """ Raised when the Config.yaml file is missing settings or has settings of the wrong type.
+    """
+    pass
+
+
+def _lookup(config, keys):
+    """ Gets a nested setting from the config.
+
+    :return: The setting, or None if it or one of the sections leading to it is missing.
+    """
+    value = config
+    for key in keys:
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def validate(config):
+    """ Checks that the config has every setting the bot needs, with the right types.
+
+    :except ConfigError: Raised with a line for each problem found in the config.
+
+    :param config: The config loaded from the Config.yaml file.
+    :type config: dict
+    """
+    problems = list()
+    for keys, types in REQUIRED:
+        value = _lookup(config, keys)
+        # Bools are ints in python, but a bool in place of a number is almost certainly a mistake
+        if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+            names = [t.__name__ for t in (types if isinstance(types, tuple) else (types,))]
+            problems.append('{} should be {}, not {!r}'.format('.'.join(keys), ' or '.join(names), value))
+    for keys in POSITIVE:
+        value = _lookup(config, keys)
+        if isinstance(value, NUMBER) and value <= 0:
+            problems.append('{} should be above 0, not {!r}'.format('.'.join(keys), value))
+    backend = _lookup(config, ('database', 'backend'))
+    if isinstance(backend, str) and backend not in ('postgres', 'sqlite'):
+        problems.append('database.backend should be postgres or sqlite, not {!r}'.format(backend))
+    if problems:
+        raise ConfigError('Config.yaml has {} problem(s):\n{}'.format(len(problems), '\n'.join(problems)))
+
+
+# Load the config file into a dictionary, and checks it before any of it is used
 with open("""Config.yaml""") as cfg_file:
-    cfg = yaml.load(cfg_file)
+    cfg = yaml.load(cfg_file, Loader=LOADER) or dict()
+validate(cfg)
+# The number of seconds taken to load and check the config
+CONFIG_SECONDS = time.perf_counter() - STARTED
+
+# The backend that holds the bot's data, either postgres or sqlite
+DB_BACKEND = cfg['database']['backend']
+# The file of the sqlite database, which is only used by the sqlite backend
+DB_SQLITE_PATH = cfg['database']['sqlite']['path']
 
 # Loads all of the database information from the config file
 DB_HOST = cfg['database']['host']  # The host address of the database
@@ -13,14 +131,74 @@ DB_NAME = cfg['database']['name']  # The name of the database being connected to
 DB_CONN_STRING = """dbname={} user={} host={} password={}""".format(
     DB_NAME, DB_USER, DB_HOST, DB_PASS
 )
+# The postgres notification channel that setting changes are sent to the other bot processes on
+DB_NOTIFY_CHANNEL = cfg['database']['notify_channel']
+# Loads the connection pool settings from the config file
+DB_POOL_MIN_SIZE = cfg['database']['pool']['min_size']  # The number of connections kept open while idle
+DB_POOL_MAX_SIZE = cfg['database']['pool']['max_size']  # The most connections that can be open at once
+DB_POOL_IDLE_TIMEOUT = cfg['database']['pool']['idle_timeout']  # Seconds before an unused extra connection closes
+DB_POOL_CHECKOUT_TIMEOUT = cfg['database']['pool']['checkout_timeout']  # Seconds to wait for a free connection
+DB_POOL_HEALTH_CHECK_AFTER = cfg['database']['pool']['health_check_after']  # Idle seconds before a checkout tests it
+
+# The settings that a server is given the first time the bot sees it
+SERVER_DEFAULTS = SettingsStore.make_settings(**cfg['server_defaults'])
+
+# The points a team gets in the standings for each result of a match
+POINTS_WIN = cfg['standings']['win']
+POINTS_DRAW = cfg['standings']['draw']
+POINTS_LOSS = cfg['standings']['loss']
+
+# Loads the map veto settings from the config file
+VETO_TURN_TIMEOUT = cfg['veto']['turn_timeout']  # Seconds a captain has to take their turn
+VETO_SEQUENCE = cfg['veto']['sequence']  # The action taken on each turn of a veto
+VETO_MAPS = cfg['veto']['maps']  # The map pool of each game type
+
+# Loads the cache settings from the config file
+ROSTER_CACHE_SIZE = cfg['cache']['roster']['max_size']  # The number of team rosters that are cached
+ROSTER_CACHE_TTL = cfg['cache']['roster']['ttl']  # Seconds a cached roster is used before it is reloaded
+
+# Loads the command rate limits from the config file
+RATE_LIMIT_USER_CAPACITY = cfg['rate_limit']['user']['capacity']  # The most commands a member can use in a burst
+RATE_LIMIT_USER_RATE = cfg['rate_limit']['user']['rate']  # The tokens a member gets back each second
+RATE_LIMIT_SERVER_CAPACITY = cfg['rate_limit']['server']['capacity']  # The most commands a server can use in a burst
+RATE_LIMIT_SERVER_RATE = cfg['rate_limit']['server']['rate']  # The tokens a server gets back each second
+RATE_LIMIT_COSTS = cfg['rate_limit']['costs']  # The tokens each command takes
+RATE_LIMIT_DEFAULT_COST = cfg['rate_limit']['default_cost']  # The tokens taken by commands not in the costs
+RATE_LIMIT_MAX_DELAY = cfg['rate_limit']['max_delay']  # Seconds a command can be held back before it is rejected
+RATE_LIMIT_IDLE_TIMEOUT = cfg['rate_limit']['idle_timeout']  # Seconds before an unused bucket is forgotten
+
+# Loads the export settings from the config file
+EXPORT_CHUNK_SIZE = cfg['export']['chunk_size']  # The number of rows read from the database at a time
+EXPORT_MAX_BYTES = cfg['export']['max_bytes']  # The largest export that can be uploaded to discord
+
+# Loads the importroster settings from the config file
+IMPORT_ROSTER_MAX_BYTES = cfg['import_roster']['max_bytes']  # The largest csv file that is downloaded
+IMPORT_ROSTER_DOWNLOAD_TIMEOUT = cfg['import_roster']['download_timeout']  # Seconds the download can take
+
+# Seconds between each time the bot's metrics are written to the log
+STATS_LOG_INTERVAL = cfg['stats']['log_interval']
+
+# Loads the startup settings from the config file
+STARTUP_PREFETCH_SETTINGS = cfg['startup']['prefetch_settings']  # Says if every server's settings load at startup
+STARTUP_COMMAND_WAIT = cfg['startup']['command_wait']  # Seconds messages wait for the bot to finish warming up
+
+# Loads the settings of the launcher, which runs the bot as several worker processes, from the config file
+LAUNCHER_WORKERS = cfg['launcher']['workers']  # The number of worker processes
+LAUNCHER_SHARD_COUNT = cfg['launcher']['shard_count']  # The number of shards spread over the workers
+LAUNCHER_RESTART_DELAY = cfg['launcher']['restart_delay']  # Seconds before a crashed worker is restarted
+LAUNCHER_MAX_RESTART_DELAY = cfg['launcher']['max_restart_delay']  # The longest a crashing worker waits to restart
+LAUNCHER_STABLE_AFTER = cfg['launcher']['stable_after']  # Seconds a worker has to run to reset its restart delay
+LAUNCHER_STATS_INTERVAL = cfg['launcher']['stats_interval']  # Seconds between the stats sent by each worker
 
 # Loads the discord bot token from the config file
 TOKEN = cfg['token']
 
-# The location for the log file loaded from the config file
-LOG = cfg['log']
+# Loads the log file settings from the config file
+LOG = cfg['log']['file']  # The location of the log file
+LOG_MAX_BYTES = cfg['log']['max_bytes']  # The size the log file grows to before it is rotated
+LOG_BACKUP_COUNT = cfg['log']['backup_count']  # The number of rotated log files that are kept
 
-# The settings for the servers will be held in here in a dictionary format,
-# where the server_id is the key and then each setting for the server is a key in a nested dictionary.
-# Will be loaded from the Database.py file using get_settings, and is assigned values within Database.py
-SERVER_SETTINGS = dict()
+# The settings for the servers will be held in here, where the server_id is the key and the settings of the server are
+# held in a ServerSettings record.  Servers are loaded the first time their settings are needed using
+# get_server_settings in the Database.py file, and are assigned values within Database.py
+SERVER_SETTINGS = SettingsStore.SettingsStore()
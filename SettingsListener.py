@@ -0,0 +1,139 @@
+import psycopg2  # Used to listen for notifications from the postgresql database
+import psycopg2.extensions  # Used to put the listening connection in autocommit mode
+import select  # Used to wait for notifications without busy looping
+import json  # Used to decode the setting change notifications
+import logging  # Used to log errors with the listening connection
+import threading  # Used to listen for notifications in the background
+import MatchIndex  # Used to tell which setting changes move a server to another round
+
+
+# Writes the notifications that can't be applied and the lost connections to the log
+listener_log = logging.getLogger('settings')
+
+
+def payload_server(payload):
+    """ Gets the server of a setting change notification, so a notification that can't be applied can still be logged
+    with the server it was for.
+
+    :param payload: The json payload of the notification.
+    :type payload: str
+
+    :return: The server of the notification, or None if the payload doesn't name one.
+    :rtype: str, None
+    """
+    try:
+        return json.loads(payload).get('server')
+    except (ValueError, AttributeError):
+        return None
+
+
+class SettingsListener(threading.Thread):
+    """ Listens on a postgres notification channel for setting changes made by other bot processes, and applies them to
+    this process's settings store as they arrive.
+    """
+
+    def __init__(self, conn_string, channel, store, origin=None, poll_timeout=5, reconnect_delay=5, match_index=None):
+        """ Creates the listener.  Call start to begin listening.
+
+        :param conn_string: The string to be used to connect to the database.
+        :type conn_string: str
+
+        :param channel: The notification channel that setting changes are sent on.
+        :type channel: str
+
+        :param store: The settings store the changes are applied to.
+        :type store: SettingsStore.SettingsStore
+
+        :param origin: The id of this process.  Notifications sent by this process are ignored, since its store already
+        has the change.
+        :type origin: str, None
+
+        :param poll_timeout: The longest number of seconds to wait for a notification before checking if the listener
+        was stopped.
+        :type poll_timeout: float
+
+        :param reconnect_delay: The number of seconds to wait before reconnecting when the connection is lost.
+        :type reconnect_delay: float
+
+        :param match_index: The index of each server's current round of matches, which drops a server's matches when
+        another process changes its round or season.
+        :type match_index: MatchIndex.MatchIndex, None
+        """
+        super().__init__(name='SettingsListener', daemon=True)
+        self.conn_string = conn_string
+        self.channel = channel
+        self.store = store
+        self.origin = origin
+        self.poll_timeout = poll_timeout
+        self.reconnect_delay = reconnect_delay
+        self.match_index = match_index
+        # Set to stop the listener
+        self._stopped = threading.Event()
+
+    def stop(self):
+        """ Stops the listener the next time it wakes up.
+        """
+        self._stopped.set()
+
+    def apply(self, payload):
+        """ Applies a setting change notification to the settings store.
+
+        :param payload: The json payload of the notification.
+        :type payload: str
+        """
+        change = json.loads(payload)
+        # Skips changes made by this process
+        if self.origin is not None and change.get('origin') == self.origin:
+            return
+        self.store.update(change['server'], change['setting'], change['value'])
+        if self.match_index is not None and change['setting'] in MatchIndex.ROUND_SETTINGS:
+            self.match_index.drop(change['server'])
+
+    def listen(self):
+        """ Opens a connection and starts listening on the notification channel.
+
+        :return: The listening connection.
+        :rtype: psycopg2.extensions.connection
+        """
+        conn = psycopg2.connect(self.conn_string)
+        # Notifications are delivered right away in autocommit mode instead of waiting for a transaction to end
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute('LISTEN "{}";'.format(self.channel.replace('"', '""')))
+        return conn
+
+    def run(self):
+        """ Listens for notifications until the listener is stopped, reconnecting when the connection is lost.
+        """
+        # Says if the listener has connected before, in which case changes may have been missed while it was down
+        reconnecting = False
+        while not self._stopped.is_set():
+            conn = None
+            try:
+                conn = self.listen()
+                # Any server could have changed while the listener was disconnected, so the loaded settings are
+                # thrown out and each server is loaded again when it is next used
+                if reconnecting:
+                    self.store.clear()
+                    if self.match_index is not None:
+                        self.match_index.clear()
+                reconnecting = True
+                while not self._stopped.is_set():
+                    # Waits for the connection to have something to read
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    # Applies each of the notifications that arrived
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            self.apply(notify.payload)
+                        except (ValueError, KeyError, TypeError) as e:
+                            listener_log.error('Bad settings notification %r: %s', notify.payload, e,
+                                               extra={'server': payload_server(notify.payload)})
+            except psycopg2.Error as e:
+                listener_log.error('Settings listener lost its connection: %s', e, exc_info=e)
+                self._stopped.wait(self.reconnect_delay)
+            finally:
+                if conn is not None:
+                    conn.close()
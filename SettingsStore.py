@@ -0,0 +1,90 @@
+import collections  # Used to create the compact record that holds a server's settings
+import sys  # Used to intern the setting strings that most servers share
+
+# The settings of a single server.  A namedtuple is used instead of a dictionary so that each server's settings take
+# up as little memory as possible.
+ServerSettings = collections.namedtuple('ServerSettings', ['c_symbol', 'game_type', 'current_season',
+                                                           'current_round', 'admin_role', 'team_size'])
+
+
+def make_settings(c_symbol, game_type, current_season, current_round, admin_role, team_size):
+    """ Creates the settings record of a server.  The command symbol and game type are interned, since most servers
+    use the same few values and only one copy of each needs to be kept.
+
+    :return: The settings record.
+    :rtype: ServerSettings
+    """
+    if isinstance(c_symbol, str):
+        c_symbol = sys.intern(c_symbol)
+    if isinstance(game_type, str):
+        game_type = sys.intern(game_type)
+    return ServerSettings(c_symbol, game_type, current_season, current_round, admin_role, team_size)
+
+
+class SettingsStore:
+    """ Holds the settings of the servers the bot has seen.  Servers are added when their settings are first needed
+    rather than all being loaded when the bot starts.
+    """
+    __slots__ = ('_records',)
+
+    def __init__(self):
+        # The settings of each server, where the key is the server's discord id
+        self._records = dict()
+
+    def __contains__(self, server):
+        return server in self._records
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, server):
+        """ Gets the settings of a server that has already been loaded.
+
+        :param server: The discord id of the server.
+        :type server: str
+
+        :return: The settings of the server, or None if they haven't been loaded.
+        :rtype: ServerSettings, None
+        """
+        return self._records.get(server)
+
+    def put(self, server, record):
+        """ Sets the settings of a server.
+
+        :param server: The discord id of the server.
+        :type server: str
+
+        :param record: The settings of the server.
+        :type record: ServerSettings
+        """
+        self._records[server] = record
+
+    def update(self, server, setting_type, setting_val):
+        """ Changes a single setting of a server.  Servers that haven't been loaded are left alone, since they will
+        get the new value when they are first loaded.
+
+        :param server: The discord id of the server.
+        :type server: str
+
+        :param setting_type: The name of the setting to be changed.
+        :type setting_type: str
+
+        :param setting_val: The new value of the setting.
+        :type setting_val: int, str, etc
+        """
+        record = self._records.get(server)
+        if record is not None:
+            self._records[server] = make_settings(*record._replace(**{setting_type: setting_val}))
+
+    def clear(self):
+        """ Removes the settings of every server, so they are loaded again the next time they are needed.
+        """
+        self._records.clear()
+
+    def load_all(self, records):
+        """ Adds the settings of many servers at once.
+
+        :param records: The settings of each server, keyed by the server's discord id.
+        :type records: dict
+        """
+        self._records.update(records)
@@ -0,0 +1,64 @@
+import collections  # Used to keep the phases in the order they finished
+import time  # Used to time each phase of starting the bot
+from contextlib import contextmanager  # Used to time the phases with a with statement
+import Metrics  # Used to keep the startup timings with the rest of the bot's metrics
+
+
+class StartupTimer:
+    """ Records how long each phase of starting the bot takes.  Phases can overlap, such as warming up the database
+    while logging in to discord, so each phase is kept with the time it started as well as how long it took.
+    """
+
+    def __init__(self, started, clock=time.perf_counter):
+        """ Creates the timer.
+
+        :param started: The time the bot started, which the start of each phase is measured from.
+        :type started: float
+
+        :param clock: The function that gives the current time in seconds.
+        :type clock: function
+        """
+        self.started = started
+        self.clock = clock
+        # The start of each phase in seconds after the bot started and how long it took, keyed by the phase's name
+        self.phases = collections.OrderedDict()
+
+    def record(self, name, start, end=None):
+        """ Records a phase that has finished.
+
+        :param name: The name of the phase.
+        :type name: str
+
+        :param start: The time the phase started.
+        :type start: float
+
+        :param end: The time the phase finished.  Defaults to now.
+        :type end: float, None
+        """
+        end = self.clock() if end is None else end
+        self.phases[name] = (start - self.started, end - start)
+        Metrics.METRICS.observe('startup.' + name, end - start)
+
+    @contextmanager
+    def phase(self, name):
+        """ Times the phase ran in the with block, recording it even if it fails.
+
+        :param name: The name of the phase.
+        :type name: str
+        """
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def report(self):
+        """ Builds a table of the phases, in the order they finished.
+
+        :return: The lines of the table.
+        :rtype: list
+        """
+        lines = ['{:<12} {:>10} {:>10}'.format('startup', 'start s', 'took s')]
+        for name, (start, took) in self.phases.items():
+            lines.append('{:<12} {:>10.3f} {:>10.3f}'.format(name, start, took))
+        return lines
@@ -0,0 +1,81 @@
+import SettingsStore  # Used to get the names of the settings that can be updated
+
+# The queries that are ran often enough to be worth preparing on the server, keyed by the name they are prepared
+# under.  Placeholders use postgres' $1, $2, ... format since the queries are sent to the server with PREPARE.
+STATEMENTS = {
+    # Gets the discord id and ign of each player on a team
+    'get_players': """SELECT p.discord, p.ign FROM "Players" p, "Teams" t
+        WHERE p.server=$1 AND t.server=p.server AND t.discord=$2 AND p.team=t.id""",
+    # Sets a player's team, returning the team they were on before
+    'set_team': """UPDATE "Players" p SET team = t.id
+        FROM "Teams" t, "Players" old LEFT JOIN "Teams" old_t ON old_t.id = old.team
+        WHERE p.server = $1 AND t.server = p.server AND p.discord = $2 AND t.discord = $3 AND old.id = p.id
+        RETURNING old_t.discord""",
+    # Moves a player onto a team if the team has room, returning a result code and the player's old team
+    'join_team': """SELECT result, old_team FROM join_team($1, $2, $3)""",
+    # Reports the scores of the unreported game a team played in a round of a season, and adds the result to both
+    # teams' standings in the same statement.  $7, $8, and $9 are the points given for a win, a draw, and a loss.
+    # Returns the number of games that were reported.  The results are summed by team before they are added, since an
+    # upsert can't change the same standings row twice when the team matched more than one game.
+    'update_game_scores': """WITH reported AS (
+            UPDATE "Matches" m
+            SET team_1_score=(CASE WHEN m.team_1=t.id THEN $1::integer ELSE $2::integer END),
+                team_2_score=(CASE WHEN m.team_2=t.id THEN $1::integer ELSE $2::integer END)
+            FROM "Teams" t WHERE m.round=$3 AND t.discord=$4 AND (m.team_1=t.id OR m.team_2=t.id) AND m.server=$5
+                AND m.season=$6 AND m.team_1_score IS NULL AND m.team_2_score IS NULL
+            RETURNING m.server, m.season, m.team_1, m.team_2, m.team_1_score, m.team_2_score
+        ), sides AS (
+            SELECT server, season, team_1 AS team, team_1_score AS scored, team_2_score AS conceded FROM reported
+            UNION ALL
+            SELECT server, season, team_2, team_2_score, team_1_score FROM reported
+        ), standings AS (
+            INSERT INTO "Standings" AS s (server, season, team, wins, losses, draws, round_difference, points)
+            SELECT server, season, team, SUM((scored > conceded)::integer), SUM((scored < conceded)::integer),
+                SUM((scored = conceded)::integer), SUM(scored - conceded),
+                SUM(CASE WHEN scored > conceded THEN $7::integer WHEN scored = conceded THEN $8::integer
+                    ELSE $9::integer END)
+            FROM sides GROUP BY server, season, team
+            ON CONFLICT (server, season, team) DO UPDATE SET wins = s.wins + EXCLUDED.wins,
+                losses = s.losses + EXCLUDED.losses, draws = s.draws + EXCLUDED.draws,
+                round_difference = s.round_difference + EXCLUDED.round_difference,
+                points = s.points + EXCLUDED.points
+        )
+        SELECT COUNT(*) FROM reported""",
+    # Gets the standings of a season from best to worst
+    'get_standings': """SELECT t.discord, s.wins, s.losses, s.draws, s.round_difference, s.points
+        FROM "Standings" s JOIN "Teams" t ON t.id = s.team
+        WHERE s.server = $1 AND s.season = $2
+        ORDER BY s.points DESC, s.round_difference DESC, s.wins DESC""",
+}
+
+# Adds a statement for each setting that can be updated, since a column name can't be a placeholder.  Only the
+# settings in this whitelist can be changed by update_settings.
+for _setting in SettingsStore.ServerSettings._fields:
+    STATEMENTS['update_settings_' + _setting] = """WITH updated AS (
+            UPDATE "Settings" SET {} = $1 WHERE server = $2 RETURNING server)
+        SELECT pg_notify($3, $4) FROM updated""".format(_setting)
+
+
+def execute(cursor, name, params=()):
+    """ Runs a prepared statement, preparing it on the cursor's connection the first time it is used there.
+
+    :param cursor: The cursor to run the statement with.  Its connection must be a Pool.PooledConnection.
+    :type cursor: psycopg2.extensions.cursor
+
+    :param name: The name of the statement in STATEMENTS.
+    :type name: str
+
+    :param params: The values of the statement's placeholders, in order.
+    :type params: tuple
+    """
+    # The statements that have already been prepared on the connection
+    prepared = cursor.connection.prepared_statements
+    # Prepares the statement if this connection hasn't seen it yet
+    if name not in prepared:
+        cursor.execute('PREPARE {} AS {}'.format(name, STATEMENTS[name]))
+        prepared.add(name)
+    # Runs the prepared statement with the given values
+    if params:
+        cursor.execute('EXECUTE {} ({})'.format(name, ', '.join(['%s'] * len(params))), params)
+    else:
+        cursor.execute('EXECUTE {}'.format(name))
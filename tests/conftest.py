@@ -0,0 +1,64 @@
+import os  # Used to find the root of the repo
+import sys  # Used to import the bot's modules from the root of the repo
+import pytest  # Used to share the database fixtures between the tests
+
+# The bot's modules live in the root of the repo and Settings.py reads Config.yaml from the working directory, so the
+# tests are ran from the root no matter where pytest was started
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+def use_pool(monkeypatch, pool):
+    """ Points the database functions at a pool, with empty caches so nothing is left over from other tests.
+    """
+    import Cache  # Used to make an empty roster cache
+    import Database  # Holds the pool and caches being replaced
+    import MatchIndex  # Used to make an empty match index
+    import Settings  # Holds the settings store being replaced
+    import SettingsStore  # Used to make an empty settings store
+    monkeypatch.setattr(Database, 'POOL', pool)
+    monkeypatch.setattr(Database, 'ROSTER_CACHE', Cache.LRUCache(Settings.ROSTER_CACHE_SIZE,
+                                                                 Settings.ROSTER_CACHE_TTL))
+    monkeypatch.setattr(Database, 'MATCH_INDEX', MatchIndex.MatchIndex())
+    monkeypatch.setattr(Settings, 'SERVER_SETTINGS', SettingsStore.SettingsStore())
+
+
+@pytest.fixture
+def sqlite_pool(tmp_path, monkeypatch):
+    """ Points the database functions at a new sqlite database.
+    """
+    pytest.importorskip('psycopg2')
+    import Database  # Used to make the sqlite pool
+    import Settings  # Used to point the sqlite backend at a temporary file
+    monkeypatch.setattr(Settings, 'DB_SQLITE_PATH', str(tmp_path / 'league.db'))
+    pool = Database.make_pool('sqlite')
+    use_pool(monkeypatch, pool)
+    yield pool
+    pool.closeall()
+
+
+@pytest.fixture
+def postgres_pool(monkeypatch):
+    """ Points the database functions at the postgres server in Config.yaml, skipping the test if it can't be reached
+    or hasn't been migrated.
+    """
+    psycopg2 = pytest.importorskip('psycopg2')
+    import Database  # Used to make the postgres pool
+    import Settings  # Holds the connection string of the postgres server
+    try:
+        conn = psycopg2.connect(Settings.DB_CONN_STRING, connect_timeout=3)
+    except psycopg2.Error as e:
+        pytest.skip('No postgres server to test with: {}'.format(e))
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""SELECT to_regclass('"Settings"');""")
+            migrated = cursor.fetchone()[0] is not None
+    finally:
+        conn.close()
+    if not migrated:
+        pytest.skip('The postgres database has not been migrated, run Migrations.py first')
+    pool = Database.make_pool('postgres')
+    use_pool(monkeypatch, pool)
+    yield pool
+    pool.closeall()
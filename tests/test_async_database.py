@@ -0,0 +1,37 @@
+import asyncio  # Used to run the database calls at the same time
+import threading  # Used to hold the slow call until the fast one has finished
+import pytest  # Used to skip the tests when the database driver isn't installed
+
+pytest.importorskip('psycopg2')
+
+import AsyncDatabase  # Holds the awaitable database functions being tested
+import Database  # Holds the blocking database functions that are stubbed
+
+
+def test_slow_server_does_not_block_other_servers(monkeypatch):
+    # Releases the slow server's call, which only happens once the fast server's call has finished
+    release = threading.Event()
+
+    def get_server_settings(server):
+        if server == 'slow':
+            release.wait(5)
+        return server
+
+    monkeypatch.setattr(Database, 'get_server_settings', get_server_settings)
+    monkeypatch.setattr(AsyncDatabase, 'get_server_settings', AsyncDatabase._awaitable(Database.get_server_settings))
+    finished = list()
+
+    async def command(server):
+        finished.append(await AsyncDatabase.get_server_settings(server))
+        release.set()
+
+    async def both():
+        await asyncio.wait_for(asyncio.gather(command('slow'), command('fast')), 10)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(both())
+    finally:
+        loop.close()
+    # If the slow call blocked the event loop it would give up waiting and finish first
+    assert finished == ['fast', 'slow']
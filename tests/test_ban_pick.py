@@ -0,0 +1,124 @@
+import asyncio  # Used to run the turn timers of the vetoes
+import random  # Used to make the maps chosen for timed out captains repeatable
+import pytest  # Used to check that the vetoes turn away bad actions
+import BanPick  # Holds the vetoes being tested
+
+MAPS = ['Bank', 'Border', 'Chalet', 'Clubhouse', 'Coastline']
+SEQUENCE = [BanPick.BAN, BanPick.BAN, BanPick.PICK, BanPick.PICK]
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def make_session(loop, turn_timeout=None, seed=0, **kwargs):
+    return BanPick.VetoSession(('server', 1), 'team-1', 'team-2', MAPS, SEQUENCE, turn_timeout, loop=loop,
+                               rng=random.Random(seed), **kwargs)
+
+
+def test_turns_alternate_through_the_sequence(loop):
+    session = make_session(loop)
+    assert (session.current_team, session.current_action) == ('team-1', BanPick.BAN)
+    session.act('team-1', BanPick.BAN, 'bank')
+    assert (session.current_team, session.current_action) == ('team-2', BanPick.BAN)
+    session.act('team-2', BanPick.BAN, 'Border')
+    assert (session.current_team, session.current_action) == ('team-1', BanPick.PICK)
+    session.act('team-1', BanPick.PICK, 'Chalet')
+    session.act('team-2', BanPick.PICK, 'Coastline')
+    assert session.finished
+    assert session.current_team is None
+    assert session.bans == ['Bank', 'Border']
+    assert session.picks == ['Chalet', 'Coastline', 'Clubhouse']
+    assert session.decider == 'Clubhouse'
+
+
+def test_acting_out_of_turn_is_rejected(loop):
+    session = make_session(loop)
+    with pytest.raises(BanPick.VetoError):
+        session.act('team-2', BanPick.BAN, 'Bank')
+    with pytest.raises(BanPick.VetoError):
+        session.act('team-1', BanPick.PICK, 'Bank')
+    with pytest.raises(BanPick.VetoError):
+        session.act('team-1', BanPick.BAN, 'Oregon')
+    # Nothing was taken by the rejected actions
+    assert session.actions == []
+    assert session.remaining == MAPS
+    session.act('team-1', BanPick.BAN, 'Bank')
+    with pytest.raises(BanPick.VetoError):
+        session.act('team-2', BanPick.BAN, 'Bank')
+
+
+def test_only_the_captain_takes_a_team_s_turns(loop):
+    session = make_session(loop, captains={'team-1': 'alice'})
+    with pytest.raises(BanPick.VetoError):
+        session.act('team-1', BanPick.BAN, 'Bank', 'bob')
+    session.act('team-1', BanPick.BAN, 'Bank', 'alice')
+    # The first member of the other team to act becomes its captain
+    session.act('team-2', BanPick.BAN, 'Border', 'carol')
+    assert session.captains == {'team-1': 'alice', 'team-2': 'carol'}
+    session.act('team-1', BanPick.PICK, 'Chalet', 'alice')
+    with pytest.raises(BanPick.VetoError):
+        session.act('team-2', BanPick.PICK, 'Coastline', 'dave')
+    session.act('team-2', BanPick.PICK, 'Coastline', 'carol')
+    assert session.finished
+
+
+def test_timed_out_turn_picks_a_random_map(loop):
+    timeouts = list()
+    session = make_session(loop, turn_timeout=0.01, seed=3, on_timeout=lambda s, action: timeouts.append(action))
+    session.act('team-1', BanPick.BAN, 'Bank')
+    loop.run_until_complete(asyncio.sleep(0.05))
+    # The second team's turn ran out first, so it got the generator's first choice of the maps left after the ban
+    remaining = ['Border', 'Chalet', 'Clubhouse', 'Coastline']
+    expected = random.Random(3).choice(remaining)
+    assert len(timeouts) >= 1
+    assert timeouts[0] == ('team-2', BanPick.BAN, expected)
+    assert session.actions[0] == ('team-1', BanPick.BAN, 'Bank', False)
+    assert session.actions[1] == ('team-2', BanPick.BAN, expected, True)
+
+
+def test_timers_finish_the_veto_when_nobody_acts(loop):
+    session = make_session(loop, turn_timeout=0.01)
+    loop.run_until_complete(asyncio.sleep(0.2))
+    assert session.finished
+    assert all(timed_out for team, action, map_name, timed_out in session.actions)
+    assert len(session.picks) == 3
+
+
+def test_finished_veto_is_saved_once(loop):
+    saved = list()
+
+    async def save(session):
+        saved.append(session.key)
+
+    manager = BanPick.SessionManager({'R6S': MAPS}, SEQUENCE, None, save=save, loop=loop, rng=random.Random(0))
+    session = manager.start('server', 1, 'team-1', 'team-2', 'R6S')
+    with pytest.raises(BanPick.VetoError):
+        manager.start('server', 2, 'team-2', 'team-3', 'R6S')
+    for team, action, map_name in [('team-1', BanPick.BAN, 'Bank'), ('team-2', BanPick.BAN, 'Border'),
+                                   ('team-1', BanPick.PICK, 'Chalet'), ('team-2', BanPick.PICK, 'Coastline')]:
+        manager.find('server', team).act(team, action, map_name)
+    with pytest.raises(BanPick.VetoError):
+        session.act('team-1', BanPick.BAN, 'Clubhouse')
+    loop.run_until_complete(asyncio.gather(*manager.pending_saves))
+    assert saved == [('server', 1)]
+    # The teams are free to start another veto once the last one is finished
+    assert manager.find('server', 'team-1') is None
+    assert manager.sessions == {}
+
+
+def test_cancelled_veto_is_not_saved(loop):
+    saved = list()
+
+    async def save(session):
+        saved.append(session.key)
+
+    manager = BanPick.SessionManager({'R6S': MAPS}, SEQUENCE, 0.01, save=save, loop=loop, rng=random.Random(0))
+    manager.start('server', 1, 'team-1', 'team-2', 'R6S')
+    assert manager.cancel('server', 1)
+    loop.run_until_complete(asyncio.sleep(0.05))
+    assert saved == []
+    assert not manager.pending_saves
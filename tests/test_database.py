@@ -0,0 +1,131 @@
+import pytest  # Used to run the transaction tests on each backend
+
+pytest.importorskip('psycopg2')
+
+import Database  # Holds the transactions being tested
+
+SERVER = 'database-test'
+
+
+@pytest.fixture(params=['sqlite_pool', 'postgres_pool'])
+def pool(request):
+    """ Runs the test on each backend, removing the test server's rows before and after it.
+    """
+    pool = request.getfixturevalue(request.param)
+    clear_server()
+    yield pool
+    clear_server()
+
+
+def clear_server():
+    with Database.connect(commit=True) as cursor:
+        cursor.execute("""DELETE FROM "Standings" WHERE server = %s;""", (SERVER,))
+        cursor.execute("""DELETE FROM "Matches" WHERE server = %s;""", (SERVER,))
+        cursor.execute("""DELETE FROM "Players" WHERE server = %s;""", (SERVER,))
+        cursor.execute("""DELETE FROM "Teams" WHERE server = %s;""", (SERVER,))
+
+
+def players():
+    with Database.connect() as cursor:
+        cursor.execute("""SELECT discord FROM "Players" WHERE server = %s ORDER BY discord;""", (SERVER,))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def test_callbacks_run_once_the_transaction_commits(pool):
+    called = list()
+    with Database.transaction() as work:
+        assert work.add_player(SERVER, 'player-1', 'ign-1')
+        work.on_commit(lambda: called.append('first'))
+        work.on_commit(lambda: called.append('second'))
+        assert called == []
+    assert called == ['first', 'second']
+    assert players() == ['player-1']
+
+
+def test_rolled_back_transaction_skips_its_callbacks(pool):
+    called = list()
+    with pytest.raises(ValueError):
+        with Database.transaction() as work:
+            work.add_player(SERVER, 'player-1', 'ign-1')
+            work.on_commit(lambda: called.append('first'))
+            raise ValueError('the unit of work failed')
+    assert called == []
+    assert players() == []
+
+
+def test_read_only_transaction_skips_its_callbacks(pool):
+    called = list()
+    with Database.transaction(commit=False) as work:
+        work.add_player(SERVER, 'player-1', 'ign-1')
+        work.on_commit(lambda: called.append('first'))
+    assert called == []
+    assert players() == []
+
+
+def test_savepoint_rolls_back_only_its_block(pool):
+    called = list()
+    with Database.transaction() as work:
+        work.add_player(SERVER, 'player-1', 'ign-1')
+        work.on_commit(lambda: called.append('before'))
+        # Adding the same player again breaks a constraint, which only undoes the savepoint's block
+        with pytest.raises(Database.Conflict):
+            with work.savepoint():
+                work.add_player(SERVER, 'player-2', 'ign-2')
+                work.on_commit(lambda: called.append('rolled back'))
+                work.add_player(SERVER, 'player-1', 'ign-1')
+        with work.savepoint():
+            work.add_player(SERVER, 'player-3', 'ign-3')
+            work.on_commit(lambda: called.append('released'))
+    assert called == ['before', 'released']
+    assert players() == ['player-1', 'player-3']
+
+
+def test_savepoint_raises_errors_that_are_not_from_the_database(pool):
+    with Database.transaction() as work:
+        work.add_player(SERVER, 'player-1', 'ign-1')
+        with pytest.raises(KeyError):
+            with work.savepoint():
+                work.add_player(SERVER, 'player-2', 'ign-2')
+                raise KeyError('player-2')
+    assert players() == ['player-1']
+
+
+def test_roster_lookup_counts_one_miss(sqlite_pool):
+    clear_server()
+    with Database.transaction() as work:
+        work.cursor.execute("""INSERT INTO "Teams"(server, discord) VALUES (%s, %s);""", (SERVER, 'team-1'))
+        work.add_player(SERVER, 'player-1', 'ign-1')
+        assert work.set_team(SERVER, 'player-1', 'team-1')
+    assert Database.get_players(SERVER, 'team-1') == [('player-1',)]
+    assert Database.ROSTER_CACHE.stats()['misses'] == 1
+    assert Database.get_players(SERVER, 'team-1', ign=True) == [('player-1', 'ign-1')]
+    assert Database.ROSTER_CACHE.stats()['misses'] == 1
+    assert Database.ROSTER_CACHE.stats()['hits'] == 1
+
+
+def test_report_matching_two_games_changes_nothing(pool):
+    with Database.transaction() as work:
+        teams = dict()
+        for team in ('team-a', 'team-b', 'team-c'):
+            work.cursor.execute("""INSERT INTO "Teams"(server, discord) VALUES (%s, %s) RETURNING id;""",
+                                (SERVER, team))
+            teams[team] = work.cursor.fetchone()[0]
+        # A schedule made twice by mistake gives team-a two games in the round
+        work.cursor.executemany("""INSERT INTO "Matches"(server, season, round, team_1, team_2)
+            VALUES (%s, 1, 1, %s, %s);""", [(SERVER, teams['team-a'], teams['team-b']),
+                                            (SERVER, teams['team-a'], teams['team-c'])])
+    with pytest.raises(Database.GameNotReported) as error:
+        Database.update_game_scores(SERVER, 1, 1, 'team-a', 7, 5)
+    assert error.value.games == 2
+    with Database.connect() as cursor:
+        cursor.execute("""SELECT COUNT(*) FROM "Matches" WHERE server = %s AND team_1_score IS NOT NULL;""",
+                       (SERVER,))
+        assert cursor.fetchone()[0] == 0
+        cursor.execute("""SELECT COUNT(*) FROM "Standings" WHERE server = %s;""", (SERVER,))
+        assert cursor.fetchone()[0] == 0
+    # team-b only played one of the games, so its report goes through
+    assert Database.update_game_scores(SERVER, 1, 1, 'team-b', 5, 7)
+    with Database.connect() as cursor:
+        cursor.execute("""SELECT t.discord, s.wins, s.losses FROM "Standings" s JOIN "Teams" t ON t.id = s.team
+            WHERE s.server = %s ORDER BY t.discord;""", (SERVER,))
+        assert cursor.fetchall() == [('team-a', 1, 0), ('team-b', 0, 1)]
@@ -0,0 +1,53 @@
+import csv  # Used to read the exported tables back
+import io  # Used to read the csv text out of the archive
+import tempfile  # Used to write the archive to disk like the export command does
+import tracemalloc  # Used to find the most memory allocated during the export
+import zipfile  # Used to open the exported archive
+import pytest  # Used to skip the tests when the database driver isn't installed
+
+pytest.importorskip('psycopg2')
+
+import Database  # Used to fill the sqlite database the league is exported from
+import Export  # Holds the export being tested
+
+SERVER = 'export-league'
+TEAMS = 100
+PLAYERS = 20000
+MATCHES = 20000
+# The most memory the export may allocate at once.  Fetching every row in one chunk takes over three times this.
+MAX_PEAK = 2000000
+
+
+@pytest.fixture
+def league(sqlite_pool):
+    with Database.connect(commit=True) as cursor:
+        cursor.executemany("""INSERT INTO "Teams"(server, discord) VALUES (%s, %s);""",
+                           [(SERVER, 'team-{}'.format(i)) for i in range(TEAMS)])
+        cursor.execute("""SELECT id FROM "Teams" WHERE server = %s ORDER BY id;""", (SERVER,))
+        teams = [row[0] for row in cursor.fetchall()]
+        cursor.executemany("""INSERT INTO "Players"(server, discord, ign, team) VALUES (%s, %s, %s, %s);""",
+                           [(SERVER, 'player-{:040}'.format(i), 'ign-{:040}'.format(i), teams[i % TEAMS])
+                            for i in range(PLAYERS)])
+        cursor.executemany("""INSERT INTO "Matches"(server, season, round, team_1, team_2, team_1_score,
+            team_2_score) VALUES (%s, 1, %s, %s, %s, 7, 5);""",
+                           [(SERVER, i // (TEAMS // 2) + 1, teams[2 * (i % (TEAMS // 2))],
+                             teams[2 * (i % (TEAMS // 2)) + 1]) for i in range(MATCHES)])
+
+
+def test_export_memory_stays_flat(league):
+    with tempfile.TemporaryFile() as archive_file:
+        tracemalloc.start()
+        try:
+            counts = Export.write_archive(SERVER, archive_file, 500)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert counts == {'teams.csv': TEAMS, 'players.csv': PLAYERS, 'matches.csv': MATCHES}
+        assert peak < MAX_PEAK, 'The export allocated {} bytes'.format(peak)
+        archive_file.seek(0)
+        with zipfile.ZipFile(archive_file) as archive:
+            with archive.open('players.csv') as member:
+                rows = list(csv.reader(io.TextIOWrapper(member, encoding='utf-8', newline='')))
+    assert rows[0] == ['discord id', 'ign', 'team role id']
+    assert rows[1] == ['player-{:040}'.format(0), 'ign-{:040}'.format(0), 'team-0']
+    assert len(rows) == PLAYERS + 1
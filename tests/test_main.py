@@ -0,0 +1,215 @@
+import asyncio  # Used to run the bot's message handler
+from types import SimpleNamespace  # Used to build the fake discord messages
+import pytest  # Used to skip the tests when the bot's dependencies aren't installed
+
+pytest.importorskip('discord')
+pytest.importorskip('aiohttp')
+pytest.importorskip('psycopg2')
+
+import aiohttp  # Used to fail the roster downloads
+import Commands  # Holds the commands that the help message lists
+import Main  # Holds the command handlers being tested
+import RateLimit  # Used to let every command of the tests through
+import Settings  # Holds the settings store that is cleared while a command waits
+
+SERVER = 'main-test'
+
+
+@pytest.fixture
+def sent(sqlite_pool, monkeypatch):
+    """ Runs the bot on a sqlite database, collecting the messages it sends instead of sending them to discord.
+    Commands aren't rate limited, so the tests don't hold each other back.
+    """
+    sent = list()
+    monkeypatch.setattr(Main, 'limiter', RateLimit.RateLimiter(1, 1, 1, 1, dict(), default_cost=0))
+
+    async def send_message(destination, content=None, *args, **kwargs):
+        sent.append(content)
+
+    monkeypatch.setattr(Main.client, 'send_message', send_message)
+    return sent
+
+
+def make_message(content, author='member-1', roles=(), role_mentions=(), admin=False, attachments=()):
+    """ Builds a message sent in the test server.
+    """
+    return SimpleNamespace(content=content, channel='channel', raw_role_mentions=list(role_mentions),
+                           attachments=list(attachments), server=SimpleNamespace(id=SERVER, name='Test Server'),
+                           author=SimpleNamespace(id=author, roles=[SimpleNamespace(id=role) for role in roles],
+                                                  server_permissions=SimpleNamespace(administrator=admin)))
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_command_uses_the_settings_loaded_for_its_message(sent, monkeypatch):
+    # The settings listener clears the store when it reconnects, which can happen while a command waits for the rate
+    # limit after on_message has loaded the server's settings
+    def acquire(server, member, command):
+        Settings.SERVER_SETTINGS.clear()
+        return 0.01
+
+    monkeypatch.setattr(Main.limiter, 'acquire', acquire)
+    run(Main.on_message(make_message('!standings')))
+    assert sent == ['No games have been reported in season 1 yet.']
+
+
+def test_help_lists_every_command(sent):
+    run(Main.on_message(make_message('!help')))
+    assert len(sent) == 1 and len(sent[0]) <= 2000
+    for name in Commands.COMMANDS:
+        assert '`!{}'.format(name) in sent[0], name
+
+
+def test_importroster_turns_away_large_files_without_downloading(sent, monkeypatch):
+    async def download_roster(url, max_bytes):
+        raise AssertionError('the file was downloaded')
+
+    monkeypatch.setattr(Main, 'download_roster', download_roster)
+    attachment = {'url': 'https://example.com/roster.csv', 'size': Settings.IMPORT_ROSTER_MAX_BYTES + 1}
+    run(Main.on_message(make_message('!importroster', admin=True, attachments=[attachment])))
+    assert len(sent) == 1 and 'too large' in sent[0]
+
+
+def test_importroster_replies_when_the_download_fails(sent, monkeypatch):
+    async def download_roster(url, max_bytes):
+        raise aiohttp.ClientError('connection reset')
+
+    monkeypatch.setattr(Main, 'download_roster', download_roster)
+    attachment = {'url': 'https://example.com/roster.csv', 'size': 100}
+    run(Main.on_message(make_message('!importroster', admin=True, attachments=[attachment])))
+    assert len(sent) == 1 and 'could not be downloaded' in sent[0]
+
+
+def test_importroster_imports_a_downloaded_file(sent, monkeypatch):
+    async def download_roster(url, max_bytes):
+        return 'discord id,ign\n101,first\n102,second\n'
+
+    monkeypatch.setattr(Main, 'download_roster', download_roster)
+    attachment = {'url': 'https://example.com/roster.csv', 'size': 100}
+    run(Main.on_message(make_message('!importroster', admin=True, attachments=[attachment])))
+    assert sent == ['2 players were imported.']
+
+
+class FakeResponse:
+    """ A download that hands out its body a few bytes at a time.
+    """
+
+    def __init__(self, body, status=200):
+        self.status = status
+        self.content = self
+        self._body = body
+
+    async def read(self, size):
+        chunk, self._body = self._body[:min(size, 3)], self._body[min(size, 3):]
+        return chunk
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+@pytest.mark.parametrize('body, status, expected', [
+    (b'\xef\xbb\xbf101,ign', 200, '101,ign'),
+    (b'0123456789', 200, '0123456789'),
+    (b'0123456789a', 200, ValueError),
+    (b'\xff\xfe', 200, ValueError),
+    (b'not found', 404, aiohttp.ClientError),
+])
+def test_download_roster_stops_past_the_limit(monkeypatch, body, status, expected):
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+        def get(self, url):
+            return FakeResponse(body, status)
+
+    monkeypatch.setattr(aiohttp, 'ClientSession', Session)
+    if isinstance(expected, str):
+        assert run(Main.download_roster('https://example.com/roster.csv', 10)) == expected
+    else:
+        with pytest.raises(expected):
+            run(Main.download_roster('https://example.com/roster.csv', 10))
+
+
+@pytest.fixture
+def match(sent, monkeypatch):
+    """ Gives the test server a match between team-a and team-b in the current round, with no vetoes running.
+    """
+    monkeypatch.setattr(Main, 'vetoes', Main.BanPick.SessionManager(Settings.VETO_MAPS, Settings.VETO_SEQUENCE, None,
+                                                                     save=Main.save_veto))
+    with Main.Database.transaction() as work:
+        teams = list()
+        for team in ('team-a', 'team-b'):
+            work.cursor.execute("""INSERT INTO "Teams"(server, discord) VALUES (%s, %s) RETURNING id;""",
+                                (SERVER, team))
+            teams.append(work.cursor.fetchone()[0])
+        work.cursor.execute("""INSERT INTO "Matches"(server, season, round, team_1, team_2) VALUES (%s, 1, 1, %s, %s)
+            RETURNING id;""", (SERVER, teams[0], teams[1]))
+        return work.cursor.fetchone()[0]
+
+
+def report(match_id):
+    with Main.Database.connect(commit=True) as cursor:
+        cursor.execute("""UPDATE "Matches" SET team_1_score = 7, team_2_score = 5 WHERE id = %s;""", (match_id,))
+
+
+def test_veto_runs_between_the_captains_and_is_saved(sent, match):
+    async def play():
+        await Main.on_message(make_message('!veto <@&team-a>', 'alice', ['team-a'], ['team-a']))
+        # Only the member who started the veto takes team-a's turns
+        await Main.on_message(make_message('!ban Bank', 'bob', ['team-a']))
+        maps = list(Settings.VETO_MAPS['r6s'])
+        for turn in range(len(Settings.VETO_SEQUENCE)):
+            author, team = ('alice', 'team-a') if turn % 2 == 0 else ('carol', 'team-b')
+            await Main.on_message(make_message('!ban "{}"'.format(maps[turn]), author, [team]))
+        await asyncio.gather(*Main.vetoes.pending_saves)
+
+    run(play())
+    assert sent[0].startswith('The map veto between <@&team-a> and <@&team-b> has started.')
+    assert sent[1] == '<@bob> Only <@alice> can ban or pick for your team.'
+    assert 'is finished' in sent[-1]
+    with Main.Database.connect() as cursor:
+        cursor.execute("""SELECT match FROM "Vetoes" WHERE server = %s;""", (SERVER,))
+        assert cursor.fetchall() == [(match,)]
+
+
+def test_veto_of_a_reported_match_is_turned_away(sent, match):
+    report(match)
+    run(Main.on_message(make_message('!veto <@&team-a>', 'alice', ['team-a'], ['team-a'])))
+    assert sent == ['The <@&team-a> team\'s match in round 1 was already reported, so it can\'t be vetoed.']
+    assert Main.vetoes.sessions == {}
+
+
+def test_veto_drops_a_stale_match_index(sent, match):
+    # Loads the round into the index, then reports the match behind its back like another bot process would
+    run(Main.get_round_matches(SERVER, run(Main.get_server_settings(SERVER))))
+    report(match)
+    run(Main.on_message(make_message('!veto <@&team-a>', 'alice', ['team-a'], ['team-a'])))
+    assert sent == ['The <@&team-a> team\'s match in round 1 was already reported, so it can\'t be vetoed.']
+    assert Main.Database.MATCH_INDEX.get(SERVER, 1, 1) is None
+    assert Main.vetoes.sessions == {}
+
+
+def test_each_shard_prints_its_own_user(monkeypatch, capsys):
+    class ShardClient:
+        def __init__(self, shard_id, shard_count):
+            self.user = SimpleNamespace(name='shard-{}'.format(shard_id), id=shard_id)
+
+        def event(self, coroutine):
+            setattr(self, coroutine.__name__, coroutine)
+
+    # The first shard isn't ready yet, so its client doesn't know who it is logged in as
+    monkeypatch.setattr(Main, 'client', SimpleNamespace(user=None, started=True))
+    run(Main.make_client(1, 2, ShardClient).on_ready())
+    assert capsys.readouterr().out.splitlines()[1:3] == ['shard-1', '1']
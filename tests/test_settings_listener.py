@@ -0,0 +1,58 @@
+import threading  # Used to wait for the listener to start listening
+import time  # Used to wait for the notification to arrive
+import pytest  # Used to skip the tests when there is no postgres server to run them on
+
+pytest.importorskip('psycopg2')
+
+import Database  # Used to change the setting through the postgres backend
+import MatchIndex  # Used to check that the listener drops the matches of a server whose round changed
+import Settings  # Holds the connection string and notification channel
+import SettingsListener  # Holds the listener being tested
+import SettingsStore  # Used to make the settings store of the second bot process
+
+SERVER = 'settings-listener-test'
+
+
+@pytest.fixture
+def server(postgres_pool):
+    """ Gives the test a server with no settings, and removes its settings once the test is done.
+    """
+    with Database.connect(commit=True) as cursor:
+        cursor.execute("""DELETE FROM "Settings" WHERE server = %s;""", (SERVER,))
+    yield SERVER
+    with Database.connect(commit=True) as cursor:
+        cursor.execute("""DELETE FROM "Settings" WHERE server = %s;""", (SERVER,))
+
+
+def test_listener_updates_another_processes_store(server, monkeypatch):
+    Database.get_server_settings(SERVER)
+    record = Settings.SERVER_SETTINGS.get(SERVER)
+    # The settings store and match index of a second bot process, which has already loaded the server
+    store = SettingsStore.SettingsStore()
+    store.put(SERVER, record)
+    index = MatchIndex.MatchIndex()
+    index.load(SERVER, record.current_season, record.current_round, [])
+    listener = SettingsListener.SettingsListener(Settings.DB_CONN_STRING, Settings.DB_NOTIFY_CHANNEL, store,
+                                                 poll_timeout=0.1, match_index=index)
+    # Changes made before the listener is listening are never sent to it, so the update waits for it to be ready
+    listening = threading.Event()
+    listen = listener.listen
+
+    def listen_and_signal():
+        conn = listen()
+        listening.set()
+        return conn
+
+    monkeypatch.setattr(listener, 'listen', listen_and_signal)
+    listener.start()
+    try:
+        assert listening.wait(5)
+        assert Database.update_settings(SERVER, 'current_round', record.current_round + 1)
+        deadline = time.monotonic() + 5
+        while store.get(SERVER).current_round == record.current_round and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert store.get(SERVER).current_round == record.current_round + 1
+        assert index.get(SERVER, record.current_season, record.current_round) is None
+    finally:
+        listener.stop()
+        listener.join(5)
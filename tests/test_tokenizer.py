@@ -0,0 +1,78 @@
+import random  # Used to generate the messages that are tokenized
+import pytest  # Used to check the edge cases one at a time
+import Commands  # Holds the tokenizer being tested
+from Benchmarks.Tokenizer import legacy_get_args, random_message  # Used to compare against the old tokenizer
+
+# The number of random messages each check tokenizes
+ITERATIONS = 20000
+
+
+def fixed_legacy_get_args(message):
+    """ The legacy tokenizer with its two bugs fixed: it keeps the only argument of a message, and empty quotes close
+    again instead of leaving the quote open.
+    """
+    message_args = list()
+    temp_arg = ''
+    quote_already_seen = False
+    for c in message:
+        if ((c != ' ' and c != '"') and not quote_already_seen) or (c != '"' and quote_already_seen):
+            temp_arg += c
+        elif c == '"' and not quote_already_seen:
+            quote_already_seen = True
+        else:
+            if len(temp_arg) > 0:
+                message_args.append(temp_arg)
+            temp_arg = ''
+            quote_already_seen = False
+    if len(temp_arg) > 0:
+        message_args.append(temp_arg)
+    return message_args
+
+
+def random_messages(seed):
+    rng = random.Random(seed)
+    for _ in range(ITERATIONS):
+        yield random_message(rng, rng.randint(0, 60))
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_matches_the_fixed_legacy_tokenizer(seed):
+    for message in random_messages(seed):
+        assert Commands.get_args(message) == fixed_legacy_get_args(message), message
+
+
+def test_matches_the_legacy_tokenizer_where_it_was_right():
+    compared = 0
+    for message in random_messages(0):
+        args = Commands.get_args(message)
+        # The legacy tokenizer drops the only argument of a message and leaves the quote open after empty quotes
+        if '""' in message or len(args) < 2:
+            continue
+        assert args == legacy_get_args(message), message
+        compared += 1
+    # Most of the messages still go through the check
+    assert compared > ITERATIONS // 2
+
+
+@pytest.mark.parametrize('message, expected, legacy', [
+    ('!help', ['!help'], []),
+    ('  !help', ['!help'], []),
+    ('"two words', ['two words'], []),
+    ('!help ', ['!help'], ['!help']),
+    ('', [], []),
+])
+def test_single_argument_is_kept(message, expected, legacy):
+    assert Commands.get_args(message) == expected
+    assert legacy_get_args(message) == legacy
+
+
+@pytest.mark.parametrize('message, expected', [
+    ('!ign "" name', ['!ign', 'name']),
+    ('!ign ""name', ['!ign', 'name']),
+    ('!addteam "Team Name" @team', ['!addteam', 'Team Name', '@team']),
+    ('!addteam "Team Name', ['!addteam', 'Team Name']),
+    ('!addteam  a   b ', ['!addteam', 'a', 'b']),
+    ('!x ab"c d"', ['!x', 'abc d']),
+])
+def test_quotes(message, expected):
+    assert Commands.get_args(message) == expected